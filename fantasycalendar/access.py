@@ -0,0 +1,120 @@
+from typing import NamedTuple
+
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404
+from . import calendar_cache
+from .models import World, Calendar, TimeUnit, Event, DateFormat, DisplayConfig, DisplayUnitConfig, DateBookmark
+
+# the lookup from each model to its world; models not listed reach it through their calendar
+WORLD_PATHS = {World: '', Calendar: 'world__', TimeUnit: 'world__', Event: 'world__', DateFormat: 'world__',
+               DisplayConfig: 'world__', DisplayUnitConfig: 'display_config__world__', DateBookmark: 'world__'}
+
+
+class WorldAccess(NamedTuple):
+    world_id: int
+    public: bool
+    creator_id: int | None
+    schema_version: int
+    content_version: int
+
+    @property
+    def version(self) -> str:
+        """
+        Return a string that names the state of everything in the world
+        at the time it was resolved, to key caches and ETags on.
+        """
+        return '.'.join(str(value) for value in [self.world_id, self.schema_version, self.content_version])
+
+    def can_view(self, user) -> bool:
+        """
+        Return True if the world is public or the user created it.
+        """
+        return self.public or (user.is_authenticated and self.creator_id == user.pk)
+
+
+class AccessResolver:
+    """
+    Resolves who can see and change objects for the user of a single
+    request. The world an object belongs to is looked up in one query
+    and remembered for the rest of the request, so checking the same
+    object, or any object in the same world, again costs nothing.
+    """
+    def __init__(self, user):
+        self.user = user
+        self.resolved = dict()  # {(model, pk): WorldAccess}
+
+    def get_accesses(self, model: type[Model], ids: list[int]) -> dict[int, WorldAccess]:
+        """
+        Return the world access of each object of a model with one of a
+        list of ids, by id. Ids of objects that don't exist are left out.
+
+        Optimized to minimize hits to the database when resolving
+        several objects at once.
+
+        Values cached in this process for the calendars of a newly
+        resolved world are checked against its versions, so nothing
+        built from them for this request is older than those versions.
+        """
+        ids = [int(id) for id in ids]
+        missing_ids = [id for id in ids if (model, id) not in self.resolved]
+        if missing_ids:
+            world_path = WORLD_PATHS.get(model, 'calendar__world__')
+            for pk, world_id, public, creator_id, schema_version, content_version in model.objects.filter(
+                    pk__in=missing_ids).values_list('pk', world_path + 'id', world_path + 'public',
+                                                    world_path + 'creator_id', world_path + 'schema_version',
+                                                    world_path + 'content_version'):
+                access = WorldAccess(world_id=world_id, public=public, creator_id=creator_id,
+                                     schema_version=schema_version, content_version=content_version)
+                self.resolved[(model, pk)] = access
+                if (World, world_id) not in self.resolved:
+                    calendar_cache.check_world(world_id, schema_version, content_version)
+                self.resolved[(World, world_id)] = access
+        return {id: self.resolved[(model, id)] for id in ids if (model, id) in self.resolved}
+
+    def get_access(self, model: type[Model], id: int) -> WorldAccess:
+        """
+        Return the world access of the object of a model with an id,
+        raising Http404 if there is no such object.
+        """
+        access = self.get_accesses(model, [id]).get(int(id))
+        if access is None:
+            raise Http404('No ' + model._meta.object_name + ' matches the given query.')
+        return access
+
+    def is_creator(self, model: type[Model], id: int) -> bool:
+        """
+        Return True if the user created the world of the object of a
+        model with an id.
+        """
+        return self.user.is_authenticated and self.get_access(model, id).creator_id == self.user.pk
+
+    def can_view(self, model: type[Model], id: int) -> bool:
+        """
+        Return True if the world of the object of a model with an id is
+        public or the user created it.
+        """
+        return self.get_access(model, id).can_view(self.user)
+
+
+def get_visible_world_ids(user) -> QuerySet:
+    """
+    Return a queryset of the ids of the worlds a user can see, for
+    filtering rows that carry a world_id with world_id__in.
+    """
+    if user.is_authenticated:
+        return World.objects.filter(Q(public=True) | Q(creator_id=user.pk)).values('pk')
+    return World.objects.filter(public=True).values('pk')
+
+
+def get_access_resolver(request) -> AccessResolver:
+    """
+    Return the access resolver for a request, starting one if the
+    request doesn't have one for its user yet. DRF requests share the
+    resolver of the Django request they wrap.
+    """
+    user = request.user
+    request = getattr(request, '_request', request)
+    resolver = getattr(request, 'access_resolver', None)
+    if resolver is None or resolver.user is not user:
+        resolver = request.access_resolver = AccessResolver(user)
+    return resolver
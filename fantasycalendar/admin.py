@@ -54,7 +54,7 @@ admin.site.register(World, WorldAdmin)
 
 
 class EventAdmin(admin.ModelAdmin):
-    fields = ('calendar', 'event_name', 'event_description', 'bottom_level_iteration')
+    fields = ('calendar', 'event_name', 'event_description', 'bottom_level_iteration', 'last_bottom_level_iteration')
 
 
 admin.site.register(Event, EventAdmin)
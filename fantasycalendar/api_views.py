@@ -1,20 +1,122 @@
-import math
+import hashlib
+import io
 
+from asgiref.sync import async_to_sync
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from rest_framework import viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from .models import World, Calendar, TimeUnit, Event, DateFormat, DisplayConfig, DateBookmark, DisplayUnitConfig
+from .models import World, Calendar, TimeUnit, Event, DateFormat, DisplayConfig, DateBookmark
 from .serializers import WorldSerializer, CalendarSerializer, TimeUnitSerializer, EventSerializer, \
     DateFormatSerializer, DisplayConfigSerializer, DateBookmarkSerializer, CalendarDetailSerializer
+from .event_import import ROW_READERS, import_events
+from . import calendar_pages, page_cache, precompute
+from .pagination import KeysetPagination
+from .renderers import ColumnarPageRenderer, iter_page_json
+from .search import search_events
+from .snapshots import export_world, import_world, clone_world, clone_calendar
+from .access import WorldAccess, get_access_resolver, get_visible_world_ids
 from .permissions import IsCreatorOrPublic, IsWorldCreatorOrPublic, IsCalendarWorldCreatorOrPublic, \
     IsCalendarWorldCreator
 
 
+class SparseFieldsMixin:
+    """
+    Pass a comma-separated fields query parameter on read requests to
+    the serializer so only those fields are serialized.
+    """
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in SAFE_METHODS and 'fields' in self.request.query_params:
+            kwargs['fields'] = [field for field in self.request.query_params.get('fields').split(',') if field]
+        return super(SparseFieldsMixin, self).get_serializer(*args, **kwargs)
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+def get_server_timing(timings: dict) -> str:
+    """
+    Return a Server-Timing header value for the milliseconds spent in
+    each stage of building a page, from a page context's timings.
+    """
+    return ', '.join(stage + ';dur=' + format(duration, '.1f') for stage, duration in timings.items())
+
+
+class ConditionalGetMixin:
+    """
+    Send a strong ETag with every successful read and answer a read
+    whose If-None-Match matches with 304 Not Modified before the view
+    does any work.
+
+    The ETag is a hash of the version of the world the request reads
+    from, the request URL, the accepted media type and the user, so it
+    changes whenever anything in that world is saved or deleted.
+    etag_scopes lists the (parameter, model) pairs that can name that
+    world, tried in order, where a parameter of 'pk' is the object id
+    in the URL and a comma-separated parameter must name objects in a
+    single world. A pair may be followed by other parameters the view
+    only reads it along with, and is skipped unless they are all given.
+    Requests without any of them, and requests from users
+    who can't see that world, get no ETag, so the view itself answers
+    them and a 304 never reveals the version of a private world.
+    """
+    etag_scopes = []
+
+    def get_etag_world_access(self, request) -> WorldAccess | None:
+        for param, model, *required_params in self.etag_scopes:
+            value = self.kwargs.get('pk') if param == 'pk' else request.query_params.get(param)
+            if value is None or any(required_param not in request.query_params for required_param in required_params):
+                continue
+            try:
+                ids = [int(id) for id in str(value).split(',')]
+            except ValueError:
+                return None  # let the view report the bad parameter
+            accesses = {access.world_id: access
+                        for access in get_access_resolver(request).get_accesses(model, ids).values()}
+            return accesses.popitem()[1] if len(accesses) == 1 else None
+        return None
+
+    def get_etag(self, request) -> str | None:
+        access = self.get_etag_world_access(request)
+        if access is None or not access.can_view(request.user):
+            return None
+        validator = '|'.join([access.version, request.build_absolute_uri(),
+                              request.META.get('HTTP_ACCEPT', ''),
+                              str(request.user.pk if request.user.is_authenticated else '')])
+        return quote_etag(hashlib.sha256(validator.encode()).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super(ConditionalGetMixin, self).initial(request, *args, **kwargs)
+        self.etag = self.get_etag(request) if request.method in ('GET', 'HEAD') else None
+        if self.etag is not None and self.etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=self.get_etag_headers())
+        return super(ConditionalGetMixin, self).handle_exception(exc)
+
+    def get_etag_headers(self) -> dict:
+        # clients may keep the response but must check it is still current before each use
+        return {'ETag': self.etag, 'Cache-Control': 'private, no-cache'}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(ConditionalGetMixin, self).finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) is not None and response.status_code == status.HTTP_200_OK:
+            for header, value in self.get_etag_headers().items():
+                response[header] = value
+        return response
+
+
 class UserStatus(APIView):
     def get(self, request):
         if not request.user.is_authenticated:
@@ -24,18 +126,20 @@ class UserStatus(APIView):
                              'message': 'send world_id or calendar_id to test for creator status'})
         if 'world_id' in request.query_params:
             world_id = int(request.query_params.get('world_id'))
-            world = get_object_or_404(World, pk=world_id)
-            return Response({'user_status': 'creator' if world.creator == request.user else 'authenticated'})
+            is_creator = get_access_resolver(request).is_creator(World, world_id)
+            return Response({'user_status': 'creator' if is_creator else 'authenticated'})
         if 'calendar_id' in request.query_params:
             calendar_id = int(request.query_params.get('calendar_id'))
-            calendar = get_object_or_404(Calendar, pk=calendar_id)
-            return Response({'user_status': 'creator' if calendar.world.creator == request.user else 'authenticated'})
+            is_creator = get_access_resolver(request).is_creator(Calendar, calendar_id)
+            return Response({'user_status': 'creator' if is_creator else 'authenticated'})
 
 
-class WorldViewSet(viewsets.ReadOnlyModelViewSet):
+class WorldViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    etag_scopes = [('pk', World)]
     queryset = World.objects.all()
     serializer_class = WorldSerializer
     permission_classes = [IsCreatorOrPublic]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = super(WorldViewSet, self).get_queryset()
@@ -50,21 +154,90 @@ class WorldViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class CalendarViewSet(viewsets.ReadOnlyModelViewSet):
+class WorldExport(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if 'world_id' not in request.query_params:
+            return Response({'message': 'ERROR: world_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        world = get_object_or_404(World, pk=int(request.query_params.get('world_id')))
+        if not get_access_resolver(request).is_creator(World, world.pk):
+            return Response({'message': 'ERROR: you are not authenticated as the creator of this resource'},
+                            status=status.HTTP_403_FORBIDDEN)
+        response = StreamingHttpResponse(export_world(world), content_type='application/jsonl')
+        response['Content-Disposition'] = 'attachment; filename="world-' + str(world.pk) + '.jsonl"'
+        return response
+
+
+class WorldImport(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if 'file' not in request.FILES:
+            return Response({'message': 'ERROR: missing required fields file'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            world = import_world(io.TextIOWrapper(request.FILES['file'].file, encoding='utf-8'), request.user)
+        except ValueError as error:
+            return Response({'message': 'ERROR: could not import snapshot: ' + str(error)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(WorldSerializer(world).data, status=status.HTTP_201_CREATED)
+
+
+class WorldClone(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if 'world_id' not in request.data:
+            return Response({'message': 'ERROR: missing required fields world_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        world = get_object_or_404(World, pk=int(request.data['world_id']))
+        if not get_access_resolver(request).can_view(World, world.pk):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+        clone = clone_world(world, request.user, world_name=request.data.get('world_name'),
+                            public=str(request.data.get('public', False)) in ('1', 'true', 'True'))
+        return Response(WorldSerializer(clone).data, status=status.HTTP_201_CREATED)
+
+
+class CalendarClone(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if 'calendar_id' not in request.data:
+            return Response({'message': 'ERROR: missing required fields calendar_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        calendar = get_object_or_404(Calendar, pk=int(request.data['calendar_id']))
+        if not get_access_resolver(request).can_view(Calendar, calendar.pk):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+        world = calendar.world
+        if request.data.get('world_id'):
+            world = get_object_or_404(World, pk=int(request.data['world_id']))
+        if not get_access_resolver(request).is_creator(World, world.pk):
+            return Response({'message': "ERROR: you are not authenticated as the creator of the target world"},
+                            status=status.HTTP_403_FORBIDDEN)
+        clone = clone_calendar(calendar, request.user, world=world, calendar_name=request.data.get('calendar_name'))
+        return Response(CalendarSerializer(clone).data, status=status.HTTP_201_CREATED)
+
+
+class CalendarViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    etag_scopes = [('pk', Calendar), ('world_id', World)]
     queryset = Calendar.objects.all()
     serializer_class = CalendarSerializer
     permission_classes = [IsWorldCreatorOrPublic]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = super(CalendarViewSet, self).get_queryset()
         if self.action == 'list':
-            if self.request.user.is_authenticated:
-                queryset = queryset.filter(world__creator_id=self.request.user.id) | queryset.filter(world__public=True)
-            else:
-                queryset = queryset.filter(world__public=True)
+            queryset = queryset.filter(world_id__in=get_visible_world_ids(self.request.user))
             if 'world_id' in self.request.query_params:
                 world_id = int(self.request.query_params.get('world_id'))
                 queryset = queryset.filter(world_id=world_id)
+        if self.get_serializer_class() is CalendarDetailSerializer:
+            queryset = queryset.prefetch_related('timeunit_set')
         return queryset
 
     def get_serializer_class(self):
@@ -74,7 +247,116 @@ class CalendarViewSet(viewsets.ReadOnlyModelViewSet):
             return super(CalendarViewSet, self).get_serializer_class()
 
 
-class CalendarPage(APIView):
+class CalendarBootstrap(ConditionalGetMixin, APIView):
+    etag_scopes = [('calendar_id', Calendar)]
+
+    def get(self, request):
+        # validate required parameters
+        if 'calendar_id' not in request.query_params:
+            return Response({'message': 'ERROR: calendar_id required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # get calendar with its time units and authenticate
+        calendar = get_object_or_404(Calendar.objects.prefetch_related(
+            Prefetch('timeunit_set', queryset=TimeUnit.objects.select_related('default_date_format',
+                                                                             'secondary_date_format'))),
+            pk=int(request.query_params.get('calendar_id')))
+        resolver = get_access_resolver(request)
+        is_creator = resolver.is_creator(Calendar, calendar.pk)
+        if not resolver.can_view(Calendar, calendar.pk):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+
+        # load everything the calendar and its pages are built from once, and serialize it
+        display_config_id = int(request.query_params.get('display_config_id')) \
+            if 'display_config_id' in request.query_params else None
+        context = calendar_pages.load_page_context(calendar, display_config_id,
+                                                   time_units=calendar.timeunit_set.all())
+        calendar_data = CalendarDetailSerializer(calendar).data
+        display_config = context['display_config']
+        display_config_data = None
+        if display_config is not None:
+            prefetch_related_objects(list(context['display_unit_configs'].values()), 'searchable_date_formats')
+            display_config_data = DisplayConfigSerializer(display_config).data
+
+        # pick the initial page and build it unless it is cached
+        page = None
+        initial_page = self.get_initial_page(request, context, calendar_data['date_bookmarks'])
+        if initial_page is not None:
+            time_unit_id, sub_unit_id, iteration = initial_page
+            page_display_config_id = display_config.pk if display_config is not None else 0
+            page_key = page_cache.get_page_key(
+                world_version=resolver.get_access(Calendar, calendar.pk).version, time_unit_id=time_unit_id,
+                sub_unit_id=sub_unit_id, iteration=iteration, display_config_id=page_display_config_id,
+                visibility='creator' if is_creator else 'public')
+            data = page_cache.get_page(page_key)
+            if data is None:
+                try:
+                    data = calendar_pages.build_pages(context, [calendar_pages.resolve_page(
+                        context, time_unit_id=time_unit_id, iteration=iteration, sub_unit_id=sub_unit_id)])[0]
+                    page_cache.set_page(page_key, data)
+                except Http404:
+                    pass  # the page is returned without data
+            page = {'time_unit_id': time_unit_id, 'sub_unit_id': sub_unit_id, 'iteration': iteration,
+                    'display_config_id': page_display_config_id, 'data': data}
+
+        return Response({
+            'user_status': 'creator' if is_creator else 'authenticated' if request.user.is_authenticated
+            else 'unauthenticated',
+            'calendar': calendar_data,
+            'display_config': display_config_data,
+            'page': page,
+        })
+
+    @staticmethod
+    def get_initial_page(request, context: dict, date_bookmarks: list) -> tuple[int, int | None, int] | None:
+        """
+        Return the (time unit id, sub unit id, iteration) of the page to
+        show first: the page given by display_unit_id,
+        display_sub_unit_id and display_iteration if the display config
+        has it, otherwise the display config's default page at its
+        default bookmark, or None if the calendar has no time units.
+        """
+        time_units = context['time_units']
+        display_config = context['display_config']
+        display_unit_id = int(request.query_params.get('display_unit_id', 0)) or None
+        display_sub_unit_id = int(request.query_params.get('display_sub_unit_id', 0)) or None
+        display_iteration = int(request.query_params.get('display_iteration', 0))
+        if display_config is not None:
+            default_page = next((page for page in context['display_unit_configs'].values()
+                                 if page.pk == display_config.default_display_unit_config_id), None)
+            if default_page is None:
+                return None
+            time_unit_id, sub_unit_id = default_page.time_unit_id, default_page.sub_unit_id
+            if display_unit_id is not None:
+                # must have a page matching time unit AND sub unit if sub unit is provided, or matching time unit
+                # with NO sub unit if it is not
+                if any(page.time_unit_id == display_unit_id and (page.sub_unit_id == display_sub_unit_id
+                                                                 if display_sub_unit_id is not None else
+                                                                 page.sub_unit_id in (None, display_unit_id))
+                       for page in context['display_unit_configs'].values()):
+                    time_unit_id, sub_unit_id = display_unit_id, display_sub_unit_id
+            if display_iteration < 1 and display_config.default_date_bookmark_id is not None:
+                # only bookmarks with a matching time unit page are allowed
+                display_iteration = next((bookmark['bookmark_iteration'] for bookmark in date_bookmarks
+                                          if bookmark['id'] == display_config.default_date_bookmark_id
+                                          and (bookmark['bookmark_unit'], bookmark['bookmark_sub_unit'])
+                                          in context['display_unit_configs']), 1)
+        else:  # all pages are allowed when there is no display config
+            if display_unit_id in time_units:
+                time_unit_id = display_unit_id
+                sub_unit_id = display_sub_unit_id if display_sub_unit_id in time_units else None
+            elif len(time_units) > 0:
+                time_unit_id, sub_unit_id = next(iter(time_units)), None
+            else:
+                return None
+        return time_unit_id, sub_unit_id, max(display_iteration, 1)
+
+
+class CalendarPage(ConditionalGetMixin, APIView):
+    etag_scopes = [('time_unit_id', TimeUnit)]
+    renderer_classes = APIView.renderer_classes + [ColumnarPageRenderer]  # opt in with format=columnar
+
     def get(self, request):
         # validate required parameters
         if 'time_unit_id' not in request.query_params:
@@ -82,169 +364,228 @@ class CalendarPage(APIView):
         if 'iteration' not in request.query_params:
             return Response({'message': 'ERROR: iteration required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # get time unit and calendar
-        time_unit = get_object_or_404(TimeUnit, pk=int(request.query_params.get('time_unit_id')))
-        calendar = time_unit.calendar
+        # authenticate; the time unit itself is only loaded if the page has to be built
+        time_unit_id = int(request.query_params.get('time_unit_id'))
+        resolver = get_access_resolver(request)
+        is_creator = resolver.is_creator(TimeUnit, time_unit_id)
+        if not resolver.can_view(TimeUnit, time_unit_id):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+
+        # serve the page from the cache if it hasn't changed since it was built
+        iteration = int(request.query_params.get('iteration'))
+        sub_unit_id = int(request.query_params.get('sub_unit_id')) if 'sub_unit_id' in request.query_params \
+            else None
+        display_config_id = int(request.query_params.get('display_config_id')) \
+            if 'display_config_id' in request.query_params else None
+        world_version = resolver.get_access(TimeUnit, time_unit_id).version
+        visibility = 'creator' if is_creator else 'public'
+        page_key = page_cache.get_page_key(
+            world_version=world_version, time_unit_id=time_unit_id, sub_unit_id=sub_unit_id, iteration=iteration,
+            display_config_id=display_config_id, visibility=visibility)
+        if precompute.is_enabled():
+            # build the pages before and after in the background, since they are likely to be asked for next
+            precompute.precompute_pages([
+                (page_cache.get_page_key(world_version=world_version, time_unit_id=time_unit_id,
+                                         sub_unit_id=sub_unit_id, iteration=adjacent_iteration,
+                                         display_config_id=display_config_id, visibility=visibility),
+                 time_unit_id, adjacent_iteration, sub_unit_id, display_config_id)
+                for adjacent_iteration in [iteration + 1, iteration - 1] if adjacent_iteration >= 1])
+        data = page_cache.get_page(page_key)
+        if data is None and precompute.claim_page(page_key):
+            data = page_cache.get_page(page_key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        time_unit = TimeUnit.objects.select_related('calendar').get(pk=time_unit_id)
+        context = calendar_pages.load_page_context(time_unit.calendar, display_config_id)
+        page = calendar_pages.resolve_page(context, time_unit_id=time_unit.pk, iteration=iteration,
+                                           sub_unit_id=sub_unit_id)
+        if len(page['instances']) >= calendar_pages.STREAM_MIN_DATES:
+            # too big to build whole, so the dates are built, encoded and sent a run at a time and never cached;
+            # always plain JSON, since a columnar page can't be sent before all its dates are known
+            dates = calendar_pages.iter_calendar_dates(page, calendar_pages.iter_page_runs(
+                context, page, calendar_pages.STREAM_CHUNK_SIZE))
+            return StreamingHttpResponse(
+                iter_page_json(calendar_pages.get_page_layout(page), dates, calendar_pages.STREAM_CHUNK_SIZE),
+                content_type='application/json', headers={'X-Cache': 'BYPASS'})
+        data = self.build_page(context, page)
+        page_cache.set_page(page_key, data)
+        return Response(data, headers={'X-Cache': 'MISS', 'Server-Timing': get_server_timing(context['timings'])})
+
+    def build_page(self, context: dict, page: dict) -> dict:
+        return calendar_pages.build_pages(context, [page])[0]
+
+
+class AsyncCalendarPage(CalendarPage):
+    """
+    The same as CalendarPage, but a page that isn't cached is built with
+    the stages that don't depend on each other run at the same time by
+    calendar_pages.abuild_page. Meant for serving under ASGI, where the
+    stages run on the server's event loop while the request waits.
+
+    DRF views can only be synchronous, so everything else the request
+    does, from checking access to the cache lookup, is the same
+    synchronous code as CalendarPage's.
+    """
+    def build_page(self, context: dict, page: dict) -> dict:
+        return async_to_sync(calendar_pages.abuild_page)(context, page)
+
+
+class CalendarPages(ConditionalGetMixin, APIView):
+    etag_scopes = [('calendar_id', Calendar)]
+    renderer_classes = APIView.renderer_classes + [ColumnarPageRenderer]  # opt in with format=columnar
+    MAX_PAGES = 50
+
+    def get(self, request):
+        # validate required parameters
+        if 'calendar_id' not in request.query_params:
+            return Response({'message': 'ERROR: calendar_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        if 'pages' not in request.query_params and \
+                ('time_unit_id' not in request.query_params or 'iteration' not in request.query_params):
+            return Response({'message': 'ERROR: pages or time_unit_id and iteration required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # get calendar and authenticate
+        calendar = get_object_or_404(Calendar, pk=int(request.query_params.get('calendar_id')))
+        resolver = get_access_resolver(request)
+        is_creator = resolver.is_creator(Calendar, calendar.pk)
+        if not resolver.can_view(Calendar, calendar.pk):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+
+        # read the requested pages as (time unit id, sub unit id, iteration), either listed as
+        # time_unit_id:sub_unit_id:iteration with an empty sub_unit_id for the default or as a window of pages
+        # before and after one page
+        try:
+            if 'pages' in request.query_params:
+                requested = [(int(time_unit_id), int(sub_unit_id) if sub_unit_id else None, int(iteration))
+                             for time_unit_id, sub_unit_id, iteration in
+                             (page.split(':') for page in request.query_params.get('pages').split(',') if page)]
+            else:
+                time_unit_id = int(request.query_params.get('time_unit_id'))
+                sub_unit_id = int(request.query_params.get('sub_unit_id')) \
+                    if 'sub_unit_id' in request.query_params else None
+                iteration = int(request.query_params.get('iteration'))
+                before = max(int(request.query_params.get('before', 1)), 0)
+                after = max(int(request.query_params.get('after', 1)), 0)
+                requested = [(time_unit_id, sub_unit_id, page_iteration)
+                             for page_iteration in range(max(iteration - before, 1), iteration + after + 1)]
+        except ValueError:
+            return Response({'message': 'ERROR: pages must be a list of time_unit_id:sub_unit_id:iteration and '
+                                        'all ids, iterations and window sizes must be integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(requested) > self.MAX_PAGES:
+            return Response({'message': 'ERROR: at most ' + str(self.MAX_PAGES) + ' pages can be requested at once'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        display_config_id = int(request.query_params.get('display_config_id')) \
+            if 'display_config_id' in request.query_params else None
+
+        # serve what pages we can from the cache, then build the rest together
+        world_version = resolver.get_access(Calendar, calendar.pk).version
+        page_keys = [page_cache.get_page_key(world_version=world_version, time_unit_id=time_unit_id,
+                                             sub_unit_id=sub_unit_id, iteration=iteration,
+                                             display_config_id=display_config_id,
+                                             visibility='creator' if is_creator else 'public')
+                     for time_unit_id, sub_unit_id, iteration in requested]
+        page_data = [page_cache.get_page(page_key) for page_key in page_keys]
+        missing = [index for index, data in enumerate(page_data) if data is None]
+        headers = dict()
+        if len(missing) > 0:
+            context = calendar_pages.load_page_context(calendar, display_config_id)
+            resolved = []
+            for index in missing:
+                time_unit_id, sub_unit_id, iteration = requested[index]
+                try:
+                    resolved.append((index, calendar_pages.resolve_page(
+                        context, time_unit_id=time_unit_id, iteration=iteration, sub_unit_id=sub_unit_id)))
+                except Http404:
+                    pass  # pages that don't exist are returned without data
+            for (index, _), data in zip(resolved, calendar_pages.build_pages(context,
+                                                                             [page for _, page in resolved])):
+                page_data[index] = data
+                page_cache.set_page(page_keys[index], data)
+            headers['Server-Timing'] = get_server_timing(context['timings'])
+        return Response({'pages': [{'time_unit_id': time_unit_id, 'sub_unit_id': sub_unit_id, 'iteration': iteration,
+                                    'data': data}
+                                   for (time_unit_id, sub_unit_id, iteration), data in zip(requested, page_data)]},
+                        headers=headers)
+
+
+class CalendarPageCacheStats(APIView):
+    permission_classes = [IsAdminUser]
 
-        # authenticate
-        if calendar.world.creator != request.user and not calendar.world.public:
+    def get(self, request):
+        return Response(page_cache.get_stats())
+
+
+class EventCounts(ConditionalGetMixin, APIView):
+    etag_scopes = [('time_unit_id', TimeUnit)]
+
+    def get(self, request):
+        # validate required parameters
+        if 'time_unit_id' not in request.query_params or 'iteration' not in request.query_params:
+            return Response({'message': 'ERROR: time_unit_id and iteration required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # get time unit and authenticate
+        time_unit = get_object_or_404(TimeUnit, pk=int(request.query_params.get('time_unit_id')))
+        if not get_access_resolver(request).can_view(TimeUnit, time_unit.pk):
             return Response(
                 {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
                 status=status.HTTP_403_FORBIDDEN)
 
-        # read remaining parameters and pull their corresponding objects
+        # read remaining parameters
         iteration = int(request.query_params.get('iteration'))
         if 'sub_unit_id' in request.query_params:
-            sub_unit = get_object_or_404(TimeUnit, pk=int(request.query_params.get('sub_unit_id')))
+            sub_unit = get_object_or_404(TimeUnit, pk=int(request.query_params.get('sub_unit_id')),
+                                         calendar_id=time_unit.calendar_id)
         else:
             sub_unit = time_unit.base_unit if time_unit.base_unit is not None else time_unit
-        display_config = calendar.default_display_config  # None is OK here
-        if 'display_config_id' in request.query_params:
-            display_config_id = int(request.query_params.get('display_config_id'))
-            if display_config_id > 0:
-                display_config = get_object_or_404(DisplayConfig, pk=display_config_id)
-            else:  # id of 0 or less will force using no display config
-                display_config = None   # but not providing an id at all will use the calendar default
-        if display_config is not None:
-            display_unit_config = get_object_or_404(  # if we are using a display_config only allow extant pages
-                DisplayUnitConfig, display_config_id=display_config.id, time_unit_id=time_unit.id,
-                # always use the "single" page if a different sub_unit_id was not explicitly requested
-                sub_unit_id=sub_unit.id if 'sub_unit_id' in request.query_params
-                                           and sub_unit.id != time_unit.id else None)
-        else:
-            display_unit_config = None
-
-        # pull instance information
-        instances = time_unit.get_sub_unit_instances(iteration=iteration, sub_unit=sub_unit)
-        first_sub_iteration = time_unit.get_first_sub_unit_iteration_at_iteration(iteration=iteration,
-                                                                                  sub_unit=sub_unit)
-        first_bottom_level_iteration = time_unit.get_first_bottom_level_iteration_at_iteration(iteration=iteration)
-        iterations = [first_sub_iteration + x for x in range(len(instances))]
-        events = sub_unit.get_events_at_iterations(iterations)
-        instance_display_names = sub_unit.get_instance_display_names(iterations=iterations,
-                                                                      prefer_secondary=True)
-        linked_instance_display_names = [[] for _ in instances]
-        if display_unit_config is not None and display_unit_config.show_linked_instance_display_names:
-            linked_instance_display_names = sub_unit.get_linked_instances_display_names(iterations, prefer_secondary=True)
-        linked_events = [[] for _ in instances]
-        if display_unit_config is not None and display_unit_config.show_linked_instance_events:
-            linked_events = sub_unit.get_linked_events_at_iterations(iterations)
-        max_events_per_instance = display_unit_config.max_events_per_instance \
-            if display_unit_config is not None and display_unit_config.max_events_per_instance > 0 else 99
-
-        # pull row grouping information
-        row_grouping_unit = display_unit_config.row_grouping_time_unit if display_unit_config is not None else None
-        if row_grouping_unit:
-            row_grouping_instances = row_grouping_unit.get_base_unit_instances(iteration=1)
-            row_length = len(row_grouping_instances)
-            row_grouping_label_type = display_unit_config.row_grouping_label_type
-            row_grouping_offset = (row_grouping_unit.get_sub_unit_instance_iteration_within_higher_level_iteration(
-                sub_unit=sub_unit,sub_unit_iteration=first_sub_iteration)) - 1
-            row_grouping_first_iteration = row_grouping_unit.get_iteration_at_bottom_level_iteration(
-                bottom_level_iteration=first_bottom_level_iteration)
-        else:
-            row_grouping_instances = []
-            row_length = 0
-            row_grouping_label_type = ''
-            row_grouping_offset = 0
-            row_grouping_first_iteration = 1
-
-        # pull block grouping information
-        block_grouping_unit = display_unit_config.block_grouping_time_unit if display_unit_config is not None else None
-        if block_grouping_unit:
-            first_bottom_level_iteration = time_unit.get_first_bottom_level_iteration_at_iteration(iteration=iteration)
-            first_block_unit_iteration = block_grouping_unit.get_iteration_at_bottom_level_iteration(
-                bottom_level_iteration=first_bottom_level_iteration)
-            last_bottom_level_iteration = first_bottom_level_iteration + len(instances) - 1
-            last_block_unit_iteration = block_grouping_unit.get_iteration_at_bottom_level_iteration(
-                bottom_level_iteration=last_bottom_level_iteration)
-            block_unit_iterations = list(range(first_block_unit_iteration, last_block_unit_iteration + 1))
-            block_start_iterations = block_grouping_unit.get_first_sub_unit_iteration_at_iterations(
-                iterations=block_unit_iterations, sub_unit=sub_unit)
-            block_names = block_grouping_unit.get_instance_display_names(iterations=block_unit_iterations)
-        else:
-            block_unit_iterations = [0]
-            block_start_iterations = []
-            block_names = ['']
-        blocks = zip(block_names, block_unit_iterations)
-
-        # build list of dates
-        calendar_dates = []
-        current_block = 0
-        for index, instance in enumerate(instances):
-            iteration = first_sub_iteration + index
-            # max_events_per_instance count includes linked events as well
-            # show native events first, then linked events if we still have room
-            max_linked_events = max(max_events_per_instance - len(events[index]), 0)
-            not_all_events_returned = len(events[index]) + len(linked_events[index]) > max_events_per_instance
-            if (len(block_start_iterations) > current_block + 1
-                    and iteration >= block_start_iterations[current_block + 1]):
-                current_block += 1
-            calendar_dates.append({
-                "name": instance[0],
-                "display_name": instance[0] if not sub_unit.secondary_date_format
-                else instance_display_names[index],
-                "time_unit_id": sub_unit.pk,
-                "iteration": iteration,
-                "events": EventSerializer(
-                    [e for e in events[index] if e.is_visible()][:max_events_per_instance], many=True).data,
-                "linked_display_names": linked_instance_display_names[index] if len(linked_instance_display_names) > 0
-                else [],
-                "linked_events": EventSerializer(
-                    [e for e in linked_events[index] if e.is_visible()][:max_linked_events], many=True).data,
-                "not_all_events_returned": not_all_events_returned,
-                "block_number": current_block + 1
-            })
-
-        # build header row/column
-        header_row = []
-        header_column = []
-        if row_grouping_label_type == 'names':
-            header_row = [name for name, length in row_grouping_instances]
-        if row_grouping_label_type == 'numbers':
-            header_row = [iteration for iteration, instance in enumerate(row_grouping_instances)]
-        if row_grouping_label_type == 'counts':
-            # 'counts' labels the rows, not the columns, as 'Row 1', 'Row 2' etc.
-            header_column_names = [row_grouping_unit.time_unit_name + ' ' + str(count + 1)
-                             for count in range(math.ceil((row_grouping_offset + len(instances)) / row_length))]
-            header_column_iterations = [count for count in range(
-                row_grouping_first_iteration, row_grouping_first_iteration + len(header_column_names))]
-            header_column = zip(header_column_names, header_column_iterations)
-
-        # pull related time unit pages
-        if display_unit_config is None:
-            sub_unit_page = [sub_unit.pk, None]
-            row_unit_page = None
-            block_unit_page = None
-        else:
-            sub_unit_page = \
-                [display_unit_config.sub_unit_page.time_unit.pk, display_unit_config.sub_unit_page.sub_unit.pk
-                if display_unit_config.sub_unit_page.sub_unit else None] \
-                    if display_unit_config.sub_unit_page else None
-            row_unit_page = \
-                [display_unit_config.row_unit_page.time_unit.pk, display_unit_config.row_unit_page.sub_unit.pk
-                if display_unit_config.row_unit_page.sub_unit else None] \
-                    if display_unit_config.row_unit_page else None
-            block_unit_page = \
-                [display_unit_config.block_unit_page.time_unit.pk, display_unit_config.block_unit_page.sub_unit.pk
-                if display_unit_config.block_unit_page.sub_unit else None] \
-                    if display_unit_config.block_unit_page else None
+        group_by_event_group = request.query_params.get('group_by_event_group', 'false')
+        if group_by_event_group not in ('1', 'true', 'True', '0', 'false', 'False'):
+            return Response({'message': 'ERROR: group_by_event_group must be true or false'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        group_by_event_group = group_by_event_group in ('1', 'true', 'True')
+
+        # count events in each sub unit instance without pulling the events themselves
+        try:
+            first_sub_iteration = time_unit.get_first_sub_unit_iteration_at_iteration(iteration=iteration,
+                                                                                      sub_unit=sub_unit)
+        except AttributeError:
+            return Response({'message': 'ERROR: sub_unit_id does not refer to a sub unit of time_unit_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        number_of_instances = time_unit.get_sub_unit_length_at_iteration(iteration=iteration, sub_unit=sub_unit) \
+            if sub_unit.pk != time_unit.pk else 1
+        iterations = [first_sub_iteration + x for x in range(number_of_instances)]
+        bottom_level_ranges = sub_unit.get_bottom_level_ranges_at_iterations(iterations)
+        if group_by_event_group:
+            counts = sub_unit.get_event_counts_at_iterations(iterations, group_by_event_group=True,
+                                                             bottom_level_ranges=bottom_level_ranges)
+        else:  # the event count pyramid doesn't track groups but answers plain counts in O(log n) per instance
+            counts = time_unit.calendar.get_event_counts_in_ranges(bottom_level_ranges)
 
         # assemble and send response
-        data = dict()
-        data["calendar_dates"] = calendar_dates
-        data["row_length"] = row_length
-        data["initial_offset"] = row_grouping_offset
-        data["header_row"] = header_row
-        data["header_column"] = header_column
-        data["blocks"] = blocks
-        data["sub_unit_page"] = sub_unit_page
-        data["row_unit_page"] = row_unit_page
-        data["block_unit_page"] = block_unit_page
-        return Response(data)
-
-
-class TimeUnitViewSet(viewsets.ReadOnlyModelViewSet):
+        instances = []
+        for index, instance_iteration in enumerate(iterations):
+            instance = {
+                "iteration": instance_iteration,
+                "first_bottom_level_iteration": bottom_level_ranges[index][0],
+                "last_bottom_level_iteration": bottom_level_ranges[index][1],
+            }
+            if group_by_event_group:
+                instance["event_count"] = sum(counts[index].values())
+                instance["event_group_counts"] = [{"event_group": event_group_id, "event_count": event_count}
+                                                  for event_group_id, event_count in counts[index].items()]
+            else:
+                instance["event_count"] = counts[index]
+            instances.append(instance)
+        return Response({'time_unit_id': sub_unit.pk, 'instances': instances})
+
+
+class TimeUnitViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    etag_scopes = [('pk', TimeUnit), ('calendar_id', Calendar)]
     queryset = TimeUnit.objects.all()
     serializer_class = TimeUnitSerializer
     permission_classes = [IsCalendarWorldCreatorOrPublic]
@@ -252,56 +593,50 @@ class TimeUnitViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         queryset = super(TimeUnitViewSet, self).get_queryset()
         if self.action == 'list':
-            if self.request.user.is_authenticated:
-                queryset = queryset.filter(calendar__world__creator_id=self.request.user.id) | \
-                           queryset.filter(calendar__world__public=True)
-            else:
-                queryset = queryset.filter(calendar__world__public=True)
+            queryset = queryset.filter(world_id__in=get_visible_world_ids(self.request.user))
             if 'calendar_id' in self.request.query_params:
                 calendar_id = int(self.request.query_params.get('calendar_id'))
                 queryset = queryset.filter(calendar_id=calendar_id)
         return queryset
 
 
-class TimeUnitBaseInstances(APIView):
+class TimeUnitBaseInstances(ConditionalGetMixin, APIView):
+    etag_scopes = [('time_unit_id', TimeUnit)]
+    fields = ['name', 'display_name', 'time_unit_id', 'iteration', 'first_bottom_level_iteration',
+              'last_bottom_level_iteration', 'events', 'linked_display_names', 'linked_events']
+
     def get(self, request):
         if 'time_unit_id' not in request.query_params or 'iteration' not in request.query_params:
             return Response({'message': 'ERROR: time_unit_id and iteration required'},
                             status=status.HTTP_400_BAD_REQUEST)
         time_unit_id = int(request.query_params.get('time_unit_id'))
         iteration = int(request.query_params.get('iteration'))
-        time_unit = get_object_or_404(TimeUnit, pk=time_unit_id)
-        if time_unit.calendar.world.creator != request.user and not time_unit.calendar.world.public:
+        # stages is a comma-separated list of the optional stages to do, all of them if it isn't given
+        stages = [stage for stage in request.query_params.get('stages').split(',') if stage] \
+            if 'stages' in request.query_params else calendar_pages.OPTIONAL_STAGES
+        if any(stage not in calendar_pages.OPTIONAL_STAGES for stage in stages):
+            return Response({'message': 'ERROR: stages must be a list of '
+                                        + ', '.join(calendar_pages.OPTIONAL_STAGES)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        time_unit = get_object_or_404(TimeUnit.objects.select_related('calendar'), pk=time_unit_id)
+        if not get_access_resolver(request).can_view(TimeUnit, time_unit.pk):
             return Response(
                 {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
                 status=status.HTTP_403_FORBIDDEN)
-        base_unit = time_unit.base_unit if time_unit.base_unit is not None else time_unit
-        instances = time_unit.get_base_unit_instances(iteration=iteration)
-        first_base_iteration = time_unit.get_first_base_unit_instance_iteration_at_iteration(iteration=iteration)
-        iterations = [first_base_iteration + x for x in range(len(instances))]
-        events = base_unit.get_events_at_iterations(iterations)
-        instance_display_names = base_unit.get_instance_display_names(iterations=iterations,
-                                                                      prefer_secondary=True)
-        linked_instance_display_names = base_unit.get_linked_instances_display_names(iterations, prefer_secondary=True)
-        linked_events = base_unit.get_linked_events_at_iterations(iterations)
-        data = []
-        for index, instance in enumerate(instances):
-            iteration = first_base_iteration + index
-            data.append({
-                "name": instance[0],
-                "display_name": instance[0] if not base_unit.secondary_date_format
-                else instance_display_names[index],
-                "time_unit_id": base_unit.pk,
-                "iteration": iteration,
-                "events": EventSerializer([e for e in events[index] if e.is_visible()], many=True).data,
-                "linked_display_names": linked_instance_display_names[index] if len(linked_instance_display_names) > 0
-                else [],
-                "linked_events": EventSerializer([e for e in linked_events[index] if e.is_visible()], many=True).data,
-            })
-        return Response(data)
-
-
-class TimeUnitInstanceDisplayName(APIView):
+        context = calendar_pages.load_page_context(time_unit.calendar, display_config_id=0)
+        page = calendar_pages.resolve_page(context, time_unit_id=time_unit.pk, iteration=iteration, sub_unit_id=None,
+                                           stages=stages)
+        # a copy, since the resolved page may be shared with other requests; every event, unlike on a calendar page
+        page = dict(page, max_events_per_instance=None)
+        if time_unit.base_unit_id is None:
+            page['instances'] = time_unit.get_base_unit_instances(iteration=iteration)  # named by its iteration
+        data = [{field: date[field] for field in self.fields} for date in calendar_pages.build_dates(context, page)]
+        return Response(data, headers={'Server-Timing': get_server_timing(context['timings'])})
+
+
+class TimeUnitInstanceDisplayName(ConditionalGetMixin, APIView):
+    etag_scopes = [('time_unit_id', TimeUnit)]
+
     def get(self, request):
         if 'time_unit_id' not in request.query_params or 'iteration' not in request.query_params:
             return Response({'message': 'ERROR: time_unit_id and iteration required'},
@@ -309,7 +644,8 @@ class TimeUnitInstanceDisplayName(APIView):
         time_unit_id = int(request.query_params.get('time_unit_id'))
         iteration = int(request.query_params.get('iteration'))
         time_unit = get_object_or_404(TimeUnit, pk=time_unit_id)
-        if time_unit.calendar.world.creator != request.user and not time_unit.calendar.world.public:
+        resolver = get_access_resolver(request)
+        if not resolver.can_view(TimeUnit, time_unit.pk):
             return Response(
                 {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
                 status=status.HTTP_403_FORBIDDEN)
@@ -321,16 +657,18 @@ class TimeUnitInstanceDisplayName(APIView):
         display_name = time_unit.get_instance_display_name(iteration=iteration, date_format=date_format,
                                                            prefer_secondary=prefer_secondary)
         page_link = ''
-        if time_unit.calendar.world.creator == request.user:
+        if resolver.is_creator(TimeUnit, time_unit.pk):
             page_link = reverse('fantasycalendar:time-unit-instance-detail',
-                                kwargs={'world_key': time_unit.calendar.world.pk,
-                                        'calendar_key': time_unit.calendar.pk,
+                                kwargs={'world_key': resolver.get_access(TimeUnit, time_unit.pk).world_id,
+                                        'calendar_key': time_unit.calendar_id,
                                         'pk': time_unit.pk,
                                         'iteration': iteration})
         return Response({'display_name': display_name, 'page_link': page_link})
 
 
-class TimeUnitEquivalentIteration(APIView):
+class TimeUnitEquivalentIteration(ConditionalGetMixin, APIView):
+    etag_scopes = [('time_unit_id', TimeUnit)]
+
     def get(self, request):
         if 'time_unit_id' not in request.query_params or 'iteration' not in request.query_params or \
                 'new_time_unit_id' not in request.query_params:
@@ -340,7 +678,7 @@ class TimeUnitEquivalentIteration(APIView):
         iteration = int(request.query_params.get('iteration'))
         new_time_unit_id = int(request.query_params.get('new_time_unit_id'))
         time_unit = get_object_or_404(TimeUnit, pk=time_unit_id)
-        if time_unit.calendar.world.creator != request.user and not time_unit.calendar.world.public:
+        if not get_access_resolver(request).can_view(TimeUnit, time_unit.pk):
             return Response(
                 {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
                 status=status.HTTP_403_FORBIDDEN)
@@ -354,7 +692,9 @@ class TimeUnitEquivalentIteration(APIView):
         return Response({'iteration': new_iteration})
 
 
-class TimeUnitContainedIteration(APIView):
+class TimeUnitContainedIteration(ConditionalGetMixin, APIView):
+    etag_scopes = [('time_unit_id', TimeUnit)]
+
     def get(self, request):
         if 'time_unit_id' not in request.query_params or 'iteration' not in request.query_params or \
                 'containing_time_unit_id' not in request.query_params:
@@ -364,7 +704,7 @@ class TimeUnitContainedIteration(APIView):
         iteration = int(request.query_params.get('iteration'))
         containing_time_unit_id = int(request.query_params.get('containing_time_unit_id'))
         time_unit = get_object_or_404(TimeUnit, pk=time_unit_id)
-        if time_unit.calendar.world.creator != request.user and not time_unit.calendar.world.public:
+        if not get_access_resolver(request).can_view(TimeUnit, time_unit.pk):
             return Response(
                 {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
                 status=status.HTTP_403_FORBIDDEN)
@@ -377,10 +717,73 @@ class TimeUnitContainedIteration(APIView):
         return Response({'iteration': contained_iteration})
 
 
-class EventViewSet(viewsets.ReadOnlyModelViewSet):
+class TimeUnitConversions(APIView):
+    MAX_CONVERSIONS = 10000
+
+    def post(self, request):
+        conversions = request.data.get('conversions') if isinstance(request.data, dict) else None
+        if not isinstance(conversions, list):
+            return Response({'message': 'ERROR: missing required fields conversions'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(conversions) > self.MAX_CONVERSIONS:
+            return Response({'message': 'ERROR: at most ' + str(self.MAX_CONVERSIONS) + ' conversions can be '
+                                        'requested at once'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            conversions = [(int(conversion['time_unit_id']), int(conversion['iteration']),
+                            int(conversion['target_unit_id'])) for conversion in conversions]
+        except (KeyError, TypeError, ValueError):
+            return Response({'message': 'ERROR: each conversion needs an integer time_unit_id, iteration and '
+                                        'target_unit_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # authenticate every unit at once, then load every unit on their calendars with their base units linked
+        unit_ids = set(time_unit_id for time_unit_id, _, _ in conversions) | \
+            set(target_unit_id for _, _, target_unit_id in conversions)
+        resolver = get_access_resolver(request)
+        resolver.get_accesses(TimeUnit, list(unit_ids))
+        if not all(resolver.can_view(TimeUnit, unit_id) for unit_id in unit_ids):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+        time_units = TimeUnit.objects.in_bulk(TimeUnit.objects.filter(calendar_id__in=TimeUnit.objects.filter(
+            pk__in=unit_ids).values('calendar_id')).values_list('pk', flat=True))
+        for time_unit in time_units.values():
+            time_unit.base_unit = time_units.get(time_unit.base_unit_id)
+
+        # convert each (time unit, target unit) pair's iterations together
+        by_pair = dict()  # {(time unit id, target unit id): [index in conversions]}
+        for index, (time_unit_id, _, target_unit_id) in enumerate(conversions):
+            by_pair.setdefault((time_unit_id, target_unit_id), []).append(index)
+        results = [None] * len(conversions)
+        for (time_unit_id, target_unit_id), indexes in by_pair.items():
+            time_unit = time_units[time_unit_id]
+            target_unit = time_units[target_unit_id]
+            if time_unit.calendar_id != target_unit.calendar_id:
+                return Response({'message': 'ERROR: time_unit_id and target_unit_id refer to time units on different '
+                                            'calendars'}, status=status.HTTP_400_BAD_REQUEST)
+            iterations = [conversions[index][1] for index in indexes]
+            equivalent_iterations = target_unit.get_iterations_at_bottom_level_iterations(
+                bottom_level_iterations=time_unit.get_first_bottom_level_iteration_at_iterations(iterations=iterations))
+            # a unit's iteration within the target is only known if the target is made up of it
+            containing_unit = target_unit
+            while containing_unit is not None and containing_unit.pk != time_unit.pk:
+                containing_unit = containing_unit.base_unit
+            contained_iterations = target_unit.get_sub_unit_instance_iterations_within_higher_level_iterations(
+                sub_unit=time_unit, sub_unit_iterations=iterations) if containing_unit is not None \
+                else [None] * len(iterations)
+            for index, equivalent_iteration, contained_iteration in zip(indexes, equivalent_iterations,
+                                                                        contained_iterations):
+                results[index] = {'equivalent_iteration': equivalent_iteration,
+                                  'contained_iteration': contained_iteration}
+        return Response({'conversions': results})
+
+
+class EventViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    # time_unit_id is ignored by the list unless iteration is given too
+    etag_scopes = [('pk', Event), ('time_unit_id', TimeUnit, 'iteration'), ('calendar_id', Calendar)]
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [IsCalendarWorldCreatorOrPublic]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         if self.action != 'list':
@@ -389,36 +792,114 @@ class EventViewSet(viewsets.ReadOnlyModelViewSet):
             time_unit_id = int(self.request.query_params.get('time_unit_id'))
             iteration = int(self.request.query_params.get('iteration'))
             time_unit = get_object_or_404(TimeUnit, pk=time_unit_id)
-            if not time_unit.calendar.world.public and self.request.user != time_unit.calendar.world.creator:
+            if not get_access_resolver(self.request).can_view(TimeUnit, time_unit.pk):
                 return []
             events = [e for e in time_unit.get_events_at_iteration(iteration) if e.is_visible()]
             return events
         else:
             queryset = super(EventViewSet, self).get_queryset()
-            if self.request.user.is_authenticated:
-                queryset = queryset.filter(calendar__world__creator_id=self.request.user.id) | \
-                           queryset.filter(calendar__world__public=True)
-            else:
-                queryset = queryset.filter(calendar__world__public=True)
+            queryset = queryset.filter(world_id__in=get_visible_world_ids(self.request.user))
             if 'calendar_id' in self.request.query_params:
                 calendar_id = int(self.request.query_params.get('calendar_id'))
                 queryset = queryset.filter(calendar_id=calendar_id)
             return queryset
 
+    def paginate_queryset(self, queryset):
+        if isinstance(queryset, list):
+            return None  # events at a single time unit instance are already a short list
+        return super(EventViewSet, self).paginate_queryset(queryset)
 
-class DateFormatViewSet(viewsets.ReadOnlyModelViewSet):
+
+class EventSearch(ConditionalGetMixin, APIView):
+    etag_scopes = [('calendar_id', Calendar)]
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request):
+        # validate required parameters
+        if 'calendar_id' not in request.query_params or 'q' not in request.query_params:
+            return Response({'message': 'ERROR: calendar_id and q required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # get calendar and authenticate
+        calendar = get_object_or_404(Calendar, pk=int(request.query_params.get('calendar_id')))
+        if not get_access_resolver(request).can_view(Calendar, calendar.pk):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+
+        # read remaining parameters
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', self.DEFAULT_PAGE_SIZE)), 1),
+                        self.MAX_PAGE_SIZE)
+
+        # pull one extra hit to tell whether there is another page
+        events = search_events(calendar_id=calendar.pk, text=request.query_params.get('q'), limit=page_size + 1,
+                               offset=(page - 1) * page_size)
+        has_more = len(events) > page_size
+        events = events[:page_size]
+
+        # format the start and end dates of every hit at once
+        bottom_level_unit = calendar.get_bottom_level_time_unit()
+        multi_instance_events = [event for event in events if event.get_span() > 0]
+        formatted_dates = bottom_level_unit.get_instance_display_names(
+            [event.bottom_level_iteration for event in events]
+            + [event.last_bottom_level_iteration for event in multi_instance_events])
+        formatted_last_dates = dict(zip([event.pk for event in multi_instance_events],
+                                        formatted_dates[len(events):]))
+
+        # assemble and send response
+        results = []
+        for index, event in enumerate(events):
+            result = EventSerializer(event).data
+            result["rank"] = event.rank
+            result["formatted_date"] = formatted_dates[index]
+            result["formatted_last_date"] = formatted_last_dates.get(event.pk)
+            results.append(result)
+        return Response({'page': page, 'page_size': page_size, 'has_more': has_more, 'results': results})
+
+
+class EventImport(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # validate required parameters
+        missing_fields = [param for param in ['calendar_id', 'format'] if param not in request.data]
+        if 'file' not in request.FILES:
+            missing_fields.append('file')
+        if len(missing_fields) > 0:
+            return Response({'message': 'ERROR: missing required fields ' + ' and '.join(missing_fields)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if request.data['format'] not in ROW_READERS:
+            return Response({'message': 'ERROR: format must be one of ' + ', '.join(sorted(ROW_READERS))},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # get calendar and authenticate; only creators can change data
+        calendar = get_object_or_404(Calendar, pk=int(request.data['calendar_id']))
+        if not get_access_resolver(request).is_creator(Calendar, calendar.pk):
+            return Response({'message': 'ERROR: you are not authenticated as the creator of this resource'},
+                            status=status.HTTP_403_FORBIDDEN)
+        date_format = None
+        if request.data.get('date_format_id'):
+            date_format = get_object_or_404(DateFormat, pk=int(request.data['date_format_id']),
+                                            calendar_id=calendar.pk)
+
+        # stream rows from the uploaded file rather than reading it all into memory
+        text_stream = io.TextIOWrapper(request.FILES['file'].file, encoding='utf-8', newline='')
+        stats = import_events(calendar, ROW_READERS[request.data['format']](text_stream), date_format=date_format)
+        return Response(stats, status=status.HTTP_201_CREATED if stats['events_created'] > 0 else status.HTTP_200_OK)
+
+
+class DateFormatViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    etag_scopes = [('pk', DateFormat), ('time_unit_id', TimeUnit), ('calendar_id', Calendar)]
     queryset = DateFormat.objects.all()
     serializer_class = DateFormatSerializer
     permission_classes = [IsCalendarWorldCreatorOrPublic]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = super(DateFormatViewSet, self).get_queryset()
         if self.action == 'list':
-            if self.request.user.is_authenticated:
-                queryset = queryset.filter(calendar__world__creator_id=self.request.user.id) | \
-                           queryset.filter(calendar__world__public=True)
-            else:
-                queryset = queryset.filter(calendar__world__public=True)
+            queryset = queryset.filter(world_id__in=get_visible_world_ids(self.request.user))
             if 'time_unit_id' in self.request.query_params:
                 time_unit_id = int(self.request.query_params.get('time_unit_id'))
                 queryset = queryset.filter(time_unit_id=time_unit_id)
@@ -428,7 +909,9 @@ class DateFormatViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class DateFormatReverse(APIView):
+class DateFormatReverse(ConditionalGetMixin, APIView):
+    etag_scopes = [('possible_formats', DateFormat)]
+
     def get(self, request):
         # initial validation
         required_params = [
@@ -464,7 +947,8 @@ class DateFormatReverse(APIView):
         })
 
 
-class DisplayConfigViewSet(viewsets.ReadOnlyModelViewSet):
+class DisplayConfigViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    etag_scopes = [('pk', DisplayConfig), ('calendar_id', Calendar)]
     queryset = DisplayConfig.objects.all()
     serializer_class = DisplayConfigSerializer
     permission_classes = [IsCalendarWorldCreatorOrPublic]
@@ -472,23 +956,22 @@ class DisplayConfigViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         queryset = super(DisplayConfigViewSet, self).get_queryset()
         if self.action == 'list':
-            if self.request.user.is_authenticated:
-                queryset = queryset.filter(calendar__world__creator_id=self.request.user.id) | \
-                           queryset.filter(calendar__world__public=True)
-            else:
-                queryset = queryset.filter(calendar__world__public=True)
+            queryset = queryset.filter(world_id__in=get_visible_world_ids(self.request.user))
             if 'display_unit_id' in self.request.query_params:
                 display_unit_id = int(self.request.query_params.get('display_unit_id'))
                 queryset = queryset.filter(display_unit_id=display_unit_id)
             elif 'calendar_id' in self.request.query_params:
                 calendar_id = int(self.request.query_params.get('calendar_id'))
                 queryset = queryset.filter(calendar_id=calendar_id)
-        return queryset
+        # each nested display unit config lists its searchable date formats
+        return queryset.prefetch_related('displayunitconfig_set__searchable_date_formats')
 
 
-class DateBookmarkViewSet(viewsets.ModelViewSet):
+class DateBookmarkViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
+    etag_scopes = [('pk', DateBookmark), ('bookmark_unit_id', TimeUnit), ('calendar_id', Calendar)]
     queryset = DateBookmark.objects.all()
     serializer_class = DateBookmarkSerializer
+    pagination_class = KeysetPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -500,20 +983,58 @@ class DateBookmarkViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super(DateBookmarkViewSet, self).get_queryset()
         if self.action == 'list':
+            queryset = queryset.filter(world_id__in=get_visible_world_ids(self.request.user))
             if self.request.user.is_authenticated:
-                queryset = queryset.filter(calendar__world__creator_id=self.request.user.id) | \
-                    queryset.filter(calendar__world__public=True)
                 queryset = queryset.filter(personal_bookmark_creator=None) | \
                     queryset.filter(personal_bookmark_creator=self.request.user)
             else:
-                queryset = queryset.filter(calendar__world__public=True).filter(personal_bookmark_creator=None)
+                queryset = queryset.filter(personal_bookmark_creator=None)
             if 'bookmark_unit_id' in self.request.query_params:
                 bookmark_unit_id = int(self.request.query_params.get('bookmark_unit_id'))
                 queryset = queryset.filter(bookmark_unit_id=bookmark_unit_id)
             elif 'calendar_id' in self.request.query_params:
                 calendar_id = int(self.request.query_params.get('calendar_id'))
                 queryset = queryset.filter(calendar_id=calendar_id)
-        return queryset
+        # display names are formatted from the bookmarked unit's default date format
+        return queryset.select_related('bookmark_unit__default_date_format', 'bookmark_sub_unit')
+
+
+class DateBookmarkEventCounts(ConditionalGetMixin, APIView):
+    etag_scopes = [('calendar_id', Calendar)]
+
+    def get(self, request):
+        # validate required parameters
+        if 'calendar_id' not in request.query_params:
+            return Response({'message': 'ERROR: calendar_id required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # get calendar and authenticate
+        calendar = get_object_or_404(Calendar, pk=int(request.query_params.get('calendar_id')))
+        if not get_access_resolver(request).can_view(Calendar, calendar.pk):
+            return Response(
+                {'message': 'ERROR: this resource is not public and you are not authenticated as its creator'},
+                status=status.HTTP_403_FORBIDDEN)
+
+        # pull the bookmarks this user can see, grouped by unit so each unit's ranges come from one call
+        bookmarks = DateBookmark.objects.filter(calendar_id=calendar.pk).select_related('bookmark_unit')
+        if request.user.is_authenticated:
+            bookmarks = bookmarks.filter(personal_bookmark_creator=None) | \
+                bookmarks.filter(personal_bookmark_creator=request.user)
+        else:
+            bookmarks = bookmarks.filter(personal_bookmark_creator=None)
+        bookmarks_by_unit = dict()
+        for bookmark in bookmarks:
+            bookmarks_by_unit.setdefault(bookmark.bookmark_unit_id, []).append(bookmark)
+        ordered_bookmarks = []
+        bottom_level_ranges = []
+        for unit_bookmarks in bookmarks_by_unit.values():
+            ordered_bookmarks += unit_bookmarks
+            bottom_level_ranges += unit_bookmarks[0].bookmark_unit.get_bottom_level_ranges_at_iterations(
+                [bookmark.bookmark_iteration for bookmark in unit_bookmarks])
+
+        # count events under every bookmark at once
+        event_counts = calendar.get_event_counts_in_ranges(bottom_level_ranges)
+        return Response([{"id": bookmark.pk, "event_count": event_counts[index]}
+                         for index, bookmark in enumerate(ordered_bookmarks)])
 
 
 class DateBookmarkCreatePersonal(APIView):
@@ -534,7 +1055,7 @@ class DateBookmarkCreatePersonal(APIView):
 
         # creation
         calendar = get_object_or_404(Calendar, pk=int(request.data['calendar']))
-        if not calendar.world.public and calendar.world.creator != request.user:
+        if not get_access_resolver(request).can_view(Calendar, calendar.pk):
             return Response(
                 {'message': "ERROR: this resource's world is not public and you are not authenticated as its creator"},
                 status=status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,195 @@
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+# how often, in seconds, values cached in this process are checked against the versions of their calendars even
+# when no request has seen their world change, to catch changes made by other processes
+POLL_INTERVAL = getattr(settings, 'CALENDAR_CACHE_POLL_INTERVAL', 1)
+
+
+class CalendarEntry(NamedTuple):
+    world_id: int
+    schema_version: int
+    content_version: int
+    schema_values: dict  # {key: value} for values built only from the calendar's schema
+    content_values: dict  # {key: value} for values built from its content as well
+
+
+class WorldEntry(NamedTuple):
+    schema_version: int
+    values: dict  # {key: value} for values built from the schema of every calendar in the world
+
+
+lock = threading.Lock()
+entries = dict()  # {calendar id: CalendarEntry}
+world_entries = dict()  # {world id: WorldEntry}
+world_versions = dict()  # {world id: (schema version, content version)} every entry in the world was checked at
+last_poll = 0
+
+
+def get_versions(calendar_ids: list[int]) -> dict[int, tuple[int, int, int, tuple[int, int]]]:
+    """
+    Return (world id, schema version, content version, world versions)
+    for each calendar with one of a list of ids that exists, by id,
+    where world versions is (schema version, content version) of its
+    world, all read in one query.
+    """
+    calendar_model = apps.get_model('fantasycalendar', 'Calendar')
+    return {pk: (world_id, schema_version, content_version, (world_schema_version, world_content_version))
+            for pk, world_id, schema_version, content_version, world_schema_version, world_content_version in
+            calendar_model.objects.filter(pk__in=calendar_ids).values_list(
+                'pk', 'world_id', 'schema_version', 'content_version', 'world__schema_version',
+                'world__content_version')}
+
+
+def poll():
+    """
+    Check the versions of every calendar and world with values cached
+    in this process, one query for each, and evict the values of the
+    ones that have changed since they were cached, or no longer exist.
+    """
+    global last_poll
+    last_poll = time.monotonic()
+    with lock:
+        calendar_ids = list(entries)
+        world_ids = list(world_entries)
+    if len(world_ids) > 0:
+        world_model = apps.get_model('fantasycalendar', 'World')
+        schema_versions = dict(world_model.objects.filter(pk__in=world_ids).values_list('pk', 'schema_version'))
+        with lock:
+            for world_id in world_ids:
+                world_entry = world_entries.get(world_id)
+                if world_entry is not None and world_entry.schema_version != schema_versions.get(world_id):
+                    del world_entries[world_id]
+    if len(calendar_ids) == 0:
+        return
+    versions = get_versions(calendar_ids)
+    with lock:
+        for calendar_id in calendar_ids:
+            entry = entries.get(calendar_id)
+            if entry is None:
+                continue
+            if calendar_id not in versions:
+                del entries[calendar_id]
+                continue
+            world_id, schema_version, content_version, world_version = versions[calendar_id]
+            world_versions[world_id] = world_version
+            if schema_version != entry.schema_version:
+                del entries[calendar_id]
+            elif content_version != entry.content_version:
+                entries[calendar_id] = entry._replace(content_version=content_version, content_values=dict())
+
+
+def check_world(world_id: int, schema_version: int, content_version: int):
+    """
+    Poll if a world has changed since the values cached for its
+    calendars were last checked, given its versions as just read by
+    the caller, so nothing the caller builds from cached values after
+    reading those versions is older than they are. Costs nothing when
+    the world hasn't changed.
+    """
+    with lock:
+        world_entry = world_entries.get(world_id)
+        if world_entry is not None and world_entry.schema_version != schema_version:
+            del world_entries[world_id]
+        checked = world_versions.get(world_id)
+    if checked is not None and checked != (schema_version, content_version):
+        poll()
+
+
+def get(calendar_id: int, key: str, build: Callable, content: bool = False):
+    """
+    Return the value cached in this process under key for the calendar
+    with the given id, building it with build() if it isn't cached.
+
+    Values are built from the calendar's schema unless content is
+    True, and are evicted when the matching version of the calendar
+    changes. They are shared by every thread in the process, so they
+    must not be modified.
+    """
+    if time.monotonic() - last_poll >= POLL_INTERVAL:
+        poll()
+    with lock:
+        entry = entries.get(calendar_id)
+    if entry is None:
+        # the versions are read before the value is built, so a change made in between is caught by the next poll
+        versions = get_versions([calendar_id]).get(calendar_id)
+        if versions is None:
+            return build()
+        world_id, schema_version, content_version, world_version = versions
+        with lock:
+            # a world checked at older versions keeps them, since its other entries haven't been checked since
+            world_versions.setdefault(world_id, world_version)
+            entry = entries.setdefault(calendar_id, CalendarEntry(
+                world_id=world_id, schema_version=schema_version, content_version=content_version,
+                schema_values=dict(), content_values=dict()))
+    values = entry.content_values if content else entry.schema_values
+    value = values.get(key)
+    if value is None:
+        value = values[key] = build()
+    return value
+
+
+def get_world(world_id: int, key: str, build: Callable):
+    """
+    Return the value cached in this process under key for the world
+    with the given id, building it with build() if it isn't cached.
+
+    Values are built from the schema of the world's calendars and are
+    evicted when the world's schema version changes, which it does
+    whenever any of its calendars' schema does. They are shared by
+    every thread in the process, so they must not be modified.
+    """
+    if time.monotonic() - last_poll >= POLL_INTERVAL:
+        poll()
+    with lock:
+        world_entry = world_entries.get(world_id)
+    if world_entry is None:
+        schema_version = apps.get_model('fantasycalendar', 'World').objects.filter(pk=world_id).values_list(
+            'schema_version', flat=True).first()
+        if schema_version is None:
+            return build()
+        with lock:
+            world_entry = world_entries.setdefault(world_id, WorldEntry(schema_version=schema_version,
+                                                                        values=dict()))
+    value = world_entry.values.get(key)
+    if value is None:
+        value = world_entry.values[key] = build()
+    return value
+
+
+def evict(world_id: int, calendar_id: int | None, schema: bool = True):
+    with lock:
+        if schema:
+            world_entries.pop(world_id, None)
+        entry = entries.get(calendar_id)
+        if entry is None:
+            return
+        if schema:
+            del entries[calendar_id]
+        else:
+            entries[calendar_id] = entry._replace(content_values=dict())
+
+
+def publish_change(world_id: int, calendar_id: int = None, schema: bool = False):
+    """
+    Evict the values cached in this process for a world and, if one is
+    given, its calendar with calendar_id as soon as they change, rather
+    than when the change is next noticed by a poll. They are evicted
+    again when the current transaction commits, so values built from
+    the data as it was before the commit are evicted too.
+    """
+    evict(world_id, calendar_id, schema=schema)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: evict(world_id, calendar_id, schema=schema))
+
+
+def clear():
+    with lock:
+        entries.clear()
+        world_entries.clear()
+        world_versions.clear()
@@ -0,0 +1,518 @@
+import asyncio
+import contextlib
+import functools
+import itertools
+import math
+import time
+from typing import Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from .models import Calendar, TimeUnit, DisplayConfig
+from .serializers import EventSerializer
+
+# pages with at least this many dates are built and sent a run of dates at a time rather than whole, and not cached
+STREAM_MIN_DATES = getattr(settings, 'CALENDAR_PAGE_STREAM_MIN_DATES', 2000)
+STREAM_CHUNK_SIZE = getattr(settings, 'CALENDAR_PAGE_STREAM_CHUNK_SIZE', 500)
+
+# the stages of building a page that can be left out; resolve_page picks the ones the display config shows
+OPTIONAL_STAGES = ['events', 'display_names', 'linked_display_names', 'linked_events']
+
+# columns of a columnar page's dates sent as the first value then the difference from the value before
+DELTA_COLUMNS = ['time_unit_id', 'iteration', 'first_bottom_level_iteration', 'last_bottom_level_iteration',
+                 'block_number']
+# columns of a columnar page's dates holding lists of events, sent as indexes into the page's event table
+EVENT_COLUMNS = ['events', 'linked_events']
+
+
+def load_page_context(calendar: Calendar, display_config_id: int | None, time_units: list = None) -> dict:
+    """
+    Return the objects every page of a calendar is built from, loaded
+    once so several pages can share them: the calendar, its time units
+    by id, the display config (the calendar default if
+    display_config_id is None and no display config if it is 0 or
+    less) with its pages prefetched, and those pages by (time unit id,
+    sub unit id), with their links to each other and to the time units
+    already in place. Time spent in each stage of building pages from
+    the context is added up in its timings.
+
+    time_units may be passed in if the calendar's time units are
+    already loaded.
+    """
+    if time_units is None:
+        time_units = TimeUnit.objects.filter(calendar_id=calendar.pk).select_related(
+            'default_date_format', 'secondary_date_format')
+    time_units = {time_unit.pk: time_unit for time_unit in time_units}
+    for time_unit in time_units.values():
+        time_unit.calendar = calendar
+        if time_unit.base_unit_id is None or time_unit.base_unit_id in time_units:
+            time_unit.base_unit = time_units.get(time_unit.base_unit_id)
+    if display_config_id is None:
+        display_config_id = calendar.default_display_config_id  # None is OK here
+    if display_config_id is not None and display_config_id > 0:
+        display_config = get_object_or_404(DisplayConfig.objects.prefetch_related('displayunitconfig_set'),
+                                           pk=display_config_id)
+    else:  # id of 0 or less will force using no display config
+        display_config = None   # but not providing an id at all will use the calendar default
+    display_unit_configs = dict()
+    if display_config is not None:
+        by_id = {display_unit_config.pk: display_unit_config
+                 for display_unit_config in display_config.displayunitconfig_set.all()}
+        for display_unit_config in by_id.values():
+            for field_name in ['time_unit', 'sub_unit', 'row_grouping_time_unit', 'block_grouping_time_unit']:
+                target_id = getattr(display_unit_config, field_name + '_id')
+                if target_id in time_units:
+                    setattr(display_unit_config, field_name, time_units[target_id])
+            for field_name in ['sub_unit_page', 'row_unit_page', 'block_unit_page']:
+                target_id = getattr(display_unit_config, field_name + '_id')
+                if target_id is None or target_id in by_id:
+                    setattr(display_unit_config, field_name, by_id.get(target_id))
+            display_unit_configs[(display_unit_config.time_unit_id, display_unit_config.sub_unit_id)] = \
+                display_unit_config
+    return {
+        'calendar': calendar,
+        'time_units': time_units,
+        'display_config': display_config,
+        'display_unit_configs': display_unit_configs,
+        'timings': dict(),  # {stage: milliseconds spent in it by every page built from this context}
+    }
+
+
+@contextlib.contextmanager
+def timed(context: dict, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        context['timings'][stage] = context['timings'].get(stage, 0) + (time.perf_counter() - start) * 1000
+
+
+def resolve_page(context: dict, time_unit_id: int, iteration: int, sub_unit_id: int | None,
+                 stages: Iterable[str] = None) -> dict:
+    """
+    Return the parts of a page that don't depend on events: the units
+    and display page it shows, its sub unit instances, their
+    iterations and their bottom level ranges, and the blocks they are
+    grouped into. Raise Http404 if the units aren't on the context's
+    calendar or the display config has no such page.
+
+    Of OPTIONAL_STAGES, only those in stages are done when the page is
+    built; if stages is None, only those that pull something the page
+    shows are.
+    """
+    time_unit = context['time_units'].get(time_unit_id)
+    if time_unit is None:
+        raise Http404('No time unit ' + str(time_unit_id) + ' on this calendar')
+    if sub_unit_id is not None:
+        sub_unit = context['time_units'].get(sub_unit_id)
+        if sub_unit is None:
+            raise Http404('No time unit ' + str(sub_unit_id) + ' on this calendar')
+    else:
+        sub_unit = time_unit.base_unit if time_unit.base_unit is not None else time_unit
+    if context['display_config'] is not None:
+        # if we are using a display_config only allow extant pages, and always use the "single" page if a
+        # different sub_unit_id was not explicitly requested
+        display_unit_config = context['display_unit_configs'].get(
+            (time_unit.pk, sub_unit.pk if sub_unit_id is not None and sub_unit.pk != time_unit.pk else None))
+        if display_unit_config is None:
+            raise Http404('No such page in this display config')
+    else:
+        display_unit_config = None
+    if stages is None:
+        stages = get_shown_stages(sub_unit, display_unit_config)
+    with timed(context, 'instances'):
+        instances = time_unit.get_sub_unit_instances(iteration=iteration, sub_unit=sub_unit)
+        first_sub_iteration = time_unit.get_first_sub_unit_iteration_at_iteration(iteration=iteration,
+                                                                                  sub_unit=sub_unit)
+        iterations = [first_sub_iteration + x for x in range(len(instances))]
+        first_bottom_level_iteration = time_unit.get_first_bottom_level_iteration_at_iteration(iteration=iteration)
+        bottom_level_ranges = sub_unit.get_bottom_level_ranges_at_iterations(iterations)
+
+    # pull block grouping information
+    with timed(context, 'grouping'):
+        block_grouping_unit = display_unit_config.block_grouping_time_unit if display_unit_config is not None else None
+        if block_grouping_unit:
+            first_block_unit_iteration = block_grouping_unit.get_iteration_at_bottom_level_iteration(
+                bottom_level_iteration=first_bottom_level_iteration)
+            last_bottom_level_iteration = first_bottom_level_iteration + len(instances) - 1
+            last_block_unit_iteration = block_grouping_unit.get_iteration_at_bottom_level_iteration(
+                bottom_level_iteration=last_bottom_level_iteration)
+            block_unit_iterations = list(range(first_block_unit_iteration, last_block_unit_iteration + 1))
+            block_start_iterations = block_grouping_unit.get_first_sub_unit_iteration_at_iterations(
+                iterations=block_unit_iterations, sub_unit=sub_unit)
+            block_names = block_grouping_unit.get_instance_display_names(iterations=block_unit_iterations)
+        else:
+            block_unit_iterations = [0]
+            block_start_iterations = []
+            block_names = ['']
+    return {
+        'time_unit': time_unit,
+        'sub_unit': sub_unit,
+        'iteration': iteration,
+        'display_unit_config': display_unit_config,
+        'instances': instances,
+        'first_sub_iteration': first_sub_iteration,
+        'iterations': iterations,
+        'bottom_level_ranges': bottom_level_ranges,
+        'first_bottom_level_iteration': first_bottom_level_iteration,
+        'block_unit_iterations': block_unit_iterations,
+        'block_start_iterations': block_start_iterations,
+        'block_names': block_names,
+        'stages': set(stages),
+        'max_events_per_instance': display_unit_config.max_events_per_instance
+        if display_unit_config is not None and display_unit_config.max_events_per_instance > 0 else 99,
+    }
+
+
+def get_shown_stages(sub_unit: TimeUnit, display_unit_config) -> set[str]:
+    """
+    Return the OPTIONAL_STAGES that pull something a page of sub_unit
+    laid out by display_unit_config (None for no display config) shows.
+    """
+    stages = {'events'}
+    if sub_unit.secondary_date_format_id is not None:
+        stages.add('display_names')
+    if display_unit_config is not None and display_unit_config.show_linked_instance_display_names:
+        stages.add('linked_display_names')
+    if display_unit_config is not None and display_unit_config.show_linked_instance_events:
+        stages.add('linked_events')
+    return stages
+
+
+def build_pages(context: dict, pages: list[dict]) -> list[dict]:
+    """
+    Return the data for each page resolved by resolve_page from the
+    same context.
+
+    Optimized to minimize hits to the database when building several
+    pages at once: events are counted for every instance on every page
+    in one pass over the event count pyramid, and then pulled in one
+    query for only the instances that have any.
+    """
+    data = []
+    for page, page_events in zip(pages, load_events(context, pages)):
+        data.append(assemble_page(context, page, load_run(context, page, page['iterations'], *page_events)))
+    return data
+
+
+def build_dates(context: dict, page: dict) -> list[dict]:
+    """
+    Return just the dates of a page resolved by resolve_page from a
+    context, without laying the page out.
+    """
+    run = load_run(context, page, page['iterations'], *load_events(context, [page])[0])
+    with timed(context, 'format'):
+        return list(iter_calendar_dates(page, [run]))
+
+
+def run_stage(context: dict, name: str, stage):
+    try:
+        with timed(context, name):
+            return stage()
+    finally:
+        connections.close_all()  # only this worker thread's connections
+
+
+async def abuild_page(context: dict, page: dict) -> dict:
+    """
+    Return the data for a page resolved by resolve_page from a context,
+    the same as build_pages, with the stages that don't depend on each
+    other run at the same time in worker threads: pulling its events,
+    each of the page's RUN_STAGES and laying it out.
+
+    Each stage uses its own database connection, which is closed when
+    it is done, so a stage never waits for another's queries.
+    """
+    iterations = page['iterations']
+    stages = {'events': functools.partial(load_events, context, [page]),
+              'grouping': functools.partial(get_page_layout, page)}
+    stages.update({name: functools.partial(stage, page, iterations)
+                   for name, stage in RUN_STAGES.items() if name in page['stages']})
+    results = dict(zip(stages.keys(), await asyncio.gather(
+        *[sync_to_async(run_stage, thread_sensitive=False)(context, name, stage) for name, stage in stages.items()])))
+    event_counts, events = results['events'][0]
+    run = {name: results.get(name) for name in RUN_STAGES}
+    run.update(iterations=iterations, event_counts=event_counts, events=events)
+    with timed(context, 'format'):
+        data = {'calendar_dates': list(iter_calendar_dates(page, [run]))}
+    data.update(results['grouping'])
+    return data
+
+
+def get_events_in_ranges(calendar: Calendar, bottom_level_ranges: list[tuple[int, int]]) \
+        -> tuple[list[int], list[list]]:
+    """
+    Return the event count and the events of each of a list of bottom
+    level ranges of a calendar. Events are counted first and only
+    pulled for the ranges that have any.
+    """
+    event_counts = calendar.get_event_counts_in_ranges(bottom_level_ranges)
+    counted = [index for index, event_count in enumerate(event_counts) if event_count > 0]
+    events = [[] for _ in bottom_level_ranges]
+    for index, range_events in zip(counted, calendar.get_events_in_ranges(
+            [bottom_level_ranges[index] for index in counted])):
+        events[index] = range_events
+    return event_counts, events
+
+
+def load_events(context: dict, pages: list[dict], start: int = 0, end: int = None) \
+        -> list[tuple[list[int] | None, list[list] | None]]:
+    """
+    Return the event counts and events of the instances of each page
+    resolved by resolve_page from a context, from start to end, pulled
+    for every page at once. Pages without the events stage get
+    (None, None).
+    """
+    bottom_level_ranges = [page['bottom_level_ranges'][start:end] if 'events' in page['stages'] else []
+                           for page in pages]
+    all_ranges = [bottom_level_range for ranges in bottom_level_ranges for bottom_level_range in ranges]
+    event_counts, events = [], []
+    if len(all_ranges) > 0:
+        with timed(context, 'events'):
+            event_counts, events = get_events_in_ranges(context['calendar'], all_ranges)
+    page_events = []
+    for page, ranges in zip(pages, bottom_level_ranges):
+        if 'events' in page['stages']:
+            page_events.append((event_counts[:len(ranges)], events[:len(ranges)]))
+            event_counts, events = event_counts[len(ranges):], events[len(ranges):]
+        else:
+            page_events.append((None, None))
+    return page_events
+
+
+def get_display_names(page: dict, iterations: list[int]) -> list[str]:
+    return page['sub_unit'].get_instance_display_names(iterations=iterations, prefer_secondary=True)
+
+
+def get_linked_display_names(page: dict, iterations: list[int]) -> list[list[str]]:
+    return page['sub_unit'].get_linked_instances_display_names(iterations, prefer_secondary=True)
+
+
+def get_linked_events(page: dict, iterations: list[int]) -> list[list]:
+    return page['sub_unit'].get_linked_events_at_iterations(iterations)
+
+
+# what the dates of a run of a page's iterations show besides their own events, each pulled independently
+RUN_STAGES = {
+    'display_names': get_display_names,
+    'linked_display_names': get_linked_display_names,
+    'linked_events': get_linked_events,
+}
+
+
+def load_run(context: dict, page: dict, iterations: list[int], event_counts: list[int] | None,
+             events: list[list] | None) -> dict:
+    """
+    Return what the dates of a run of a page's iterations show, for
+    iter_calendar_dates, given the event count and events of each (None
+    if the page has no events stage). Only the page's RUN_STAGES are
+    done; the rest are None.
+    """
+    run = {'iterations': iterations, 'event_counts': event_counts, 'events': events}
+    for name, stage in RUN_STAGES.items():
+        run[name] = None
+        if name in page['stages']:
+            with timed(context, name):
+                run[name] = stage(page, iterations)
+    return run
+
+
+def iter_page_runs(context: dict, page: dict, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yield what the dates of a page resolved by resolve_page from a
+    context show, chunk_size dates at a time, for iter_calendar_dates.
+    """
+    for start in range(0, len(page['iterations']), chunk_size):
+        event_counts, events = load_events(context, [page], start=start, end=start + chunk_size)[0]
+        yield load_run(context, page, page['iterations'][start:start + chunk_size], event_counts, events)
+
+
+def iter_calendar_dates(page: dict, runs: Iterable[dict]) -> Iterator[dict]:
+    """
+    Yield the dates of a page resolved by resolve_page one at a time,
+    given what each run of them shows in order, from load_run. A page
+    can be sent a run at a time without ever holding all its dates.
+    """
+    sub_unit = page['sub_unit']
+    instances = page['instances']
+    block_start_iterations = page['block_start_iterations']
+    max_events_per_instance = page['max_events_per_instance']  # None for no limit
+
+    current_block = 0
+    start = 0
+    for run in runs:
+        iterations = run['iterations']
+        no_events = [[] for _ in iterations]
+        event_counts = run['event_counts'] if run['event_counts'] is not None else [0 for _ in iterations]
+        events = run['events'] if run['events'] is not None else no_events
+        linked_events = run['linked_events'] if run['linked_events'] is not None else no_events
+        bottom_level_ranges = page['bottom_level_ranges'][start:start + len(iterations)]
+        for index, iteration in enumerate(iterations):
+            instance = instances[start + index]
+            # max_events_per_instance count includes linked events as well
+            # show native events first, then linked events if we still have room
+            if max_events_per_instance is not None:
+                max_linked_events = max(max_events_per_instance - len(events[index]), 0)
+                not_all_events_returned = len(events[index]) + len(linked_events[index]) > max_events_per_instance
+            else:
+                max_linked_events = None
+                not_all_events_returned = False
+            if (len(block_start_iterations) > current_block + 1
+                    and iteration >= block_start_iterations[current_block + 1]):
+                current_block += 1
+            yield {
+                "name": instance[0],
+                "display_name": instance[0] if not sub_unit.secondary_date_format or run['display_names'] is None
+                else run['display_names'][index],
+                "time_unit_id": sub_unit.pk,
+                "iteration": iteration,
+                "first_bottom_level_iteration": bottom_level_ranges[index][0],
+                "last_bottom_level_iteration": bottom_level_ranges[index][1],
+                "events": EventSerializer(
+                    [e for e in events[index] if e.is_visible()][:max_events_per_instance], many=True).data,
+                "linked_display_names": run['linked_display_names'][index]
+                if run['linked_display_names'] else [],
+                "linked_events": EventSerializer(
+                    [e for e in linked_events[index] if e.is_visible()][:max_linked_events], many=True).data,
+                "event_count": event_counts[index],
+                "not_all_events_returned": not_all_events_returned,
+                "block_number": current_block + 1
+            }
+        start += len(iterations)
+
+
+def get_page_layout(page: dict) -> dict:
+    """
+    Return the data for a page resolved by resolve_page apart from its
+    dates: its row and block grouping, headers and related pages.
+    """
+    sub_unit = page['sub_unit']
+    display_unit_config = page['display_unit_config']
+    instances = page['instances']
+    first_bottom_level_iteration = page['first_bottom_level_iteration']
+
+    # pull row grouping information
+    row_grouping_unit = display_unit_config.row_grouping_time_unit if display_unit_config is not None else None
+    if row_grouping_unit:
+        row_grouping_instances = row_grouping_unit.get_base_unit_instances(iteration=1)
+        row_length = len(row_grouping_instances)
+        row_grouping_label_type = display_unit_config.row_grouping_label_type
+        row_grouping_offset = (row_grouping_unit.get_sub_unit_instance_iteration_within_higher_level_iteration(
+            sub_unit=sub_unit,sub_unit_iteration=page['first_sub_iteration'])) - 1
+        row_grouping_first_iteration = row_grouping_unit.get_iteration_at_bottom_level_iteration(
+            bottom_level_iteration=first_bottom_level_iteration)
+    else:
+        row_grouping_instances = []
+        row_length = 0
+        row_grouping_label_type = ''
+        row_grouping_offset = 0
+        row_grouping_first_iteration = 1
+    blocks = zip(page['block_names'], page['block_unit_iterations'])
+
+    # build header row/column
+    header_row = []
+    header_column = []
+    if row_grouping_label_type == 'names':
+        header_row = [name for name, length in row_grouping_instances]
+    if row_grouping_label_type == 'numbers':
+        header_row = [iteration for iteration, instance in enumerate(row_grouping_instances)]
+    if row_grouping_label_type == 'counts':
+        # 'counts' labels the rows, not the columns, as 'Row 1', 'Row 2' etc.
+        header_column_names = [row_grouping_unit.time_unit_name + ' ' + str(count + 1)
+                         for count in range(math.ceil((row_grouping_offset + len(instances)) / row_length))]
+        header_column_iterations = [count for count in range(
+            row_grouping_first_iteration, row_grouping_first_iteration + len(header_column_names))]
+        header_column = zip(header_column_names, header_column_iterations)
+
+    # pull related time unit pages
+    if display_unit_config is None:
+        sub_unit_page = [sub_unit.pk, None]
+        row_unit_page = None
+        block_unit_page = None
+    else:
+        sub_unit_page = [display_unit_config.sub_unit_page.time_unit_id, display_unit_config.sub_unit_page.sub_unit_id] \
+            if display_unit_config.sub_unit_page else None
+        row_unit_page = [display_unit_config.row_unit_page.time_unit_id, display_unit_config.row_unit_page.sub_unit_id] \
+            if display_unit_config.row_unit_page else None
+        block_unit_page = \
+            [display_unit_config.block_unit_page.time_unit_id, display_unit_config.block_unit_page.sub_unit_id] \
+            if display_unit_config.block_unit_page else None
+
+    # assemble everything but the dates
+    data = dict()
+    data["row_length"] = row_length
+    data["initial_offset"] = row_grouping_offset
+    data["header_row"] = header_row
+    data["header_column"] = list(header_column)
+    data["blocks"] = list(blocks)
+    data["sub_unit_page"] = sub_unit_page
+    data["row_unit_page"] = row_unit_page
+    data["block_unit_page"] = block_unit_page
+    return data
+
+
+def assemble_page(context: dict, page: dict, run: dict) -> dict:
+    """
+    Return the data for a page resolved by resolve_page from a context
+    given what all its dates show, from load_run.
+    """
+    with timed(context, 'format'):
+        data = {'calendar_dates': list(iter_calendar_dates(page, [run]))}
+    with timed(context, 'grouping'):
+        data.update(get_page_layout(page))
+    return data
+
+
+def to_columnar(data: dict) -> dict:
+    """
+    Return the data for a page from assemble_page in columnar form: its
+    dates as one list per key rather than one dict per date, with
+    iterations and ids delta encoded, and every event stored once in an
+    event table (also one list per key) that the dates refer to by
+    index. Everything else on the page is left as it is.
+    """
+    dates = data['calendar_dates']
+    event_indexes = dict()  # {event id: index in the event table}
+    event_table = dict()
+    columns = dict()
+    for key in (dates[0].keys() if len(dates) > 0 else []):
+        values = [date[key] for date in dates]
+        if key in DELTA_COLUMNS:
+            values = values[:1] + [value - previous for previous, value in zip(values, values[1:])]
+        elif key in EVENT_COLUMNS:
+            indexes = []
+            for events in values:
+                for event in events:
+                    if event['id'] not in event_indexes:
+                        event_indexes[event['id']] = len(event_indexes)
+                        for event_key, event_value in event.items():
+                            event_table.setdefault(event_key, []).append(event_value)
+                indexes.append([event_indexes[event['id']] for event in events])
+            values = indexes
+        columns[key] = values
+    columnar = dict(data)
+    columnar['calendar_dates'] = {'length': len(dates), 'columns': columns}
+    columnar['event_table'] = event_table
+    return columnar
+
+
+def from_columnar(columnar: dict) -> dict:
+    """
+    Return the data for a page from its columnar form from to_columnar,
+    the same as assemble_page returned it.
+    """
+    data = dict(columnar)
+    event_table = data.pop('event_table')
+    events = [dict(zip(event_table.keys(), values)) for values in zip(*event_table.values())]
+    columns = dict()
+    for key, values in columnar['calendar_dates']['columns'].items():
+        if key in DELTA_COLUMNS:
+            values = list(itertools.accumulate(values))
+        elif key in EVENT_COLUMNS:
+            values = [[events[index] for index in indexes] for indexes in values]
+        columns[key] = values
+    data['calendar_dates'] = [dict(zip(columns.keys(), values)) for values in zip(*columns.values())]
+    return data
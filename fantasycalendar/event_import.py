@@ -0,0 +1,241 @@
+import csv
+import json
+import time
+
+from django.db import transaction
+from .models import World, Calendar, DateFormat, Event, EventCountBucket, EventGroup
+
+DEFAULT_CHUNK_SIZE = 1000  # rows parsed, resolved and written per transaction
+MAX_REPORTED_ERRORS = 1000  # rows with errors beyond this are counted but not described
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+def read_csv_rows(text_stream):
+    """
+    Yield a dict for each row of a CSV file with a header row, reading
+    the file lazily.
+    """
+    yield from csv.DictReader(text_stream)
+
+
+def read_jsonl_rows(text_stream):
+    """
+    Yield a dict for each non-blank line of a JSON Lines file, reading
+    the file lazily. A line that isn't a JSON object is yielded as a
+    ValueError so it can be reported against its row.
+    """
+    for line in text_stream:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                row = ValueError('not valid JSON: ' + str(error))
+            yield row if isinstance(row, (dict, ValueError)) else ValueError('not a JSON object')
+
+
+ROW_READERS = {
+    'csv': read_csv_rows,
+    'jsonl': read_jsonl_rows,
+}
+
+
+def read_optional_bool(value) -> bool | None:
+    """
+    Return a bool from a CSV string or JSON value, or None if blank.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value == '':
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError('"' + value + '" is not true or false')
+
+
+def read_optional_int(value) -> int | None:
+    """
+    Return an int from a CSV string or JSON value, or None if blank.
+    """
+    if value is None or str(value).strip() == '':
+        return None
+    return int(value)
+
+
+def parse_row(row: dict, event_groups: dict[str, EventGroup]) -> dict:
+    """
+    Return the fields of an event from a row, with dates left as given.
+    Raises ValueError with a readable message if the row is invalid.
+    """
+    event_name = str(row.get('event_name') or '').strip()
+    if not event_name:
+        raise ValueError('event_name is required')
+    if len(event_name) > Event._meta.get_field('event_name').max_length:
+        raise ValueError('event_name is too long')
+    event_description = str(row.get('event_description') or '')
+    if len(event_description) > Event._meta.get_field('event_description').max_length:
+        raise ValueError('event_description is too long')
+    event_group = None
+    if row.get('event_group'):
+        if str(row['event_group']) not in event_groups:
+            raise ValueError('event_group "' + str(row['event_group']) + '" does not exist on this calendar')
+        event_group = event_groups[str(row['event_group'])]
+    fields = {
+        'event_name': event_name,
+        'event_description': event_description,
+        'bottom_level_iteration': read_optional_int(row.get('bottom_level_iteration')),
+        'last_bottom_level_iteration': read_optional_int(row.get('last_bottom_level_iteration')),
+        'date': str(row.get('date') or '').strip() or None,
+        'last_date': str(row.get('last_date') or '').strip() or None,
+        'display_order': read_optional_int(row.get('display_order')),
+        'event_group': event_group,
+        'visible': read_optional_bool(row.get('visible')),
+        'navigable': read_optional_bool(row.get('navigable')),
+    }
+    if fields['bottom_level_iteration'] is None and fields['date'] is None:
+        raise ValueError('bottom_level_iteration or date is required')
+    return fields
+
+
+def resolve_dates(parsed_rows: list[tuple[int, dict]], date_format: DateFormat | None, errors: list):
+    """
+    Fill in bottom_level_iteration and last_bottom_level_iteration from
+    the formatted dates of the parsed rows, reading every date in the
+    list at once, and drop rows whose dates can't be read.
+
+    A formatted date for a time unit above the bottom level resolves to
+    the first bottom level instance of that unit for a start date and
+    the last one for an end date.
+    """
+    dated = [(index, key) for index, (_, fields) in enumerate(parsed_rows)
+             for key in ('date', 'last_date') if fields[key] is not None]
+    if len(dated) == 0:
+        return parsed_rows
+    if date_format is None:
+        for index in sorted({index for index, _ in dated}, reverse=True):
+            errors.append((parsed_rows[index][0], 'date given but no date format chosen'))
+            del parsed_rows[index]
+        return parsed_rows
+    iterations = date_format.get_iterations([parsed_rows[index][1][key] for index, key in dated])
+    readable = [iteration for iteration in iterations if iteration is not None]
+    firsts = iter(date_format.time_unit.get_first_bottom_level_iteration_at_iterations(readable))
+    lasts = iter(date_format.time_unit.get_last_bottom_level_iteration_at_iterations(readable))
+    bad_rows = set()
+    for (index, key), iteration in zip(dated, iterations):
+        if iteration is None:
+            bad_rows.add(index)
+            continue
+        first, last = next(firsts), next(lasts)
+        if key == 'date':
+            parsed_rows[index][1]['bottom_level_iteration'] = first
+        else:
+            parsed_rows[index][1]['last_bottom_level_iteration'] = last
+    for index in sorted(bad_rows, reverse=True):
+        errors.append((parsed_rows[index][0], 'date could not be read with date format "' + str(date_format) + '"'))
+        del parsed_rows[index]
+    return parsed_rows
+
+
+def write_chunk(calendar: Calendar, parsed_rows: list[tuple[int, dict]], errors: list) -> int:
+    """
+    Create the events for a chunk of resolved rows in one transaction,
+    keeping the calendar's maximum event span, event count pyramid and
+    page content version up to date since bulk_create skips save and
+    its signals. Return the number of events created.
+    """
+    events = []
+    start_counts = dict()
+    for row_number, fields in parsed_rows:
+        first = fields['bottom_level_iteration']
+        last = fields['last_bottom_level_iteration'] if fields['last_bottom_level_iteration'] is not None else first
+        if last < first:
+            errors.append((row_number, 'an event cannot end before it starts'))
+            continue
+        event = Event(calendar_id=calendar.pk, world_id=calendar.world_id, event_name=fields['event_name'],
+                      event_description=fields['event_description'], bottom_level_iteration=first,
+                      last_bottom_level_iteration=last, event_group=fields['event_group'],
+                      visible=fields['visible'], navigable=fields['navigable'])
+        if fields['display_order'] is not None:
+            event.display_order = fields['display_order']
+        if event.is_visible():
+            start_counts[first] = start_counts.get(first, 0) + 1
+        events.append(event)
+    if len(events) > 0:
+        with transaction.atomic():
+            Event.objects.bulk_create(events)
+            Calendar.widen_max_event_span(calendar_id=calendar.pk, span=max(event.get_span() for event in events))
+            EventCountBucket.add_event_starts(calendar_id=calendar.pk, start_counts=start_counts)
+            World.bump_versions(world_id=calendar.world_id, calendar_id=calendar.pk)
+    return len(events)
+
+
+def trim_errors(errors: list) -> int:
+    """
+    Sort a list of (row number, message) errors and keep only the first
+    MAX_REPORTED_ERRORS of them, returning how many were dropped.
+    """
+    errors.sort()
+    dropped = max(len(errors) - MAX_REPORTED_ERRORS, 0)
+    del errors[MAX_REPORTED_ERRORS:]
+    return dropped
+
+
+def import_events(calendar: Calendar, rows, date_format: DateFormat = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """
+    Create events on a calendar from an iterable of row dicts, such as
+    one from read_csv_rows or read_jsonl_rows, and return statistics
+    on the import including a description of every row that failed.
+
+    Each row has an event_name and either a bottom_level_iteration or
+    a date formatted with date_format, and optionally an
+    event_description, a last_bottom_level_iteration or last_date, a
+    display_order, an event_group name and visible and navigable flags.
+
+    Rows are consumed lazily and written chunk_size at a time, each
+    chunk in its own transaction, so a failed row never stops the rest
+    of the import and memory use does not grow with the input: only the
+    errors that can be reported are kept, and the rest are counted.
+    """
+    if date_format is not None and date_format.calendar_id != calendar.pk:
+        raise ValueError('date format is not on this calendar')
+    event_groups = {event_group.event_group_name: event_group
+                    for event_group in EventGroup.objects.filter(calendar_id=calendar.pk)}
+    started = time.perf_counter()
+    errors = []
+    dropped_errors = 0
+    rows_read = 0
+    events_created = 0
+    chunks = 0
+    parsed_rows = []
+    for row_number, row in enumerate(rows, start=1):
+        rows_read += 1
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            parsed_rows.append((row_number, parse_row(row, event_groups)))
+        except (ValueError, TypeError) as error:
+            errors.append((row_number, str(error)))
+        if len(parsed_rows) >= chunk_size:
+            events_created += write_chunk(calendar, resolve_dates(parsed_rows, date_format, errors), errors)
+            chunks += 1
+            parsed_rows = []
+        if len(errors) >= 2 * MAX_REPORTED_ERRORS:  # trimmed in batches so each error isn't sorted many times
+            dropped_errors += trim_errors(errors)
+    if len(parsed_rows) > 0:
+        events_created += write_chunk(calendar, resolve_dates(parsed_rows, date_format, errors), errors)
+        chunks += 1
+    seconds = time.perf_counter() - started
+    dropped_errors += trim_errors(errors)
+    return {
+        'rows_read': rows_read,
+        'events_created': events_created,
+        'error_count': len(errors) + dropped_errors,
+        'errors': [{'row': row_number, 'message': message} for row_number, message in errors],
+        'chunks': chunks,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows_read / seconds) if seconds > 0 else None,
+    }
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from fantasycalendar import page_cache
+
+
+class Command(BaseCommand):
+    help = 'Show the calendar page cache hit rate (only shared cache backends such as files are seen across processes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='start counting again from zero')
+
+    def handle(self, *args, **options):
+        stats = page_cache.get_stats()
+        hit_rate = str(round(stats['hit_rate'] * 100, 1)) + '%' if stats['hit_rate'] is not None else 'n/a'
+        self.stdout.write(str(stats['hits']) + ' hits, ' + str(stats['misses']) + ' misses, hit rate ' + hit_rate)
+        if options['reset']:
+            page_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Reset calendar page cache stats'))
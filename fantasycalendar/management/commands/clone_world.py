@@ -0,0 +1,31 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from fantasycalendar.models import World
+from fantasycalendar.snapshots import clone_world
+
+
+class Command(BaseCommand):
+    help = 'Create a copy of a world and everything in it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('world_id', type=int)
+        parser.add_argument('creator', help='the username of the user who will own the new world')
+        parser.add_argument('--name', help='the name of the new world; the original name is kept if not given')
+        parser.add_argument('--public', action='store_true', help='make the new world public; it is private if not '
+                                                                  'given')
+
+    def handle(self, *args, **options):
+        try:
+            world = World.objects.get(pk=options['world_id'])
+        except World.DoesNotExist:
+            raise CommandError('world ' + str(options['world_id']) + ' does not exist')
+        try:
+            creator = get_user_model().objects.get(**{get_user_model().USERNAME_FIELD: options['creator']})
+        except get_user_model().DoesNotExist:
+            raise CommandError('user ' + options['creator'] + ' does not exist')
+        started = time.perf_counter()
+        clone = clone_world(world, creator, world_name=options['name'], public=options['public'])
+        self.stdout.write(self.style.SUCCESS('Cloned world "' + str(world) + '" to ID ' + str(clone.pk) + ' in '
+                                             + str(round(time.perf_counter() - started, 3)) + 's'))
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from fantasycalendar.models import World
+from fantasycalendar.snapshots import export_world
+
+
+class Command(BaseCommand):
+    help = 'Write a snapshot of a world and everything in it as JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('world_id', type=int)
+        parser.add_argument('path', help='the file to write; "-" writes to standard output')
+
+    def handle(self, *args, **options):
+        try:
+            world = World.objects.get(pk=options['world_id'])
+        except World.DoesNotExist:
+            raise CommandError('world ' + str(options['world_id']) + ' does not exist')
+        if options['path'] == '-':
+            sys.stdout.writelines(export_world(world))
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as snapshot_file:
+                snapshot_file.writelines(export_world(world))
+            self.stdout.write(self.style.SUCCESS('Exported world "' + str(world) + '" to ' + options['path']))
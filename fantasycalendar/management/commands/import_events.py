@@ -0,0 +1,51 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from fantasycalendar.event_import import DEFAULT_CHUNK_SIZE, ROW_READERS, import_events
+from fantasycalendar.models import Calendar, DateFormat
+
+
+class Command(BaseCommand):
+    help = 'Create events on a calendar from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('calendar_id', type=int)
+        parser.add_argument('path', help='the file to import; "-" reads from standard input')
+        parser.add_argument('--format', choices=sorted(ROW_READERS),
+                            help='the file format; taken from the file extension if not given')
+        parser.add_argument('--date-format', type=int, dest='date_format_id',
+                            help='the ID of the date format to read "date" and "last_date" columns with')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='the number of rows written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            calendar = Calendar.objects.get(pk=options['calendar_id'])
+        except Calendar.DoesNotExist:
+            raise CommandError('calendar ' + str(options['calendar_id']) + ' does not exist')
+        date_format = None
+        if options['date_format_id'] is not None:
+            date_format = DateFormat.objects.filter(pk=options['date_format_id'], calendar_id=calendar.pk).first()
+            if date_format is None:
+                raise CommandError('date format ' + str(options['date_format_id']) + ' does not exist on this calendar')
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in ROW_READERS:
+            raise CommandError('could not tell the file format; use --format')
+
+        if options['path'] == '-':
+            stats = import_events(calendar, ROW_READERS[file_format](sys.stdin), date_format=date_format,
+                                  chunk_size=options['chunk_size'])
+        else:
+            with open(options['path'], newline='', encoding='utf-8') as text_stream:
+                stats = import_events(calendar, ROW_READERS[file_format](text_stream), date_format=date_format,
+                                      chunk_size=options['chunk_size'])
+
+        for error in stats['errors']:
+            self.stderr.write('row ' + str(error['row']) + ': ' + error['message'])
+        if stats['error_count'] > len(stats['errors']):
+            self.stderr.write('... and ' + str(stats['error_count'] - len(stats['errors'])) + ' more errors')
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + str(stats['events_created']) + ' events from ' + str(stats['rows_read']) + ' rows ('
+            + str(stats['error_count']) + ' errors) in ' + str(stats['seconds']) + 's, '
+            + str(stats['rows_per_second']) + ' rows/s'))
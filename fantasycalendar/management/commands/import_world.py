@@ -0,0 +1,28 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from fantasycalendar.snapshots import import_world
+
+
+class Command(BaseCommand):
+    help = 'Create a copy of a world from a snapshot written by export_world'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='the snapshot to read; "-" reads from standard input')
+        parser.add_argument('creator', help='the username of the user who will own the new world')
+
+    def handle(self, *args, **options):
+        try:
+            creator = get_user_model().objects.get(**{get_user_model().USERNAME_FIELD: options['creator']})
+        except get_user_model().DoesNotExist:
+            raise CommandError('user ' + options['creator'] + ' does not exist')
+        try:
+            if options['path'] == '-':
+                world = import_world(sys.stdin, creator)
+            else:
+                with open(options['path'], encoding='utf-8') as snapshot_file:
+                    world = import_world(snapshot_file, creator)
+        except ValueError as error:
+            raise CommandError('could not import snapshot: ' + str(error))
+        self.stdout.write(self.style.SUCCESS('Imported world "' + str(world) + '" with ID ' + str(world.pk)))
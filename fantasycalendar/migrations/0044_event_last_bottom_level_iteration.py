@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-19 17:41
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def forwards(apps, _):
+    Event = apps.get_model('fantasycalendar', 'Event')
+    Event.objects.filter(last_bottom_level_iteration=None).update(
+        last_bottom_level_iteration=F('bottom_level_iteration'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasycalendar', '0043_event_navigable_eventgroup_navigable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendar',
+            name='max_event_span',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='last_bottom_level_iteration',
+            field=models.BigIntegerField(blank=True, help_text='<span class="tooltip">?<span class="tooltip-text">The last bottom level time unit instance that this event takes place on if it lasts for more than one; leave blank for an event that takes place on a single instance</span></span>', null=True),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['calendar', 'bottom_level_iteration', 'last_bottom_level_iteration'], name='event_calendar_span_idx'),
+        ),
+    ]
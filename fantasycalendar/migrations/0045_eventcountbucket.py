@@ -0,0 +1,48 @@
+# Generated by Django 5.0.14 on 2026-10-19 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+LEVELS = 32
+
+
+def forwards(apps, _):
+    # build the pyramid for existing events, mirroring EventCountBucket.rebuild
+    Event = apps.get_model('fantasycalendar', 'Event')
+    EventCountBucket = apps.get_model('fantasycalendar', 'EventCountBucket')
+    visible_q = Q(visible=True) | Q(visible=None, event_group=None) | Q(visible=None, event_group__visible=True)
+    counts = dict()
+    for row in Event.objects.filter(visible_q).values('calendar_id', 'bottom_level_iteration').annotate(
+            event_count=Count('id')).order_by():
+        for level in range(LEVELS):
+            key = (row['calendar_id'], level, (row['bottom_level_iteration'] - 1) >> level)
+            counts[key] = counts.get(key, 0) + row['event_count']
+    EventCountBucket.objects.bulk_create(
+        [EventCountBucket(calendar_id=calendar_id, level=level, bucket=bucket, event_count=event_count)
+         for (calendar_id, level, bucket), event_count in counts.items()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasycalendar', '0044_event_last_bottom_level_iteration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCountBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('event_count', models.BigIntegerField(default=0)),
+                ('calendar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='fantasycalendar.calendar')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='eventcountbucket',
+            constraint=models.UniqueConstraint(fields=('calendar', 'level', 'bucket'), name='unique_event_count_bucket'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE fantasycalendar_event_fts USING fts5(event_name, event_description, "
+    "content='fantasycalendar_event', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER fantasycalendar_event_fts_insert AFTER INSERT ON fantasycalendar_event BEGIN "
+    "INSERT INTO fantasycalendar_event_fts(rowid, event_name, event_description) "
+    "VALUES (new.id, new.event_name, new.event_description); END",
+    "CREATE TRIGGER fantasycalendar_event_fts_delete AFTER DELETE ON fantasycalendar_event BEGIN "
+    "INSERT INTO fantasycalendar_event_fts(fantasycalendar_event_fts, rowid, event_name, event_description) "
+    "VALUES ('delete', old.id, old.event_name, old.event_description); END",
+    "CREATE TRIGGER fantasycalendar_event_fts_update AFTER UPDATE OF event_name, event_description "
+    "ON fantasycalendar_event BEGIN "
+    "INSERT INTO fantasycalendar_event_fts(fantasycalendar_event_fts, rowid, event_name, event_description) "
+    "VALUES ('delete', old.id, old.event_name, old.event_description); "
+    "INSERT INTO fantasycalendar_event_fts(rowid, event_name, event_description) "
+    "VALUES (new.id, new.event_name, new.event_description); END",
+    "INSERT INTO fantasycalendar_event_fts(fantasycalendar_event_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS fantasycalendar_event_fts_insert",
+    "DROP TRIGGER IF EXISTS fantasycalendar_event_fts_delete",
+    "DROP TRIGGER IF EXISTS fantasycalendar_event_fts_update",
+    "DROP TABLE IF EXISTS fantasycalendar_event_fts",
+]
+# must match POSTGRESQL_VECTOR_SQL in fantasycalendar/search.py for queries to use the index
+POSTGRESQL_FORWARDS = [
+    "CREATE INDEX fantasycalendar_event_search_idx ON fantasycalendar_event USING GIN (("
+    "setweight(to_tsvector('english', event_name), 'A') || "
+    "setweight(to_tsvector('english', event_description), 'B')))",
+]
+POSTGRESQL_BACKWARDS = [
+    "DROP INDEX IF EXISTS fantasycalendar_event_search_idx",
+]
+
+
+def run_for_vendor(sqlite_statements, postgresql_statements):
+    # other backends have no full-text index and fall back to substring search
+    def run(apps, schema_editor):
+        statements = {'sqlite': sqlite_statements,
+                      'postgresql': postgresql_statements}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasycalendar', '0045_eventcountbucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_for_vendor(SQLITE_FORWARDS, POSTGRESQL_FORWARDS),
+                             run_for_vendor(SQLITE_BACKWARDS, POSTGRESQL_BACKWARDS)),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-19 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+CALENDAR_SCOPED_MODELS = ['TimeUnit', 'Event', 'DateFormat', 'DisplayConfig', 'DateBookmark']
+
+
+def forwards(apps, _):
+    # copy each row's world from its calendar with one update per model
+    Calendar = apps.get_model('fantasycalendar', 'Calendar')
+    for model_name in CALENDAR_SCOPED_MODELS:
+        apps.get_model('fantasycalendar', model_name).objects.update(
+            world_id=Subquery(Calendar.objects.filter(pk=OuterRef('calendar_id')).values('world_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasycalendar', '0046_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datebookmark',
+            name='world',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fantasycalendar.world'),
+        ),
+        migrations.AddField(
+            model_name='dateformat',
+            name='world',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fantasycalendar.world'),
+        ),
+        migrations.AddField(
+            model_name='displayconfig',
+            name='world',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fantasycalendar.world'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='world',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fantasycalendar.world'),
+        ),
+        migrations.AddField(
+            model_name='timeunit',
+            name='world',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fantasycalendar.world'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
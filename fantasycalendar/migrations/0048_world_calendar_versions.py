@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-19 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasycalendar', '0047_world_denormalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendar',
+            name='content_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='calendar',
+            name='schema_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='world',
+            name='content_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='world',
+            name='schema_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,35 +1,113 @@
+import bisect
 import decimal
+import itertools
 import math
 import re
 from copy import copy
 from decimal import Decimal
 
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib import admin
-from django.db.models import F, Q
+from django.db.models import Count, F, Q
 from django.urls import reverse
 from django.conf import settings
+from . import calendar_cache
 from .utils import html_tooltip
 
+# the counters on worlds and calendars that only ever go up, by World.bump_versions
+VERSION_FIELDS = ['schema_version', 'content_version']
+
+
+def get_fields_to_save(instance: models.Model, update_fields, protected_fields: list[str] = None) -> list[str] | None:
+    """
+    Return the update_fields to save an existing world or calendar
+    with, which leave out its version counters and any other
+    protected_fields unless they are named, so a copy loaded before
+    they were raised can't set them back.
+    """
+    if instance._state.adding or update_fields is not None:
+        return update_fields
+    protected_fields = VERSION_FIELDS + (protected_fields or [])
+    return [field.attname for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in protected_fields]
+
 
 class World(models.Model):
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True)  # remove null=True later
     world_name = models.CharField(max_length=200, help_text=html_tooltip('The name of this world'))
     public = models.BooleanField(default=False,
                                  help_text=html_tooltip('Whether this world is viewable by other people'))
+    # raised whenever anything in the world changes; the schema version for its calendars, time units, date
+    # formats and display configs, including how calendars are linked, and the content version for its events,
+    # event groups and bookmarks
+    schema_version = models.BigIntegerField(default=0, editable=False)
+    content_version = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.world_name
 
+    def save(self, *args, update_fields=None, **kwargs):
+        super(World, self).save(*args, update_fields=get_fields_to_save(self, update_fields), **kwargs)
+
     def get_absolute_url(self):
         return reverse('fantasycalendar:world-detail', kwargs={'pk': self.pk})
 
+    @staticmethod
+    def bump_versions(world_id: int, calendar_id: int = None, schema: bool = False):
+        """
+        Raise the content version, or the schema version if schema is
+        True, of the world with the given id by one, along with the same
+        version of its calendar with calendar_id if one is given.
+
+        The counters are raised in the database rather than on loaded
+        instances, so concurrent bumps are never lost. Values this
+        process has cached for the world and calendar are evicted at
+        once, and other processes evict theirs when they next check
+        their versions.
+        """
+        field = 'schema_version' if schema else 'content_version'
+        World.objects.filter(pk=world_id).update(**{field: F(field) + 1})
+        if calendar_id is not None:
+            Calendar.objects.filter(pk=calendar_id).update(**{field: F(field) + 1})
+        calendar_cache.publish_change(world_id, calendar_id=calendar_id, schema=schema)
+
     def get_linked_calendars(self) -> list['Calendar']:
         """
         Return all calendars in this world that are set up to link with other
         calendars in the same world.
         """
-        return [x for x in Calendar.objects.filter(world_id=self.pk) if x.is_linked()]
+        return list(Calendar.objects.filter(world_id=self.pk, world_link_iteration__isnull=False).order_by('pk'))
+
+    @staticmethod
+    def get_link_graph(world_id: int) -> dict[int, tuple['Calendar', 'TimeUnit']]:
+        """
+        Return the calendars in the world with the given id that are set
+        up to link with each other, as {calendar id: (calendar, bottom
+        level time unit)}, with each time unit's calendar, date formats
+        and sub units loaded up front, so is_bottom_level and
+        is_top_level cost no queries.
+
+        The graph is loaded in three queries and shared by every thread
+        in this process until the schema of any calendar in the world
+        changes, such as a calendar being linked or unlinked, so it must
+        not be modified, and any other relation must be looked up rather
+        than read from it.
+        """
+        def load():
+            graph = {calendar.pk: (calendar, None) for calendar in
+                     Calendar.objects.filter(world_id=world_id, world_link_iteration__isnull=False).order_by('pk')}
+            for time_unit in TimeUnit.objects.filter(calendar_id__in=graph, base_unit=None).select_related(
+                    'default_date_format', 'secondary_date_format').prefetch_related('timeunit_set'):
+                calendar = graph[time_unit.calendar_id][0]
+                time_unit.calendar = calendar
+                time_unit.base_unit = None
+                for date_format in [time_unit.default_date_format, time_unit.secondary_date_format]:
+                    if date_format is not None and date_format.time_unit_id == time_unit.pk:
+                        date_format.time_unit = time_unit
+                graph[calendar.pk] = (calendar, time_unit)
+            return graph
+        return calendar_cache.get_world(world_id, 'link_graph', load)
 
 
 class Calendar(models.Model):
@@ -46,10 +124,19 @@ class Calendar(models.Model):
                                                                          'calendar in the world to be linked, or '
                                                                          'leave it blank to leave the calendar '
                                                                          'unlinked'))
+    max_event_span = models.BigIntegerField(default=0, editable=False)  # upper bound used to keep overlap queries narrow
+    # raised along with the same version of the world whenever anything on this calendar changes
+    schema_version = models.BigIntegerField(default=0, editable=False)
+    content_version = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.calendar_name
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # max_event_span is only ever raised, by widen_max_event_span
+        super(Calendar, self).save(*args, update_fields=get_fields_to_save(self, update_fields, ['max_event_span']),
+                                   **kwargs)
+
     def get_absolute_url(self):
         return reverse('fantasycalendar:calendar-detail', kwargs={'pk': self.pk, 'world_key': self.world.pk})
 
@@ -119,9 +206,95 @@ class Calendar(models.Model):
         """
         return self.world_link_iteration is not None
 
+    @staticmethod
+    def widen_max_event_span(calendar_id: int, span: int):
+        """
+        Raise max_event_span on the calendar with the given id to span
+        if it is currently lower. The value is never lowered, so it is
+        always an upper bound on the span of any event on the calendar.
+        """
+        if span > 0:
+            Calendar.objects.filter(pk=calendar_id, max_event_span__lt=span).update(max_event_span=span)
+
+    def get_events_in_range(self, first_bottom_level_iteration: int, last_bottom_level_iteration: int) -> list['Event']:
+        """
+        Return a list of all events on this calendar that take place
+        during any part of the range of bottom level time unit
+        instances from first_bottom_level_iteration to
+        last_bottom_level_iteration (inclusive).
+        """
+        return [x for x in Event.objects.filter(Event.get_overlap_q(
+            calendar=self, first_bottom_level_iteration=first_bottom_level_iteration,
+            last_bottom_level_iteration=last_bottom_level_iteration)).order_by('bottom_level_iteration',
+                                                                               'display_order')]
+
+    def get_events_in_ranges(self, bottom_level_ranges: list[tuple[int, int]]) -> list[list['Event']]:
+        """
+        Return a list of lists of all events on this calendar that take
+        place during any part of each range of bottom level time unit
+        instances given as a (first, last) tuple (inclusive). An event
+        overlapping several ranges appears in the list of each.
+
+        Optimized to minimize hits to the database when searching
+        several ranges at once.
+        """
+        event_lists = [[] for _ in range(len(bottom_level_ranges))]
+        if len(bottom_level_ranges) == 0:
+            return event_lists
+        q = Q()
+        for first_bottom_level_iteration, last_bottom_level_iteration in bottom_level_ranges:
+            q = q | Event.get_overlap_q(calendar=self, first_bottom_level_iteration=first_bottom_level_iteration,
+                                        last_bottom_level_iteration=last_bottom_level_iteration)
+        for event in Event.objects.filter(q).order_by('display_order'):
+            for index, (first_bottom_level_iteration, last_bottom_level_iteration) in enumerate(bottom_level_ranges):
+                if event.overlaps(first_bottom_level_iteration, last_bottom_level_iteration):
+                    event_lists[index].append(event)
+        return event_lists
+
+    def get_event_counts_in_ranges(self, bottom_level_ranges: list[tuple[int, int]]) -> list[int]:
+        """
+        Return a list of the number of visible events on this calendar
+        that take place during any part of each range of bottom level
+        time unit instances given as a (first, last) tuple (inclusive).
+
+        Events are counted from the event count pyramid by the instance
+        they start in, so only events that start before a range and
+        are still ongoing during it need to be pulled separately, and
+        only if any event on the calendar spans more than one instance.
+
+        Optimized to minimize hits to the database when counting events
+        for several ranges at once.
+        """
+        counts = EventCountBucket.get_event_start_counts(calendar_id=self.pk,
+                                                         bottom_level_ranges=bottom_level_ranges)
+        if self.max_event_span > 0 and len(bottom_level_ranges) > 0:
+            spans = Event.objects.filter(
+                Event.get_overlap_q(calendar=self,
+                                    first_bottom_level_iteration=min(first for first, _ in bottom_level_ranges),
+                                    last_bottom_level_iteration=max(last for _, last in bottom_level_ranges)),
+                Event.get_visible_q(), last_bottom_level_iteration__gt=F('bottom_level_iteration')
+            ).values_list('bottom_level_iteration', 'last_bottom_level_iteration')
+            for event_first, event_last in spans:
+                for index, (first, last) in enumerate(bottom_level_ranges):
+                    if event_first < first <= event_last:
+                        counts[index] += 1
+        return counts
+
+    def has_events_in_range(self, first_bottom_level_iteration: int, last_bottom_level_iteration: int) -> bool:
+        """
+        Return True if any visible event on this calendar takes place
+        during any part of the range of bottom level time unit
+        instances from first_bottom_level_iteration to
+        last_bottom_level_iteration (inclusive).
+        """
+        return self.get_event_counts_in_ranges([(first_bottom_level_iteration, last_bottom_level_iteration)])[0] > 0
+
 
 class TimeUnit(models.Model):
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    # denormalized from calendar.world so rows can be filtered by world without joining their calendar; kept in
+    # step on save by signals and set directly wherever rows are bulk created
+    world = models.ForeignKey(World, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
     time_unit_name = models.CharField(max_length=200, default='',
                                       help_text=html_tooltip('The name of this time unit, e.g. "Month" or "Day"'))
     base_unit = models.ForeignKey('self', on_delete=models.RESTRICT, null=True, blank=True,
@@ -152,13 +325,39 @@ class TimeUnit(models.Model):
     def __str__(self):
         return self.time_unit_name
 
+    @staticmethod
+    def get_calendar_time_units(calendar_id: int) -> dict[int, 'TimeUnit']:
+        """
+        Return every time unit of the calendar with the given id by id,
+        with their calendar, base units, date formats and sub units
+        loaded up front, so is_bottom_level, is_top_level and
+        get_level_depth cost no queries. They are loaded in two queries
+        and shared by every thread in this process until the calendar's
+        schema changes, so they must not be modified, and any other
+        relation must be looked up rather than read from them.
+        """
+        def load():
+            time_units = TimeUnit.objects.filter(calendar_id=calendar_id).select_related(
+                'calendar', 'default_date_format', 'secondary_date_format').prefetch_related('timeunit_set').in_bulk()
+            calendar = next(iter(time_units.values())).calendar if len(time_units) > 0 else None
+            for time_unit in time_units.values():
+                time_unit.calendar = calendar
+                if time_unit.base_unit_id is None or time_unit.base_unit_id in time_units:
+                    time_unit.base_unit = time_units.get(time_unit.base_unit_id)
+                for date_format in [time_unit.default_date_format, time_unit.secondary_date_format]:
+                    if date_format is not None and date_format.time_unit_id in time_units:
+                        date_format.time_unit = time_units[date_format.time_unit_id]
+            return time_units
+        return calendar_cache.get(calendar_id, 'time_units', load)
+
     @admin.display(boolean=True, description='Lowest level time unit?')
     def is_bottom_level(self) -> bool:
         """
         Return True if this is the lowest-level unit of time in its
         Calendar, i.e. the equivalent of a "day".
         """
-        return self.base_unit is None and self.id is not None  # will not be considered "bottom level" until saved to db
+        # will not be considered "bottom level" until saved to db
+        return self.base_unit_id is None and self.id is not None
 
     def get_length_cycle_display(self) -> str:
         """
@@ -173,9 +372,10 @@ class TimeUnit(models.Model):
     def is_top_level(self) -> bool:
         """
         Return True if there are no other TimeUnit objects that have
-        this TimeUnit as their base_unit.
+        this TimeUnit as their base_unit. Costs no queries on a time
+        unit loaded with prefetch_related('timeunit_set').
         """
-        return TimeUnit.objects.filter(base_unit_id=self.id).count() == 0
+        return not self.timeunit_set.exists()
 
     def get_level_depth(self) -> int:
         """
@@ -676,43 +876,115 @@ class TimeUnit(models.Model):
         bottom_lengths = self.get_bottom_level_length_at_iterations(iterations=iterations)
         return [first_bottom + bottom_length - 1 for first_bottom, bottom_length in zip(first_bottoms, bottom_lengths)]
 
+    def get_bottom_level_ranges_at_iterations(self, iterations: list[int]) -> list[tuple[int, int]]:
+        """
+        Return a list of tuples containing the first and last bottom
+        level time unit iterations contained in the instance of this
+        time unit that exists at each given iteration in iterations.
+
+        Each range ends right before the first bottom level iteration
+        of the next instance, so only first bottom level iterations
+        (the boundaries between instances) are calculated, which is
+        much cheaper than totalling the lengths of every instance.
+
+        Optimized to minimize hits to the database when calculating
+        several ranges at once.
+        """
+        boundary_iterations = sorted(set(iterations).union(iteration + 1 for iteration in iterations))
+        boundaries = dict(zip(boundary_iterations, self.get_first_bottom_level_iteration_at_iterations(
+            iterations=boundary_iterations)))
+        return [(boundaries[iteration], boundaries[iteration + 1] - 1) for iteration in iterations]
+
     def get_events_at_iteration(self, iteration: int) -> list['Event']:
         """
         Return a list of all events on the same calendar as this time
-        unit that take place during the instance of this time unit that
-        exists at a particular iteration.
+        unit that take place during any part of the instance of this
+        time unit that exists at a particular iteration.
         """
         first_bottom_level_iteration = self.get_first_bottom_level_iteration_at_iteration(iteration=iteration)
         last_bottom_level_iteration = self.get_last_bottom_level_iteration_at_iteration(iteration=iteration)
-        return [x for x in Event.objects.filter(bottom_level_iteration__gte=first_bottom_level_iteration,
-                                                bottom_level_iteration__lte=last_bottom_level_iteration,
-                                                calendar_id=self.calendar.id).order_by('bottom_level_iteration',
-                                                                                       'display_order')]
+        return self.calendar.get_events_in_range(first_bottom_level_iteration=first_bottom_level_iteration,
+                                                 last_bottom_level_iteration=last_bottom_level_iteration)
 
-    def get_events_at_iterations(self, iterations: list[int]) -> list[list['Event']]:
+    def get_events_at_iterations(self, iterations: list[int],
+                                 bottom_level_ranges: list[tuple[int, int]] = None) -> list[list['Event']]:
         """
         Return a list of lists of all events on the same calendar as
-        this time unit that take place during the instance of this time
-        unit that exists at each given iteration in iterations.
+        this time unit that take place during any part of the instance
+        of this time unit that exists at each given iteration in
+        iterations. An event spanning several instances appears in the
+        list of each instance it overlaps.
+
+        bottom_level_ranges may be passed in if the result of
+        get_bottom_level_ranges_at_iterations is already available.
 
         Optimized to minimize hits to the database when searching
         several iterations at once.
         """
-        first_bottom_level_iterations = self.get_first_bottom_level_iteration_at_iterations(iterations=iterations)
-        last_bottom_level_iterations = self.get_last_bottom_level_iteration_at_iterations(iterations=iterations)
-        ranges = list(zip(first_bottom_level_iterations, last_bottom_level_iterations))
-        q = Q()
-        for first_bottom_level_iteration, last_bottom_level_iteration in ranges:
-            q = q | Q(bottom_level_iteration__gte=first_bottom_level_iteration,
-                      bottom_level_iteration__lte=last_bottom_level_iteration,
-                      calendar_id=self.calendar.id)
-        events = Event.objects.filter(q).order_by('display_order')
-        event_lists = [[] for _ in range(len(iterations))]
-        for event in events:
-            for index, (first_bottom_level_iteration, last_bottom_level_iteration) in enumerate(ranges):
-                if first_bottom_level_iteration <= event.bottom_level_iteration <= last_bottom_level_iteration:
-                    event_lists[index].append(event)
-        return event_lists
+        if bottom_level_ranges is None:
+            bottom_level_ranges = self.get_bottom_level_ranges_at_iterations(iterations=iterations)
+        return self.calendar.get_events_in_ranges(bottom_level_ranges)
+
+    def get_event_counts_at_iterations(self, iterations: list[int], group_by_event_group: bool = False,
+                                       bottom_level_ranges: list[tuple[int, int]] = None) -> list:
+        """
+        Return the number of visible events on the same calendar as
+        this time unit that take place during any part of the instance
+        of this time unit that exists at each given iteration in
+        iterations.
+
+        If group_by_event_group is True, each value in the returned
+        list is instead a dict of event group id (None for events with
+        no group) to the number of visible events in that group.
+
+        Events are counted in the database with a single GROUP BY over
+        their bottom level iterations, and the grouped rows are then
+        placed into instances by searching the boundaries of each
+        instance, so the cost does not depend on how many events or
+        bottom level instances are in the range.
+        """
+        if bottom_level_ranges is None:
+            bottom_level_ranges = self.get_bottom_level_ranges_at_iterations(iterations=iterations)
+        empty_count = (lambda: dict()) if group_by_event_group else (lambda: 0)
+        if len(bottom_level_ranges) == 0:
+            return []
+
+        # search boundaries must be sorted; remember where each range came from
+        order = sorted(range(len(bottom_level_ranges)), key=lambda index: bottom_level_ranges[index][0])
+        firsts = [bottom_level_ranges[index][0] for index in order]
+        lasts = [bottom_level_ranges[index][1] for index in order]
+
+        group_fields = ['bottom_level_iteration', 'last_bottom_level_iteration']
+        if group_by_event_group:
+            group_fields.append('event_group_id')
+        rows = Event.objects.filter(Event.get_overlap_q(calendar=self.calendar,
+                                                        first_bottom_level_iteration=firsts[0],
+                                                        last_bottom_level_iteration=max(lasts))).\
+            filter(Event.get_visible_q()).values(*group_fields).annotate(event_count=Count('id')).order_by()
+
+        # each row adds its count to a run of consecutive instances; track where runs start and stop
+        # then total them up in one pass so long events do not cost one step per instance they cover
+        differences = dict()
+        for row in rows:
+            first_index = bisect.bisect_left(lasts, row['bottom_level_iteration'])
+            last_index = bisect.bisect_right(firsts, row['last_bottom_level_iteration']) - 1
+            if first_index > last_index:
+                continue  # falls in a gap between non-consecutive iterations
+            key = row['event_group_id'] if group_by_event_group else None
+            differences.setdefault(key, [0] * (len(firsts) + 1))
+            differences[key][first_index] += row['event_count']
+            differences[key][last_index + 1] -= row['event_count']
+
+        counts = [empty_count() for _ in range(len(firsts))]
+        for key, key_differences in differences.items():
+            running_count = 0
+            for sorted_index, original_index in enumerate(order):
+                running_count += key_differences[sorted_index]
+                if not group_by_event_group:
+                    counts[original_index] += running_count
+                elif running_count > 0:
+                    counts[original_index][key] = running_count
+        return counts
 
     @staticmethod
     def expand_length_cycle(length_cycle) -> list[int]:
@@ -815,6 +1087,37 @@ class TimeUnit(models.Model):
             current_cycle_position += 1
         return (number_of_complete_cycles * len(bottom_level_length_cycle)) + current_cycle_position + 1
 
+    def get_iterations_at_bottom_level_iterations(self, bottom_level_iterations: list[int]) -> list[int]:
+        """
+        Return the iteration value of the instance of this time unit
+        that encompasses the instance of the bottom level time unit for
+        this calendar that exists at each given iteration in
+        bottom_level_iterations.
+
+        As an example, if there are 30 "Day"s in a "Month", Day being
+        the bottom level time unit for this calendar, then calling this
+        method on the Month with bottom_level_iterations of [1, 75]
+        will return [1, 3], as the Month containing Day 75 is the 3rd
+        Month.
+
+        Optimized to minimize hits to the database when calculating
+        several iterations at once: the bottom level length cycle is
+        worked out once and each position in it found by bisection.
+        """
+        if self.is_bottom_level():  # save some time on bottom level units
+            return list(bottom_level_iterations)
+        bottom_level_length_cycle = TimeUnit.expand_length_cycle(self.get_bottom_level_length_cycle())
+        bottom_level_cycle_length = sum(bottom_level_length_cycle)  # this should never be 0
+        cycle_position_ends = list(itertools.accumulate(bottom_level_length_cycle))
+        iterations = []
+        for bottom_level_iteration in bottom_level_iterations:
+            number_of_complete_cycles = int((bottom_level_iteration - 1) / bottom_level_cycle_length)
+            remaining_units_in_current_cycle = int((bottom_level_iteration - 1) % bottom_level_cycle_length)
+            current_cycle_position = bisect.bisect_right(cycle_position_ends, remaining_units_in_current_cycle)
+            iterations.append(
+                (number_of_complete_cycles * len(bottom_level_length_cycle)) + current_cycle_position + 1)
+        return iterations
+
     def get_sub_unit_instance_iteration_within_higher_level_iteration(self, sub_unit: 'TimeUnit',
                                                                       sub_unit_iteration: int) -> int:
         """
@@ -838,6 +1141,35 @@ class TimeUnit(models.Model):
             iteration=parent_iteration, sub_unit=sub_unit)
         return sub_unit_iteration - first_sub_instance_iteration + 1
 
+    def get_sub_unit_instance_iterations_within_higher_level_iterations(self, sub_unit: 'TimeUnit',
+                                                                        sub_unit_iterations: list[int]) -> list[int]:
+        """
+        Return the iteration value of the instance of a given time unit
+        at each given iteration in sub_unit_iterations relative to its
+        position in the instance of this time unit in which it exists.
+
+        As an example, if there are 30 "Day"s in a "Month", then
+        calling this method on the Month for the sub_unit Day with
+        sub_unit_iterations of [1, 75] will return [1, 15], as Day 75
+        is the 15th Day in the Month in which it exists.
+
+        If sub_unit is the same as this time unit, returns
+        sub_unit_iterations as-is.
+
+        Optimized to minimize hits to the database when calculating
+        several iterations at once.
+        """
+        if self.pk == sub_unit.pk:  # save some time when no calculations are needed
+            return list(sub_unit_iterations)
+        parent_iterations = self.get_iterations_at_bottom_level_iterations(
+            bottom_level_iterations=sub_unit.get_first_bottom_level_iteration_at_iterations(
+                iterations=sub_unit_iterations))
+        first_sub_instance_iterations = self.get_first_sub_unit_iteration_at_iterations(
+            iterations=parent_iterations, sub_unit=sub_unit)
+        return [sub_unit_iteration - first_sub_instance_iteration + 1
+                for sub_unit_iteration, first_sub_instance_iteration in zip(sub_unit_iterations,
+                                                                            first_sub_instance_iterations)]
+
     def get_all_higher_containing_units(self) -> list['TimeUnit']:
         """
         Return a list of all time units that are composed of this time
@@ -946,7 +1278,8 @@ class TimeUnit(models.Model):
         """
         if not self.is_linked():
             return []
-        linked_calendars = [x for x in self.calendar.world.get_linked_calendars() if x.pk != self.calendar.pk]
+        linked_calendars = [calendar for calendar, _ in World.get_link_graph(self.calendar.world_id).values()
+                            if calendar.pk != self.calendar_id]
         offset_from_link = iteration - self.calendar.world_link_iteration
         return [(x, x.world_link_iteration + offset_from_link) for x in linked_calendars
                 if x.world_link_iteration + offset_from_link > 0]
@@ -959,12 +1292,13 @@ class TimeUnit(models.Model):
         corresponding iterations are the dates that are linked.
 
         Optimized to minimize hits to the database when searching for
-        several dates at once.
+        several dates at once: the calendars linked in this world are
+        cached in the process.
         """
         if not self.is_linked():
             return []
-        linked_calendars = [linked_calendar for linked_calendar in self.calendar.world.get_linked_calendars()
-                            if linked_calendar.pk != self.calendar.pk]
+        linked_calendars = [linked_calendar for linked_calendar, _ in World.get_link_graph(
+            self.calendar.world_id).values() if linked_calendar.pk != self.calendar_id]
         offsets_from_link = [iteration - self.calendar.world_link_iteration for iteration in iterations]
         return [(linked_calendar,
                  [linked_calendar.world_link_iteration + offset for offset in offsets_from_link
@@ -993,9 +1327,9 @@ class TimeUnit(models.Model):
         prefer_secondary is True.
         """
         linked_instances = self.get_linked_instance_iterations(iteration=iteration)
-        return [x[0].get_bottom_level_time_unit().get_instance_display_name(x[1], prefer_secondary=prefer_secondary,
-                                                                            primary_secondary_backup=
-                                                                            primary_secondary_backup)
+        link_graph = World.get_link_graph(self.calendar.world_id) if len(linked_instances) > 0 else dict()
+        return [link_graph[x[0].pk][1].get_instance_display_name(x[1], prefer_secondary=prefer_secondary,
+                                                                 primary_secondary_backup=primary_secondary_backup)
                 for x in linked_instances]
 
     def get_linked_instances_display_names(self, iterations: list[int], prefer_secondary: bool = False,
@@ -1025,18 +1359,21 @@ class TimeUnit(models.Model):
         prefer_secondary is True.
 
         Optimized to minimize hits to the database when formatting
-        several dates at once.
+        several dates at once: the linked calendars' bottom level time
+        units and date formats are cached in the process, so once they
+        are loaded this takes no queries.
         """
         linked_instances = self.get_linked_instances_iterations(iterations=iterations)
-        return list(list(x) for x in zip(*[x[0].get_bottom_level_time_unit().get_instance_display_names(
+        link_graph = World.get_link_graph(self.calendar.world_id) if len(linked_instances) > 0 else dict()
+        return list(list(x) for x in zip(*[link_graph[x[0].pk][1].get_instance_display_names(
             x[1], prefer_secondary=prefer_secondary, primary_secondary_backup=primary_secondary_backup)
                 for x in linked_instances][::-1]))
 
     def get_linked_events_at_iteration(self, iteration: int) -> list['Event']:
         """
         Return a list of all events on calendars linked to this time
-        unit that take place during the instance of this time unit that
-        exists at a particular iteration.
+        unit that take place during any part of the instance of this
+        time unit that exists at a particular iteration.
         """
         if not self.is_linked():
             return []
@@ -1044,16 +1381,17 @@ class TimeUnit(models.Model):
         last_bottom_level_iteration = self.get_last_bottom_level_iteration_at_iteration(iteration=iteration)
         first_offset = first_bottom_level_iteration - self.calendar.world_link_iteration
         last_offset = last_bottom_level_iteration - self.calendar.world_link_iteration
-        events = Event.objects.exclude(calendar__id=self.calendar_id).\
-            exclude(bottom_level_iteration__lt=first_offset + F("calendar__world_link_iteration")).\
-            exclude(bottom_level_iteration__gt=last_offset + F("calendar__world_link_iteration"))
+        events = Event.objects.filter(world_id=self.calendar.world_id,
+                                      calendar__world_link_iteration__isnull=False).\
+            exclude(calendar__id=self.calendar_id).\
+            filter(Event.get_linked_overlap_q(first_offset=first_offset, last_offset=last_offset))
         return [event for event in events]
 
     def get_linked_events_at_iterations(self, iterations: list[int]) -> list[list['Event']]:
         """
         Return a list of all events on calendars linked to this time
-        unit that take place during the instance of this time unit that
-        exists at each given iteration in iterations.
+        unit that take place during any part of the instance of this
+        time unit that exists at each given iteration in iterations.
 
         Optimized to minimize hits to the database when searching
         several iterations at once.
@@ -1078,30 +1416,39 @@ class TimeUnit(models.Model):
         # build a query to pull all the events we will need
         q = Q()
         for first_offset, last_offset in ranges:
-            q = q | Q(bottom_level_iteration__range=(first_offset + F("calendar__world_link_iteration"),
-                                                     last_offset + F("calendar__world_link_iteration")))
+            q = q | Event.get_linked_overlap_q(first_offset=first_offset, last_offset=last_offset)
+        q = q & Q(world_id=self.calendar.world_id, calendar__world_link_iteration__isnull=False)
         q = q & ~Q(calendar_id=self.calendar.id)
 
         # pull the events indiscriminately into one big list
-        events = Event.objects.filter(q).order_by('display_order')
+        events = Event.objects.filter(q).select_related('calendar').order_by('display_order')
 
         # assign each Event to its proper place in the parallel list and return it
         for event in events:
             for index, (first_offset, last_offset) in enumerate(ranges):
-                if first_offset + event.calendar.world_link_iteration >= event.bottom_level_iteration \
-                        >= last_offset + event.calendar.world_link_iteration:
+                if event.overlaps(first_offset + event.calendar.world_link_iteration,
+                                  last_offset + event.calendar.world_link_iteration):
                     event_lists[index].append(event)
         return event_lists
 
 
 class Event(models.Model):
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    # denormalized from calendar.world so rows can be filtered by world without joining their calendar; kept in
+    # step on save by signals and set directly wherever rows are bulk created
+    world = models.ForeignKey(World, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
     event_name = models.CharField(max_length=200, help_text=html_tooltip('The name of this event'))
     event_description = models.TextField(max_length=4000, blank=True,
                                          help_text=html_tooltip('A description for this event'))
     bottom_level_iteration = models.BigIntegerField(help_text=html_tooltip('The bottom level time unit ("Day" by '
                                                                            'default) instance that this event takes '
                                                                            'place on'))
+    last_bottom_level_iteration = models.BigIntegerField(blank=True, null=True,
+                                                         help_text=html_tooltip('The last bottom level time unit '
+                                                                                'instance that this event takes place '
+                                                                                'on if it lasts for more than one; '
+                                                                                'leave blank for an event that takes '
+                                                                                'place on a single instance'))
     display_order = models.IntegerField(default=1,
                                         help_text=html_tooltip('The order in which this event will display on the '
                                                                'calendar (and in menus); events with the same display '
@@ -1117,9 +1464,28 @@ class Event(models.Model):
                                                            'bookmarks dropdown; will use group setting if not set and '
                                                            'default to be not navigable if group is also not set'))
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['calendar', 'bottom_level_iteration', 'last_bottom_level_iteration'],
+                         name='event_calendar_span_idx'),
+        ]
+
     def __str__(self):
         return self.event_name
 
+    def clean(self):
+        if self.last_bottom_level_iteration is not None and self.bottom_level_iteration is not None \
+                and self.last_bottom_level_iteration < self.bottom_level_iteration:
+            raise ValidationError({'last_bottom_level_iteration': 'An event cannot end before it starts.'})
+
+    def save(self, *args, **kwargs):
+        if self.last_bottom_level_iteration is None or self.last_bottom_level_iteration < self.bottom_level_iteration:
+            self.last_bottom_level_iteration = self.bottom_level_iteration  # single instance events span only one
+        super(Event, self).save(*args, **kwargs)
+        Calendar.widen_max_event_span(calendar_id=self.calendar_id, span=self.get_span())
+        if Event.calendar.is_cached(self) and self.calendar.max_event_span < self.get_span():
+            self.calendar.max_event_span = self.get_span()  # keep an already loaded calendar usable for queries
+
     def get_absolute_url(self):
         return reverse('fantasycalendar:event-detail', kwargs={'pk': self.pk, 'calendar_key': self.calendar.pk,
                                                                'world_key': self.calendar.world.pk})
@@ -1134,6 +1500,69 @@ class Event(models.Model):
             else self.event_group.visible if self.event_group is not None \
             else True
 
+    @staticmethod
+    def get_visible_q() -> Q:
+        """
+        Return a Q object matching all events that should be visible on
+        the main calendar page, the database equivalent of is_visible.
+        """
+        return Q(visible=True) | Q(visible=None, event_group=None) | Q(visible=None, event_group__visible=True)
+
+    def get_span(self) -> int:
+        """
+        Return the number of bottom level time unit instances this
+        event lasts for beyond its first one, i.e. 0 for an event that
+        takes place on a single instance.
+        """
+        if self.last_bottom_level_iteration is None:
+            return 0
+        return max(self.last_bottom_level_iteration - self.bottom_level_iteration, 0)
+
+    def overlaps(self, first_bottom_level_iteration: int, last_bottom_level_iteration: int) -> bool:
+        """
+        Return True if this event takes place during any part of the
+        range of bottom level time unit instances from
+        first_bottom_level_iteration to last_bottom_level_iteration
+        (inclusive).
+        """
+        return (self.bottom_level_iteration <= last_bottom_level_iteration
+                and self.bottom_level_iteration + self.get_span() >= first_bottom_level_iteration)
+
+    @staticmethod
+    def get_overlap_q(calendar: 'Calendar', first_bottom_level_iteration: int, last_bottom_level_iteration: int) -> Q:
+        """
+        Return a Q object matching all events on a calendar that take
+        place during any part of the range of bottom level time unit
+        instances from first_bottom_level_iteration to
+        last_bottom_level_iteration (inclusive).
+
+        No event on the calendar can start more than max_event_span
+        instances before the range and still overlap it, so the start
+        of the event is bounded on both sides. This keeps the lookup on
+        the (calendar, bottom_level_iteration,
+        last_bottom_level_iteration) index to a narrow range scan
+        rather than every event before the end of the range.
+        """
+        return Q(calendar_id=calendar.pk,
+                 bottom_level_iteration__gte=first_bottom_level_iteration - calendar.max_event_span,
+                 bottom_level_iteration__lte=last_bottom_level_iteration,
+                 last_bottom_level_iteration__gte=first_bottom_level_iteration)
+
+    @staticmethod
+    def get_linked_overlap_q(first_offset: int, last_offset: int) -> Q:
+        """
+        Return a Q object matching all events that take place during
+        any part of a range of bottom level time unit instances given
+        as offsets from the world link iteration of each event's own
+        calendar.
+
+        See get_overlap_q for how the range is bounded.
+        """
+        return Q(bottom_level_iteration__gte=(first_offset + F('calendar__world_link_iteration')
+                                              - F('calendar__max_event_span')),
+                 bottom_level_iteration__lte=last_offset + F('calendar__world_link_iteration'),
+                 last_bottom_level_iteration__gte=first_offset + F('calendar__world_link_iteration'))
+
 
 class EventGroup(models.Model):
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
@@ -1154,8 +1583,172 @@ class EventGroup(models.Model):
                                                                      'world_key': self.calendar.world.pk})
 
 
+class EventCountBucket(models.Model):
+    LEVELS = 32  # the top level buckets each cover 2^31 bottom level time unit instances
+    QUERY_CHUNK_SIZE = 500  # keep lookups under the query parameter limit of every database backend
+
+    calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    level = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    event_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['calendar', 'level', 'bucket'], name='unique_event_count_bucket'),
+        ]
+
+    def __str__(self):
+        return str(self.calendar) + ' level ' + str(self.level) + ' bucket ' + str(self.bucket)
+
+    @staticmethod
+    def get_bucket_keys(bottom_level_iteration: int) -> list[tuple[int, int]]:
+        """
+        Return a list of (level, bucket) tuples for every bucket in the
+        pyramid that contains the given bottom level time unit
+        instance, one per level.
+
+        The bucket at level k with index n covers the 2^k instances
+        from n * 2^k + 1 to (n + 1) * 2^k (inclusive).
+        """
+        return [(level, (bottom_level_iteration - 1) >> level) for level in range(EventCountBucket.LEVELS)]
+
+    @staticmethod
+    def get_range_keys(first_bottom_level_iteration: int, last_bottom_level_iteration: int) -> \
+            tuple[list[tuple[int, int]], tuple[int, int] | None]:
+        """
+        Return a list of (level, bucket) tuples for the buckets that
+        exactly cover the range of bottom level time unit instances
+        from first_bottom_level_iteration to
+        last_bottom_level_iteration (inclusive) and, for a range too
+        wide to be covered by at most two buckets per level, the
+        (first, last + 1) indexes of the run of top level buckets that
+        covers the middle of it (otherwise None).
+        """
+        low = first_bottom_level_iteration - 1
+        high = last_bottom_level_iteration
+        keys = []
+        level = 0
+        while low < high and level < EventCountBucket.LEVELS - 1:
+            if low & 1:
+                keys.append((level, low))
+                low += 1
+            if high & 1:
+                high -= 1
+                keys.append((level, high))
+            low >>= 1
+            high >>= 1
+            level += 1
+        return keys, (low, high) if low < high else None
+
+    @staticmethod
+    def get_keys_q(keys: list[tuple[int, int]]) -> Q:
+        """
+        Return a Q object matching the buckets with the given (level,
+        bucket) tuples, with one lookup per level.
+        """
+        buckets_by_level = dict()
+        for level, bucket in keys:
+            buckets_by_level.setdefault(level, []).append(bucket)
+        keys_q = Q(pk__in=[])
+        for level, buckets in buckets_by_level.items():
+            keys_q |= Q(level=level, bucket__in=buckets)
+        return keys_q
+
+    @staticmethod
+    def add_event_starts(calendar_id: int, start_counts: dict[int, int]):
+        """
+        Add to the pyramid of the calendar with the given id a number
+        of events starting at each bottom level time unit instance,
+        given as a dict of {bottom_level_iteration: count}. Negative
+        counts remove events.
+
+        Optimized to minimize hits to the database when adding events
+        at several instances at once. Safe to call from several
+        requests at once, since missing buckets are created empty
+        while ignoring conflicts and every count is then raised in
+        place.
+        """
+        deltas = dict()
+        for bottom_level_iteration, count in start_counts.items():
+            if count != 0:
+                for key in EventCountBucket.get_bucket_keys(bottom_level_iteration):
+                    deltas[key] = deltas.get(key, 0) + count
+        keys = [key for key, delta in deltas.items() if delta != 0]
+        if len(keys) == 0:
+            return
+        buckets = EventCountBucket.objects.filter(calendar_id=calendar_id)
+        with transaction.atomic():
+            EventCountBucket.objects.bulk_create(
+                [EventCountBucket(calendar_id=calendar_id, level=level, bucket=bucket, event_count=0)
+                 for level, bucket in keys], batch_size=EventCountBucket.QUERY_CHUNK_SIZE, ignore_conflicts=True)
+            keys_by_delta = dict()
+            for key in keys:
+                keys_by_delta.setdefault(deltas[key], []).append(key)
+            for delta, delta_keys in keys_by_delta.items():  # saving a single event needs at most two of these
+                for index in range(0, len(delta_keys), EventCountBucket.QUERY_CHUNK_SIZE):
+                    buckets.filter(EventCountBucket.get_keys_q(
+                        delta_keys[index:index + EventCountBucket.QUERY_CHUNK_SIZE])).update(
+                        event_count=F('event_count') + delta)
+
+    @staticmethod
+    def get_event_start_counts(calendar_id: int, bottom_level_ranges: list[tuple[int, int]]) -> list[int]:
+        """
+        Return a list of the number of visible events on the calendar
+        with the given id that start during each range of bottom level
+        time unit instances given as a (first, last) tuple (inclusive).
+
+        Each range is answered from at most two buckets per level of
+        the pyramid. Optimized to minimize hits to the database when
+        counting events for several ranges at once.
+        """
+        range_keys = [EventCountBucket.get_range_keys(first, last) for first, last in bottom_level_ranges]
+        keys = list({key for keys, _ in range_keys for key in keys})
+        top_level_runs = [top_level_run for _, top_level_run in range_keys if top_level_run is not None]
+        buckets = EventCountBucket.objects.filter(calendar_id=calendar_id)
+        event_counts = dict()
+        for index in range(0, len(keys), EventCountBucket.QUERY_CHUNK_SIZE):
+            for level, bucket, event_count in buckets.filter(EventCountBucket.get_keys_q(
+                    keys[index:index + EventCountBucket.QUERY_CHUNK_SIZE])).values_list('level', 'bucket',
+                                                                                        'event_count'):
+                event_counts[level, bucket] = event_count
+        top_level_counts = []
+        if len(top_level_runs) > 0:
+            top_level_q = Q(pk__in=[])
+            for first, end in top_level_runs:
+                top_level_q |= Q(bucket__gte=first, bucket__lt=end)
+            top_level_counts = list(buckets.filter(top_level_q, level=EventCountBucket.LEVELS - 1).values_list(
+                'bucket', 'event_count'))
+
+        counts = []
+        for keys, top_level_run in range_keys:
+            count = sum(event_counts.get(key, 0) for key in keys)
+            if top_level_run is not None:
+                count += sum(event_count for bucket, event_count in top_level_counts
+                             if top_level_run[0] <= bucket < top_level_run[1])
+            counts.append(count)
+        return counts
+
+    @staticmethod
+    def rebuild(calendar_id: int):
+        """
+        Replace the pyramid of the calendar with the given id with one
+        built from scratch from its visible events. Use this after
+        writing events in ways that skip the usual signals, such as
+        bulk_create or queryset updates.
+        """
+        with transaction.atomic():
+            EventCountBucket.objects.filter(calendar_id=calendar_id).delete()
+            EventCountBucket.add_event_starts(calendar_id=calendar_id, start_counts={
+                row['bottom_level_iteration']: row['event_count'] for row in
+                Event.objects.filter(Event.get_visible_q(), calendar_id=calendar_id).values(
+                    'bottom_level_iteration').annotate(event_count=Count('id')).order_by()})
+
+
 class DateFormat(models.Model):
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    # denormalized from calendar.world so rows can be filtered by world without joining their calendar; kept in
+    # step on save by signals and set directly wherever rows are bulk created
+    world = models.ForeignKey(World, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
     time_unit = models.ForeignKey(TimeUnit, on_delete=models.CASCADE)
     date_format_name = models.CharField(max_length=200, help_text=html_tooltip('The name of this date format'))
     format_string = models.CharField(max_length=200,
@@ -1237,16 +1830,17 @@ class DateFormat(models.Model):
             processed_format_string = processed_format_string[:l_index] + processed_format_string[r_index + 1:]
         answers = []
 
-        # pull DB data for all involved time units up front
-        own_time_unit_id = self.time_unit.id
-        time_units = dict()
-        time_units[own_time_unit_id] = TimeUnit.objects.get(pk=own_time_unit_id)
+        # pull all involved time units up front, from the ones already loaded for this calendar
+        own_time_unit_id = self.time_unit_id
+        time_unit_ids = {own_time_unit_id}
         for code in codes:
             [parent, sub, display] = code.split('-')
-            if int(parent) not in time_units.keys():
-                time_units[int(parent)] = TimeUnit.objects.get(pk=int(parent))
-            if int(sub) not in time_units.keys():
-                time_units[int(sub)] = TimeUnit.objects.get(pk=int(sub))
+            time_unit_ids.update([int(parent), int(sub)])
+        calendar_time_units = TimeUnit.get_calendar_time_units(self.calendar_id)
+        time_units = {time_unit_id: calendar_time_units[time_unit_id] for time_unit_id in time_unit_ids
+                      if time_unit_id in calendar_time_units}
+        if len(time_units) < len(time_unit_ids):
+            raise TimeUnit.DoesNotExist('TimeUnit matching query does not exist.')
 
         formatted_dates = list()
         for iteration in iterations:
@@ -1379,7 +1973,27 @@ class DateFormat(models.Model):
             values.append(after)
         return values
 
-    def get_iteration(self, formatted_string: str) -> int:
+    def get_codes(self) -> list[tuple['TimeUnit', 'TimeUnit', str]]:
+        """
+        Return a (parent time unit, sub time unit, display type) tuple
+        for each variable code in the format string, in order, pulling
+        all of the time units involved at once.
+        """
+        format_string = str(self.format_string)
+        raw_codes = []  # [parent_id, sub_id, display]
+        while '{' in format_string and '}' in format_string:
+            l_index = format_string.index('{')
+            r_index = format_string.index('}')
+            parent_id, sub_id, display_type = format_string[l_index + 1:r_index].split('-')
+            raw_codes.append((int(parent_id), int(sub_id), display_type))
+            format_string = format_string[:l_index] + format_string[r_index + 1:]
+        time_units = TimeUnit.objects.in_bulk({unit_id for parent_id, sub_id, _ in raw_codes
+                                               for unit_id in (parent_id, sub_id)})
+        return [(time_units[parent_id], time_units[sub_id], display_type)
+                for parent_id, sub_id, display_type in raw_codes]
+
+    def get_iteration(self, formatted_string: str,
+                      codes: list[tuple['TimeUnit', 'TimeUnit', str]] = None) -> int:
         """
         Return the iteration of this date format's time unit that is
         referred to by a formatted string generated by this date
@@ -1387,16 +2001,13 @@ class DateFormat(models.Model):
 
         Only works if is_reversible returns True for this date format.
         Check that method before calling this one.
+
+        The result of get_codes can be passed in as codes to skip
+        decoding the format string again.
         """
         # decode the format string
-        format_string = str(self.format_string)
-        codes = []  # [parent, sub, display]
-        while '{' in format_string and '}' in format_string:  # this logic is repeated a lot, could probably be a method
-            l_index = format_string.index('{')
-            r_index = format_string.index('}')
-            parent_id, sub_id, display_type = format_string[l_index + 1:r_index].split('-')
-            codes.append((TimeUnit.objects.get(pk=parent_id), TimeUnit.objects.get(pk=sub_id), display_type))
-            format_string = format_string[:l_index] + format_string[r_index + 1:]
+        if codes is None:
+            codes = self.get_codes()
 
         # get the values from the formatted string
         values = self.get_values_from_formatted_date(formatted_string=formatted_string)
@@ -1429,6 +2040,27 @@ class DateFormat(models.Model):
                         return absolutes[sub.id]
         raise AttributeError  # if we didn't find it, the format string wasn't reversible
 
+    def get_iterations(self, formatted_strings: list[str]) -> list[int | None]:
+        """
+        Return the iterations of this date format's time unit that are
+        referred to by formatted strings generated by this date format,
+        with None in place of any string that can't be read.
+
+        Only works if is_reversible returns True for this date format.
+        Check that method before calling this one.
+
+        Optimized to minimize hits to the database when reading several
+        formatted strings at once.
+        """
+        codes = self.get_codes()
+        iterations = []
+        for formatted_string in formatted_strings:
+            try:
+                iterations.append(self.get_iteration(formatted_string=formatted_string, codes=codes))
+            except (AttributeError, ValueError, IndexError):
+                iterations.append(None)
+        return iterations
+
     def is_differentiable(self, other_formats: 'DateFormat | list[DateFormat]') -> bool:
         """
         Return True if this date format can be identified as distinct
@@ -1480,6 +2112,22 @@ class DateFormat(models.Model):
                 likely_formats.append(date_format)
         return likely_formats
 
+    @staticmethod
+    def remap_time_unit_ids(format_string: str, time_unit_ids: dict[int, int]) -> str:
+        """
+        Return a copy of a format string with the time unit IDs in each
+        variable code replaced according to time_unit_ids, a dict of
+        {old ID: new ID}, for copying a date format along with its
+        calendar. Raises ValueError if a code refers to a time unit
+        missing from time_unit_ids.
+        """
+        def remap(match):
+            parent_id, sub_id = int(match.group(1)), int(match.group(2))
+            if parent_id not in time_unit_ids or sub_id not in time_unit_ids:
+                raise ValueError('format string "' + format_string + '" refers to a time unit that was not copied')
+            return '{' + str(time_unit_ids[parent_id]) + '-' + str(time_unit_ids[sub_id]) + '-' + match.group(3) + '}'
+        return re.sub(r'{([0-9]+)-([0-9]+)-([^}]*)}', remap, format_string)
+
     def references_time_unit(self, time_unit: 'TimeUnit') -> bool:
         """
         Return True if this date format's format_string contains a
@@ -1493,6 +2141,9 @@ class DateFormat(models.Model):
 
 class DisplayConfig(models.Model):
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    # denormalized from calendar.world so rows can be filtered by world without joining their calendar; kept in
+    # step on save by signals and set directly wherever rows are bulk created
+    world = models.ForeignKey(World, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
     display_config_name = models.CharField(max_length=200,
                                            help_text=html_tooltip('The name of this display configuration'))
     default_display_unit_config = models.ForeignKey('DisplayUnitConfig', on_delete=models.RESTRICT, null=True,
@@ -1706,6 +2357,9 @@ class DisplayUnitConfig(models.Model):
 
 class DateBookmark(models.Model):
     calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    # denormalized from calendar.world so rows can be filtered by world without joining their calendar; kept in
+    # step on save by signals and set directly wherever rows are bulk created
+    world = models.ForeignKey(World, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
     date_bookmark_name = models.CharField(max_length=200, blank=True,
                                           help_text=html_tooltip('The name of this date bookmark'))
     bookmark_unit = models.ForeignKey(TimeUnit, on_delete=models.CASCADE,
@@ -1742,6 +2396,32 @@ class DateBookmark(models.Model):
         else:
             return str(self.bookmark_unit.time_unit_name) + ' ' + str(self.bookmark_iteration)
 
+    @staticmethod
+    def get_display_names(date_bookmarks: list['DateBookmark']) -> list[str]:
+        """
+        Return the display name of each date bookmark in a list, the
+        same as get_display_name would.
+
+        Optimized to minimize hits to the database when naming several
+        bookmarks at once, by formatting the dates of all unnamed
+        bookmarks on the same time unit with one call.
+        """
+        display_names = [date_bookmark.date_bookmark_name for date_bookmark in date_bookmarks]
+        formatted = dict()  # {bookmark_unit_id: (default date format, [index in date_bookmarks])}
+        for index, date_bookmark in enumerate(date_bookmarks):
+            if date_bookmark.date_bookmark_name:
+                continue
+            default_date_format = date_bookmark.bookmark_unit.default_date_format
+            if default_date_format:
+                formatted.setdefault(date_bookmark.bookmark_unit_id, (default_date_format, []))[1].append(index)
+            else:
+                display_names[index] = date_bookmark.get_display_name()
+        for default_date_format, indexes in formatted.values():
+            for index, formatted_date in zip(indexes, default_date_format.get_formatted_dates(
+                    [date_bookmarks[index].bookmark_iteration for index in indexes])):
+                display_names[index] = formatted_date
+        return display_names
+
     def is_personal(self):
         """
         Return True if this is a personal bookmark only intended for
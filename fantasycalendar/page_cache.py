@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import caches
+
+# the cache alias and timeout used for calendar pages, which can be overridden in settings
+PAGE_CACHE_ALIAS = getattr(settings, 'CALENDAR_PAGE_CACHE', 'default')
+PAGE_CACHE_TIMEOUT = getattr(settings, 'CALENDAR_PAGE_CACHE_TIMEOUT', 60 * 60)
+
+PAGE_KEY = 'calendarpage:page:{version}:{time_unit_id}:{sub_unit_id}:{iteration}:{display_config_id}:{visibility}'
+STATS_KEYS = {'hits': 'calendarpage:stats:hits', 'misses': 'calendarpage:stats:misses'}
+
+
+def get_cache():
+    return caches[PAGE_CACHE_ALIAS]
+
+
+def get_page_key(world_version: str, time_unit_id: int, sub_unit_id: int | None, iteration: int,
+                 display_config_id: int | None, visibility: str) -> str:
+    """
+    Return the cache key for a calendar page. world_version is the
+    version of the world the page is in, as resolved for the request,
+    so every page cached before anything in the world changed is passed
+    over and left to expire. sub_unit_id and display_config_id are the
+    ids requested, None if they weren't, and visibility is the class of
+    user the page is built for.
+    """
+    return PAGE_KEY.format(version=world_version, time_unit_id=time_unit_id,
+                           sub_unit_id=sub_unit_id if sub_unit_id is not None else '',
+                           iteration=iteration,
+                           display_config_id=display_config_id if display_config_id is not None else '',
+                           visibility=visibility)
+
+
+def count(outcome: str):
+    cache = get_cache()
+    cache.add(STATS_KEYS[outcome], 0, timeout=None)
+    try:
+        cache.incr(STATS_KEYS[outcome])
+    except ValueError:  # evicted between add and incr
+        pass
+
+
+def get_page(key: str) -> dict | None:
+    """
+    Return the cached page data for a key, or None if it isn't cached,
+    and count the hit or miss.
+    """
+    data = get_cache().get(key)
+    count('hits' if data is not None else 'misses')
+    return data
+
+
+def has_page(key: str) -> bool:
+    """
+    Return True if a page is cached for a key, without counting a hit
+    or miss.
+    """
+    return get_cache().has_key(key)
+
+
+def set_page(key: str, data: dict):
+    get_cache().set(key, data, timeout=PAGE_CACHE_TIMEOUT)
+
+
+def get_stats() -> dict:
+    """
+    Return the number of page cache hits and misses counted so far
+    and the share of requests that were hits.
+    """
+    counts = get_cache().get_many(STATS_KEYS.values())
+    hits = counts.get(STATS_KEYS['hits'], 0)
+    misses = counts.get(STATS_KEYS['misses'], 0)
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses > 0 else None}
+
+
+def reset_stats():
+    get_cache().delete_many(STATS_KEYS.values())
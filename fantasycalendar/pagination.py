@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the primary key, so each page is a range
+    scan of the primary key index starting where the last page ended
+    rather than an offset counted from the start of the list.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
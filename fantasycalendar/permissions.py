@@ -1,11 +1,11 @@
-from django.shortcuts import get_object_or_404
 from rest_framework import permissions
+from .access import get_access_resolver
 from .models import Calendar, World
 
 
 class IsCreatorOrPublic(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.creator == request.user or obj.public
+        return get_access_resolver(request).can_view(type(obj), obj.pk)
 
 
 class IsWorldCreatorOrPublic(permissions.BasePermission):
@@ -13,13 +13,12 @@ class IsWorldCreatorOrPublic(permissions.BasePermission):
         if view.action == 'create':
             if 'world' not in request.data:
                 return False
-            world = get_object_or_404(World, pk=request.data['world'])
-            return world.creator == request.user or world.public
+            return get_access_resolver(request).can_view(World, request.data['world'])
         else:
             return True  # has_object_permission will handle creator check for other actions
 
     def has_object_permission(self, request, view, obj):
-        return obj.world.creator == request.user or obj.world.public
+        return get_access_resolver(request).can_view(type(obj), obj.pk)
 
 
 class IsCalendarWorldCreatorOrPublic(permissions.BasePermission):
@@ -27,18 +26,17 @@ class IsCalendarWorldCreatorOrPublic(permissions.BasePermission):
         if view.action == 'create':
             if 'calendar' not in request.data:
                 return False
-            calendar = get_object_or_404(Calendar, pk=request.data['calendar'])
-            return calendar.world.creator == request.user or calendar.world.public
+            return get_access_resolver(request).can_view(Calendar, request.data['calendar'])
         else:
             return True  # has_object_permission will handle creator check for other actions
 
     def has_object_permission(self, request, view, obj):
-        return obj.calendar.world.creator == request.user or obj.calendar.world.public
+        return get_access_resolver(request).can_view(type(obj), obj.pk)
 
 
 class IsCreator(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.creator == request.user
+        return get_access_resolver(request).is_creator(type(obj), obj.pk)
 
 
 class IsWorldCreator(permissions.BasePermission):
@@ -46,13 +44,12 @@ class IsWorldCreator(permissions.BasePermission):
         if view.action == 'create':
             if 'world' not in request.data:
                 return False
-            world = get_object_or_404(World, pk=request.data['world'])
-            return world.creator == request.user
+            return get_access_resolver(request).is_creator(World, request.data['world'])
         else:
             return True  # has_object_permission will handle creator check for other actions
 
     def has_object_permission(self, request, view, obj):
-        return obj.world.creator == request.user
+        return get_access_resolver(request).is_creator(type(obj), obj.pk)
 
 
 class IsCalendarWorldCreator(permissions.BasePermission):
@@ -60,10 +57,9 @@ class IsCalendarWorldCreator(permissions.BasePermission):
         if view.action == 'create':
             if 'calendar' not in request.data:
                 return False
-            calendar = get_object_or_404(Calendar, pk=request.data['calendar'])
-            return calendar.world.creator == request.user
+            return get_access_resolver(request).is_creator(Calendar, request.data['calendar'])
         else:
             return True  # has_object_permission will handle creator check for other actions
 
     def has_object_permission(self, request, view, obj):
-        return obj.calendar.world.creator == request.user
+        return get_access_resolver(request).is_creator(type(obj), obj.pk)
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404
+from . import calendar_cache, calendar_pages, page_cache
+from .models import TimeUnit
+
+# pages next to the one requested are built in the background by this many threads, with at most
+# PRECOMPUTE_QUEUE_SIZE pages queued or being built at once
+PRECOMPUTE_WORKERS = getattr(settings, 'CALENDAR_PAGE_PRECOMPUTE_WORKERS', 2)
+PRECOMPUTE_QUEUE_SIZE = getattr(settings, 'CALENDAR_PAGE_PRECOMPUTE_QUEUE_SIZE', 8)
+# how long a request waits for a page already being built in the background before building it itself
+PRECOMPUTE_WAIT = getattr(settings, 'CALENDAR_PAGE_PRECOMPUTE_WAIT', 5)
+
+lock = threading.Lock()
+executor = None
+in_flight = OrderedDict()  # {page key: Future}, oldest first
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'CALENDAR_PAGE_PRECOMPUTE', False)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=PRECOMPUTE_WORKERS, thread_name_prefix='calendarpage-precompute')
+    return executor
+
+
+def build_and_cache(page_key: str, time_unit_id: int, iteration: int, sub_unit_id: int | None,
+                    display_config_id: int | None):
+    """
+    Build a page and cache it under page_key, unless it has been cached
+    since it was queued. Pages that don't exist and pages too big to
+    cache are skipped.
+    """
+    try:
+        if page_cache.has_page(page_key):
+            return
+        calendar_cache.poll()  # the page is cached under the version read by the request that queued it
+        time_unit = TimeUnit.objects.select_related('calendar').get(pk=time_unit_id)
+        context = calendar_pages.load_page_context(time_unit.calendar, display_config_id)
+        page = calendar_pages.resolve_page(context, time_unit_id=time_unit.pk, iteration=iteration,
+                                           sub_unit_id=sub_unit_id)
+        if len(page['instances']) < calendar_pages.STREAM_MIN_DATES:
+            page_cache.set_page(page_key, calendar_pages.build_pages(context, [page])[0])
+    except (TimeUnit.DoesNotExist, Http404):
+        pass
+    finally:
+        with lock:
+            in_flight.pop(page_key, None)
+        connections.close_all()  # only this worker thread's connections
+
+
+def precompute_pages(pages: list[tuple[str, int, int, int | None, int | None]]):
+    """
+    Queue pages, each given as (page key, time unit id, iteration, sub
+    unit id, display config id), to be built and cached in the
+    background. Pages already cached or already queued are skipped.
+
+    When PRECOMPUTE_QUEUE_SIZE pages are already queued or being built,
+    the oldest one that hasn't started is cancelled to make room, since
+    pages asked for more recently are more likely to be wanted next. If
+    every one has started, the page isn't queued at all, so a burst of
+    requests can never back up the pool.
+    """
+    pages = [page for page in pages if not page_cache.has_page(page[0])]
+    with lock:
+        for page_key, time_unit_id, iteration, sub_unit_id, display_config_id in pages:
+            if page_key in in_flight:
+                in_flight.move_to_end(page_key)
+                continue
+            if len(in_flight) >= PRECOMPUTE_QUEUE_SIZE:
+                cancelled = next((key for key, future in in_flight.items() if future.cancel()), None)
+                if cancelled is None:
+                    continue
+                del in_flight[cancelled]
+            in_flight[page_key] = get_executor().submit(build_and_cache, page_key, time_unit_id, iteration,
+                                                        sub_unit_id, display_config_id)
+
+
+def claim_page(page_key: str) -> bool:
+    """
+    Make sure a page a request is about to build isn't also built in
+    the background: a queued one is cancelled, and one already being
+    built is waited for, up to PRECOMPUTE_WAIT seconds. Return True if
+    it was waited for, so the cache should be checked again.
+    """
+    with lock:
+        future = in_flight.get(page_key)
+        if future is None:
+            return False
+        if future.cancel():
+            del in_flight[page_key]
+            return False
+    try:
+        future.result(timeout=PRECOMPUTE_WAIT)
+    except Exception:  # timed out or failed, so the request builds it itself
+        return False
+    return True
+
+
+def wait_for_pending(timeout: float = None):
+    """
+    Wait for every page queued or being built in the background to be
+    done, up to timeout seconds.
+    """
+    with lock:
+        futures = list(in_flight.values())
+    wait(futures, timeout=timeout)
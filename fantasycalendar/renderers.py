@@ -0,0 +1,58 @@
+import itertools
+import json
+from typing import Iterable, Iterator
+
+from rest_framework import renderers
+from .calendar_pages import to_columnar
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library is used without it
+    orjson = None
+
+
+def dumps(data) -> bytes:
+    """
+    Return data as compact UTF-8 JSON, using orjson if it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def iter_page_json(layout: dict, calendar_dates: Iterable[dict], chunk_size: int) -> Iterator[bytes]:
+    """
+    Yield a page as JSON a piece at a time: its dates encoded chunk_size
+    at a time as they are taken from calendar_dates, then the rest of
+    the page from layout, which must not be empty. Only one run of
+    dates is held at once, however many the page has.
+    """
+    yield b'{"calendar_dates":['
+    calendar_dates = iter(calendar_dates)
+    separator = b''
+    while dates := list(itertools.islice(calendar_dates, chunk_size)):
+        yield separator + b','.join(dumps(date) for date in dates)
+        separator = b','
+    yield b'],' + dumps(layout)[1:]
+
+
+class ColumnarPageRenderer(renderers.BaseRenderer):
+    """
+    Renders calendar pages in the columnar form from to_columnar when a
+    page view is asked for format=columnar. The page from CalendarPage
+    and each page from CalendarPages is converted; anything else, such
+    as an error message, is rendered as plain JSON.
+    """
+    media_type = 'application/json'
+    format = 'columnar'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and isinstance(data.get('calendar_dates'), list):
+            data = to_columnar(data)
+        elif isinstance(data, dict) and isinstance(data.get('pages'), list):
+            data = dict(data, pages=[dict(page, data=to_columnar(page['data'])) if page.get('data') else page
+                                     for page in data['pages']])
+        return dumps(data)
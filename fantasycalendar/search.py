@@ -0,0 +1,87 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import Event
+
+# the vector used by the postgres expression index in migration 0046 and matched exactly by queries against it
+POSTGRESQL_VECTOR_SQL = ("(setweight(to_tsvector('english', event_name), 'A') || "
+                         "setweight(to_tsvector('english', event_description), 'B'))")
+SQLITE_NAME_WEIGHT = 10.0  # how much more a term in an event's name counts than one in its description
+
+
+def get_search_terms(text: str) -> list[str]:
+    """
+    Return the words in a search string with all punctuation and query
+    syntax stripped out.
+    """
+    return re.findall(r'\w+', text)
+
+
+def search_events_sqlite(calendar_id: int, text: str, limit: int, offset: int) -> list[Event]:
+    """
+    Return events matching every word of text as a word prefix using
+    the FTS5 index, ranked by BM25 with name matches weighted above
+    description matches.
+    """
+    terms = get_search_terms(text)
+    if len(terms) == 0:
+        return []
+    match = ' '.join('"' + term + '"*' for term in terms)
+    return list(Event.objects.raw(
+        'SELECT e.*, -bm25(fantasycalendar_event_fts, %s, 1.0) AS rank '
+        'FROM fantasycalendar_event_fts JOIN fantasycalendar_event e ON e.id = fantasycalendar_event_fts.rowid '
+        'WHERE fantasycalendar_event_fts MATCH %s AND e.calendar_id = %s '
+        'ORDER BY rank DESC, e.id LIMIT %s OFFSET %s',
+        [SQLITE_NAME_WEIGHT, match, calendar_id, limit, offset]))
+
+
+def search_events_postgresql(calendar_id: int, text: str, limit: int, offset: int) -> list[Event]:
+    """
+    Return events matching text as a web search query using the
+    tsvector expression index, ranked by ts_rank with name matches
+    weighted above description matches.
+    """
+    if len(get_search_terms(text)) == 0:
+        return []
+    return list(Event.objects.raw(
+        'SELECT e.*, ts_rank(' + POSTGRESQL_VECTOR_SQL + ', query) AS rank '
+        'FROM fantasycalendar_event e, websearch_to_tsquery(\'english\', %s) query '
+        'WHERE e.calendar_id = %s AND ' + POSTGRESQL_VECTOR_SQL + ' @@ query '
+        'ORDER BY rank DESC, e.id LIMIT %s OFFSET %s',
+        [text, calendar_id, limit, offset]))
+
+
+def search_events_by_substring(calendar_id: int, text: str, limit: int, offset: int) -> list[Event]:
+    """
+    Return events containing every word of text in their name or
+    description, with events matching on name alone ranked first. Used
+    for database backends without a full-text index set up.
+    """
+    terms = get_search_terms(text)
+    if len(terms) == 0:
+        return []
+    queryset = Event.objects.filter(calendar_id=calendar_id)
+    name_q = Q()
+    for term in terms:
+        queryset = queryset.filter(Q(event_name__icontains=term) | Q(event_description__icontains=term))
+        name_q &= Q(event_name__icontains=term)
+    return list(queryset.annotate(rank=Case(When(name_q, then=Value(1)), default=Value(0),
+                                            output_field=IntegerField())).order_by('-rank', 'id')[offset:offset + limit])
+
+
+SEARCH_BACKENDS = {
+    'sqlite': search_events_sqlite,
+    'postgresql': search_events_postgresql,
+}
+
+
+def search_events(calendar_id: int, text: str, limit: int, offset: int = 0) -> list[Event]:
+    """
+    Return up to limit events on the calendar with the given id that
+    match the search string text, best matches first, skipping the
+    first offset matches. Each event has a rank attribute that is
+    higher for better matches.
+    """
+    backend = SEARCH_BACKENDS.get(connection.vendor, search_events_by_substring)
+    return backend(calendar_id=calendar_id, text=text, limit=limit, offset=offset)
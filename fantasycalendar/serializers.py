@@ -3,16 +3,29 @@ from rest_framework import serializers
 from .models import World, Calendar, TimeUnit, Event, DateFormat, DisplayConfig, DateBookmark, DisplayUnitConfig
 
 
-class WorldSerializer(serializers.ModelSerializer):
+class SparseFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an optional fields argument listing
+    the only fields to include; names that aren't fields are ignored.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super(SparseFieldsModelSerializer, self).__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class WorldSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = World
-        fields = ('id', 'creator', 'world_name', 'public')
+        fields = ('id', 'creator', 'world_name', 'public', 'schema_version', 'content_version')
 
 
-class CalendarSerializer(serializers.ModelSerializer):
+class CalendarSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = Calendar
-        fields = ('id', 'world', 'calendar_name', 'default_display_config')
+        fields = ('id', 'world', 'calendar_name', 'default_display_config', 'schema_version', 'content_version')
 
 
 class TimeUnitSerializer(serializers.ModelSerializer):
@@ -22,13 +35,14 @@ class TimeUnitSerializer(serializers.ModelSerializer):
                   'default_date_format', 'secondary_date_format')
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = Event
-        fields = ('id', 'calendar', 'event_name', 'event_description', 'bottom_level_iteration')
+        fields = ('id', 'calendar', 'event_name', 'event_description', 'bottom_level_iteration',
+                  'last_bottom_level_iteration')
 
 
-class DateFormatSerializer(serializers.ModelSerializer):
+class DateFormatSerializer(SparseFieldsModelSerializer):
     class Meta:
         model = DateFormat
         fields = ('id', 'calendar', 'time_unit', 'date_format_name', 'format_string')
@@ -52,11 +66,29 @@ class DisplayConfigSerializer(serializers.ModelSerializer):
                   'display_unit_configs')
 
 
-class DateBookmarkSerializer(serializers.ModelSerializer):
+class DateBookmarkListSerializer(serializers.ListSerializer):
+    """
+    A ListSerializer for date bookmarks that names every bookmark in the
+    list at once and caches the names in the serializer context by
+    bookmark id, where DateBookmarkSerializer looks them up.
+    """
+    def to_representation(self, data):
+        date_bookmarks = list(data.all() if hasattr(data, 'all') else data)
+        if 'display_name' in self.child.fields:
+            self.context['display_names'] = dict(zip([date_bookmark.pk for date_bookmark in date_bookmarks],
+                                                     DateBookmark.get_display_names(date_bookmarks)))
+        return super(DateBookmarkListSerializer, self).to_representation(date_bookmarks)
+
+
+class DateBookmarkSerializer(SparseFieldsModelSerializer):
     display_name = serializers.SerializerMethodField('get_display_name')
     from_event = serializers.SerializerMethodField('get_from_event')
 
     def get_display_name(self, date_bookmark):
+        # display names computed ahead for a whole list of bookmarks are cached in the context by bookmark id
+        display_names = self.context.get('display_names')
+        if display_names is not None and date_bookmark.pk in display_names:
+            return display_names[date_bookmark.pk]
         return date_bookmark.get_display_name()
 
     def get_from_event(self, date_bookmark):
@@ -66,6 +98,7 @@ class DateBookmarkSerializer(serializers.ModelSerializer):
         model = DateBookmark
         fields = ('id', 'calendar', 'date_bookmark_name', 'bookmark_unit', 'bookmark_iteration', 'bookmark_sub_unit',
                   'display_name', 'personal_bookmark_creator', 'from_event')
+        list_serializer_class = DateBookmarkListSerializer
 
 
 class DateBookmarkPersonalSerializer(serializers.ModelSerializer):
@@ -80,28 +113,30 @@ class DateBookmarkPersonalSerializer(serializers.ModelSerializer):
                   'display_name', 'personal_bookmark_creator')
 
 
-class CalendarDetailSerializer(serializers.ModelSerializer):
+class CalendarDetailSerializer(SparseFieldsModelSerializer):
     time_units = TimeUnitSerializer(source='timeunit_set', many=True)
     date_bookmarks = serializers.SerializerMethodField('get_date_bookmarks')
 
     def get_date_bookmarks(self, calendar):
-        date_bookmarks = DateBookmark.objects.filter(calendar_id=calendar.pk)
-        bookmark_serializer = DateBookmarkSerializer(instance=date_bookmarks, many=True)
-        bookmark_data = list(bookmark_serializer.data)
+        date_bookmarks = list(DateBookmark.objects.filter(calendar_id=calendar.pk).select_related(
+            'bookmark_unit__default_date_format', 'bookmark_sub_unit'))
         events = Event.objects.filter(calendar_id=calendar.pk).filter(
-            Q(navigable=True) | Q(navigable=None, event_group__isnull=False, event_group__navigable=True))
+            Q(navigable=True) | Q(navigable=None, event_group__isnull=False, event_group__navigable=True)).values_list(
+            'event_name', 'bottom_level_iteration')
+        bottom_level_time_unit = None
         fake_id = -11
-        for event in events:
-            event_bookmark = DateBookmark(id=fake_id, calendar=calendar, date_bookmark_name=str(event),
-                                          bookmark_unit=calendar.get_bottom_level_time_unit(),
-                                          bookmark_iteration=event.bottom_level_iteration,
-                                          bookmark_sub_unit=None)
+        for event_name, bottom_level_iteration in events:
+            if bottom_level_time_unit is None:  # looked up once, from the prefetched time units if there are any
+                bottom_level_time_unit = next(time_unit for time_unit in calendar.timeunit_set.all()
+                                              if time_unit.base_unit_id is None)
+            date_bookmarks.append(DateBookmark(id=fake_id, calendar=calendar, date_bookmark_name=event_name,
+                                               bookmark_unit=bottom_level_time_unit,
+                                               bookmark_iteration=bottom_level_iteration, bookmark_sub_unit=None))
             fake_id -= 1
-            event_serializer = DateBookmarkSerializer(instance=event_bookmark, many=False)
-            bookmark_data = bookmark_data + [event_serializer.data] if bookmark_data is not None \
-                else event_serializer.data
-        return bookmark_data
+        # the list serializer names every bookmark at once, in a context of its own since fake ids repeat
+        return DateBookmarkSerializer(instance=date_bookmarks, many=True, context=dict(self.context)).data
 
     class Meta:
         model = Calendar
-        fields = ('id', 'world', 'calendar_name', 'default_display_config', 'time_units', 'date_bookmarks')
+        fields = ('id', 'world', 'calendar_name', 'default_display_config', 'schema_version', 'content_version',
+                  'time_units', 'date_bookmarks')
@@ -0,0 +1,168 @@
+from django.db.models import Count, QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import World, Calendar, TimeUnit, Event, EventGroup, EventCountBucket, DateFormat, DisplayConfig, \
+    DisplayUnitConfig, DateBookmark
+
+# the models that keep a denormalized copy of their calendar's world
+CALENDAR_SCOPED_MODELS = [TimeUnit, Event, DateFormat, DisplayConfig, DateBookmark]
+# the models the API reads a world's content from, split by the version a change to them raises; event count
+# buckets are left out since they only ever change along with the events they count
+SCHEMA_MODELS = [World, Calendar, TimeUnit, DateFormat, DisplayConfig, DisplayUnitConfig]
+CONTENT_MODELS = [Event, EventGroup, DateBookmark]
+
+
+def get_origin_model(origin):
+    """
+    Return the model class behind the origin of a deletion, which is
+    either a model instance or a QuerySet.
+    """
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def get_world_and_calendar_ids(instance) -> tuple[int | None, int | None]:
+    """
+    Return the ids of the world and calendar a content model instance
+    is in as (world id, calendar id). The calendar id is None for a
+    world, and both are None if its calendar no longer exists.
+    """
+    if isinstance(instance, World):
+        return instance.pk, None
+    if isinstance(instance, Calendar):
+        return instance.world_id, instance.pk
+    if getattr(instance, 'world_id', None) is not None:
+        return instance.world_id, instance.calendar_id
+    if isinstance(instance, DisplayUnitConfig):
+        return DisplayConfig.objects.filter(pk=instance.display_config_id).values_list(
+            'calendar__world_id', 'calendar_id').first() or (None, None)
+    return Calendar.objects.filter(pk=instance.calendar_id).values_list('world_id', 'pk').first() or (None, None)
+
+
+def get_group_event_start_counts(event_group: EventGroup, sign: int) -> dict[int, int]:
+    """
+    Return a dict of {bottom_level_iteration: count} for the events
+    whose visibility follows the given event group, multiplied by sign.
+    """
+    return {row['bottom_level_iteration']: sign * row['event_count'] for row in
+            Event.objects.filter(event_group_id=event_group.pk, visible=None).values(
+                'bottom_level_iteration').annotate(event_count=Count('id')).order_by()}
+
+
+@receiver(pre_save, sender=Event)
+def remember_counted_event_start(sender, instance, raw=False, **kwargs):
+    # note where the stored version of the event was counted before it is overwritten
+    instance._counted_start = None
+    if raw or instance._state.adding:
+        return
+    stored = Event.objects.filter(pk=instance.pk).values_list('calendar_id', 'bottom_level_iteration', 'visible',
+                                                              'event_group__visible').first()
+    if stored is not None:
+        calendar_id, bottom_level_iteration, visible, event_group_visible = stored
+        if visible if visible is not None else event_group_visible is not False:
+            instance._counted_start = (calendar_id, bottom_level_iteration)
+
+
+@receiver(post_save, sender=Event)
+def update_event_count_buckets_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changes = dict()
+    counted_start = getattr(instance, '_counted_start', None)
+    if counted_start is not None:
+        changes.setdefault(counted_start[0], dict())[counted_start[1]] = -1
+    if instance.is_visible():
+        starts = changes.setdefault(instance.calendar_id, dict())
+        starts[instance.bottom_level_iteration] = starts.get(instance.bottom_level_iteration, 0) + 1
+    for calendar_id, start_counts in changes.items():
+        EventCountBucket.add_event_starts(calendar_id=calendar_id, start_counts=start_counts)
+
+
+@receiver(pre_delete, sender=Event)
+def update_event_count_buckets_on_delete(sender, instance, origin=None, **kwargs):
+    # deleting a whole calendar or world takes its buckets with it
+    if get_origin_model(origin) is Event and instance.is_visible():
+        EventCountBucket.add_event_starts(calendar_id=instance.calendar_id,
+                                          start_counts={instance.bottom_level_iteration: -1})
+
+
+@receiver(pre_save, sender=EventGroup)
+def remember_event_group_visibility(sender, instance, raw=False, **kwargs):
+    instance._counted_visible = None
+    if not raw and not instance._state.adding:
+        instance._counted_visible = EventGroup.objects.filter(pk=instance.pk).values_list('visible', flat=True).first()
+
+
+@receiver(post_save, sender=EventGroup)
+def update_event_count_buckets_on_event_group_save(sender, instance, raw=False, **kwargs):
+    counted_visible = getattr(instance, '_counted_visible', None)
+    if not raw and counted_visible is not None and counted_visible != instance.visible:
+        EventCountBucket.add_event_starts(calendar_id=instance.calendar_id, start_counts=get_group_event_start_counts(
+            event_group=instance, sign=1 if instance.visible else -1))
+
+
+@receiver(pre_delete, sender=EventGroup)
+def remember_event_group_events(sender, instance, origin=None, **kwargs):
+    # events left without a group become visible, so count the hidden ones before they are detached
+    instance._uncounted_starts = dict()
+    if get_origin_model(origin) is EventGroup and not instance.visible:
+        instance._uncounted_starts = get_group_event_start_counts(event_group=instance, sign=1)
+
+
+@receiver(post_delete, sender=EventGroup)
+def update_event_count_buckets_on_event_group_delete(sender, instance, **kwargs):
+    EventCountBucket.add_event_starts(calendar_id=instance.calendar_id,
+                                      start_counts=getattr(instance, '_uncounted_starts', dict()))
+
+
+@receiver(pre_save, sender=Calendar)
+def remember_calendar_world(sender, instance, raw=False, **kwargs):
+    instance._stored_world_id = None
+    if not raw and not instance._state.adding:
+        instance._stored_world_id = Calendar.objects.filter(pk=instance.pk).values_list('world_id', flat=True).first()
+
+
+@receiver(post_save, sender=Calendar)
+def move_calendar_scoped_rows(sender, instance, raw=False, **kwargs):
+    # a calendar moved to another world takes the denormalized world of its rows with it, and the world it left
+    # changes too; queryset updates skip this, so calendars must be moved with save()
+    stored_world_id = getattr(instance, '_stored_world_id', None)
+    if not raw and stored_world_id is not None and stored_world_id != instance.world_id:
+        for calendar_scoped_model in CALENDAR_SCOPED_MODELS:
+            calendar_scoped_model.objects.filter(calendar_id=instance.pk).update(world_id=instance.world_id)
+        World.bump_versions(world_id=stored_world_id, schema=True)
+
+
+def bump_versions(instance):
+    world_id, calendar_id = get_world_and_calendar_ids(instance)
+    if world_id is not None:
+        World.bump_versions(world_id=world_id, calendar_id=calendar_id, schema=type(instance) in SCHEMA_MODELS)
+
+
+def bump_versions_on_save(sender, instance, raw=False, **kwargs):
+    bump_versions(instance)
+
+
+def bump_versions_on_delete(sender, instance, origin=None, **kwargs):
+    # a cascade is covered by the bump for the instance it started from
+    if get_origin_model(origin) is sender:
+        bump_versions(instance)
+
+
+@receiver(m2m_changed, sender=DisplayUnitConfig.searchable_date_formats.through)
+def bump_versions_on_searchable_date_formats_change(sender, instance, action, **kwargs):
+    # form and admin saves write many-to-many rows after post_save, so the bump on save can come too early
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_versions(instance)
+
+
+def set_world_id(sender, instance, raw=False, **kwargs):
+    # rows loaded raw, as by loaddata, already carry their world
+    if not raw:
+        instance.world_id = instance.calendar.world_id
+
+
+for calendar_scoped_model in CALENDAR_SCOPED_MODELS:
+    pre_save.connect(set_world_id, sender=calendar_scoped_model)
+for versioned_model in SCHEMA_MODELS + CONTENT_MODELS:
+    post_save.connect(bump_versions_on_save, sender=versioned_model)
+    post_delete.connect(bump_versions_on_delete, sender=versioned_model)
@@ -0,0 +1,310 @@
+import json
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import World, Calendar, TimeUnit, DateFormat, DisplayConfig, DisplayUnitConfig, EventGroup, \
+    DateBookmark, Event, EventCountBucket, VERSION_FIELDS
+
+SNAPSHOT_FORMAT = 'fantasycalendar-snapshot'
+SNAPSHOT_VERSION = 1
+CHUNK_SIZE = 2000  # rows read per database round trip and written per chunk of output or bulk_create
+
+# every foreign key in a snapshot points to a row earlier in this order except the ones to a model at or after
+# its own position, which are left empty on the first pass of an import and filled in on the second
+SNAPSHOT_MODELS = [
+    World,
+    Calendar,
+    TimeUnit,
+    DateFormat,
+    DisplayConfig,
+    DisplayUnitConfig,
+    DisplayUnitConfig.searchable_date_formats.through,
+    EventGroup,
+    DateBookmark,
+    Event,
+]
+# a clone is exactly the same as the original, so its event count pyramid can be copied rather than rebuilt
+CLONE_MODELS = SNAPSHOT_MODELS + [EventCountBucket]
+
+
+def get_snapshot_fields(model) -> list:
+    """
+    Return the concrete fields of a model stored in a snapshot, which
+    is every one except the primary key and the version counters, which
+    start over on a copy.
+    """
+    return [field for field in model._meta.concrete_fields
+            if not field.primary_key and field.name not in VERSION_FIELDS]
+
+
+def get_querysets(calendar_q: Q, world_q: Q, personal_bookmark_creator_id: int | None) -> list:
+    """
+    Return a queryset for each model in CLONE_MODELS, in the same
+    order, with the rows on the calendars matched by calendar_q (given
+    as lookups on a Calendar) and the worlds matched by world_q.
+    Personal bookmarks are only included for the given user.
+    """
+    def on_calendars(prefix: str) -> Q:
+        return Q(**{prefix + '__in': Calendar.objects.filter(calendar_q)})
+    return [
+        World.objects.filter(world_q),
+        Calendar.objects.filter(calendar_q),
+        TimeUnit.objects.filter(on_calendars('calendar')),
+        DateFormat.objects.filter(on_calendars('calendar')),
+        DisplayConfig.objects.filter(on_calendars('calendar')),
+        DisplayUnitConfig.objects.filter(on_calendars('display_config__calendar')),
+        DisplayUnitConfig.searchable_date_formats.through.objects.filter(
+            on_calendars('displayunitconfig__display_config__calendar')),
+        EventGroup.objects.filter(on_calendars('calendar')),
+        DateBookmark.objects.filter(on_calendars('calendar')).filter(
+            Q(personal_bookmark_creator=None) | Q(personal_bookmark_creator=personal_bookmark_creator_id)),
+        Event.objects.filter(on_calendars('calendar')),
+        EventCountBucket.objects.filter(on_calendars('calendar')),
+    ]
+
+
+def get_rows(models: list, querysets: list):
+    """
+    Yield a (model, pk, {attname: value}) tuple for every row in a list
+    of querysets of the given models, reading CHUNK_SIZE rows at a time
+    as plain values so memory use stays flat no matter how many rows
+    there are.
+    """
+    for model, queryset in zip(models, querysets):
+        attnames = [field.attname for field in get_snapshot_fields(model)]
+        for row in queryset.order_by('pk').values('pk', *attnames).iterator(chunk_size=CHUNK_SIZE):
+            yield model, row.pop('pk'), row
+
+
+def export_world(world: World):
+    """
+    Yield a snapshot of a world and everything in it as chunks of JSON
+    Lines text: a header line, then one line per row in the order of
+    SNAPSHOT_MODELS. Personal bookmarks are only included for the
+    world's creator.
+    """
+    yield json.dumps({'snapshot_format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+                      'exported_at': datetime.now(timezone.utc).isoformat(), 'world_id': world.pk}) + '\n'
+    lines = []
+    querysets = get_querysets(calendar_q=Q(world_id=world.pk), world_q=Q(pk=world.pk),
+                              personal_bookmark_creator_id=world.creator_id)
+    for model, pk, fields in get_rows(SNAPSHOT_MODELS, querysets[:len(SNAPSHOT_MODELS)]):
+        lines.append(json.dumps({'model': model._meta.model_name, 'pk': pk, 'fields': fields}))
+        if len(lines) >= CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if len(lines) > 0:
+        yield '\n'.join(lines) + '\n'
+
+
+class SnapshotImport:
+    """
+    The state of one snapshot import or clone: the new primary key for
+    every row copied so far and the foreign keys left to fill in once
+    the rows they point to exist.
+    """
+    def __init__(self, creator, models: list = None):
+        self.creator = creator
+        self.models = models if models is not None else SNAPSHOT_MODELS
+        self.model_positions = {model._meta.model_name: position for position, model in enumerate(self.models)}
+        self.new_pks = {model: dict() for model in self.models}
+        self.deferred = {model: dict() for model in self.models}  # {model: {attname: [(new pk, old target pk)]}}
+        self.calendar_world_ids = dict()  # {new calendar pk: new world pk}
+        self.can_bulk_create_with_pks = connection.features.can_return_rows_from_bulk_insert
+
+    def get_new_pk(self, model, old_pk):
+        if old_pk is None:
+            return None
+        if old_pk not in self.new_pks[model]:
+            raise ValueError('snapshot refers to ' + model._meta.model_name + ' ' + str(old_pk)
+                             + ' before or without including it')
+        return self.new_pks[model][old_pk]
+
+    def build_instance(self, model, fields: dict, deferred: list):
+        """
+        Return an unsaved instance of model from the fields of a
+        snapshot row with its foreign keys pointed at the new rows, and
+        add any it can't point yet to deferred as (attname, old pk).
+        """
+        values = dict()
+        position = self.models.index(model)
+        for field in get_snapshot_fields(model):
+            if field.attname not in fields:
+                continue  # leave fields missing from older snapshots at their defaults
+            value = fields[field.attname]
+            if field.remote_field is not None:
+                target = field.remote_field.model
+                if target._meta.label == settings.AUTH_USER_MODEL:
+                    value = self.creator.pk if value is not None else None  # users don't move between environments
+                elif self.models.index(target) >= position:
+                    if value is not None:
+                        deferred.append((field.attname, value))
+                    value = None
+                else:
+                    value = self.get_new_pk(target, value)
+            values[field.attname] = value
+        if hasattr(model, 'world') and 'calendar_id' in values and values.get('world_id') is None:
+            values['world_id'] = self.calendar_world_ids.get(values['calendar_id'])  # older snapshots lack it
+        if model is DateFormat:
+            values['format_string'] = DateFormat.remap_time_unit_ids(values['format_string'], self.new_pks[TimeUnit])
+        return model(**values)
+
+    def write_rows(self, model, rows: list[tuple[int, dict]]):
+        """
+        Create a chunk of snapshot rows of one model at once and record
+        their new primary keys.
+        """
+        instances = []
+        deferred_by_row = []
+        for _, fields in rows:
+            deferred = []
+            instances.append(self.build_instance(model, fields, deferred))
+            deferred_by_row.append(deferred)
+        if model in (Event, EventCountBucket):
+            model.objects.bulk_create(instances, batch_size=CHUNK_SIZE)  # nothing points at these
+            return
+        if self.can_bulk_create_with_pks:
+            model.objects.bulk_create(instances, batch_size=CHUNK_SIZE)
+        else:
+            for instance in instances:  # only the rows other rows point at are saved one by one
+                instance.save()
+        for (old_pk, _), instance, deferred in zip(rows, instances, deferred_by_row):
+            self.new_pks[model][old_pk] = instance.pk
+            if model is Calendar:
+                self.calendar_world_ids[instance.pk] = instance.world_id
+            for attname, old_target_pk in deferred:
+                self.deferred[model].setdefault(attname, []).append((instance.pk, old_target_pk))
+
+    def fill_deferred(self):
+        """
+        Point the foreign keys left empty on the first pass at their
+        new rows, one bulk_update per foreign key.
+        """
+        for model in self.models:
+            for attname, pairs in self.deferred[model].items():
+                target = model._meta.get_field(attname[:-len('_id')]).remote_field.model
+                model.objects.bulk_update([model(pk=new_pk, **{attname: self.get_new_pk(target, old_target_pk)})
+                                           for new_pk, old_target_pk in pairs], [attname], batch_size=CHUNK_SIZE)
+
+    def copy_rows(self, rows):
+        """
+        Create a copy of every (model, pk, fields) row in an iterable,
+        which must be in the order of self.models, CHUNK_SIZE at a time,
+        then fill in the deferred foreign keys.
+        """
+        model = None
+        chunk = []
+        for row_model, pk, fields in rows:
+            if row_model is not model or len(chunk) >= CHUNK_SIZE:
+                if len(chunk) > 0:
+                    self.write_rows(model, chunk)
+                if model is not None and self.models.index(row_model) < self.models.index(model):
+                    raise ValueError('snapshot rows are out of order')
+                model = row_model
+                chunk = []
+            chunk.append((pk, fields))
+        if len(chunk) > 0:
+            self.write_rows(model, chunk)
+        self.fill_deferred()
+        if EventCountBucket not in self.models:
+            for calendar_id in self.new_pks[Calendar].values():
+                EventCountBucket.rebuild(calendar_id)  # bulk_create skips the signals that keep these current
+        for world_id in self.new_pks[World].values():
+            World.bump_versions(world_id=world_id, schema=True)
+        for calendar_id, world_id in self.calendar_world_ids.items():
+            World.bump_versions(world_id=world_id, calendar_id=calendar_id, schema=True)
+
+    def read_rows(self, lines):
+        """
+        Yield a (model, pk, fields) tuple for every row in the lines of
+        a snapshot after checking its header.
+        """
+        header = json.loads(next(lines, '') or '{}')
+        if header.get('snapshot_format') != SNAPSHOT_FORMAT:
+            raise ValueError('not a snapshot')
+        if not isinstance(header.get('version'), int) or header['version'] > SNAPSHOT_VERSION:
+            raise ValueError('snapshot version ' + str(header.get('version')) + ' is newer than this site supports')
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or 'pk' not in record or not isinstance(record.get('fields'), dict):
+                raise ValueError('malformed snapshot row')
+            if record.get('model') not in self.model_positions:
+                raise ValueError('unknown model in snapshot: ' + str(record.get('model')))
+            yield self.models[self.model_positions[record['model']]], record['pk'], record['fields']
+
+
+def import_world(lines, creator) -> World:
+    """
+    Create a copy of the world in a snapshot from export_world, given
+    as an iterable of its lines, owned by creator, and return it. The
+    whole import happens in one transaction, so a snapshot that can't
+    be read leaves nothing behind.
+
+    Rows are created CHUNK_SIZE at a time with bulk_create as they are
+    read, with every foreign key pointed at the new copy of its row.
+    Foreign keys that point forward in SNAPSHOT_MODELS (or at the same
+    model), such as default_display_config and default_date_format,
+    are filled in by a second pass once every row exists.
+    """
+    snapshot_import = SnapshotImport(creator)
+    with transaction.atomic():
+        snapshot_import.copy_rows(snapshot_import.read_rows(iter(lines)))
+        if len(snapshot_import.new_pks[World]) != 1:
+            raise ValueError('a snapshot must contain exactly one world')
+    return World.objects.get(pk=next(iter(snapshot_import.new_pks[World].values())))
+
+
+def set_row_field(rows, model, field_name: str, value):
+    """
+    Yield every row in an iterable of (model, pk, fields) tuples with
+    field_name set to value on the rows of the given model, unless
+    value is None.
+    """
+    for row_model, pk, fields in rows:
+        if row_model is model and value is not None:
+            fields[field_name] = value
+        yield row_model, pk, fields
+
+
+def clone_world(world: World, creator, world_name: str = None, public: bool = False) -> World:
+    """
+    Create a copy of a world and everything in it owned by creator,
+    optionally with a new name, and return it. Only creator's personal
+    bookmarks are copied.
+
+    The copy is private unless public is True, whether or not the
+    original is public, so nobody republishes a world they can only
+    view without choosing to.
+
+    Rows are copied straight from the database CHUNK_SIZE at a time
+    with bulk_create in one transaction, the same way as import_world,
+    and the event count pyramid is copied rather than rebuilt.
+    """
+    clone = SnapshotImport(creator, models=CLONE_MODELS)
+    rows = get_rows(CLONE_MODELS, get_querysets(calendar_q=Q(world_id=world.pk), world_q=Q(pk=world.pk),
+                                                personal_bookmark_creator_id=creator.pk))
+    with transaction.atomic():
+        clone.copy_rows(set_row_field(set_row_field(rows, World, 'world_name', world_name or None), World, 'public',
+                                      public))
+    return World.objects.get(pk=clone.new_pks[World][world.pk])
+
+
+def clone_calendar(calendar: Calendar, creator, world: World = None, calendar_name: str = None) -> Calendar:
+    """
+    Create a copy of a calendar and everything in it in world (by
+    default the calendar's own world), optionally with a new name, and
+    return it. Only creator's personal bookmarks are copied.
+
+    See clone_world for how the rows are copied.
+    """
+    clone = SnapshotImport(creator, models=CLONE_MODELS)
+    clone.new_pks[World][calendar.world_id] = world.pk if world is not None else calendar.world_id
+    rows = get_rows(CLONE_MODELS, get_querysets(calendar_q=Q(pk=calendar.pk), world_q=Q(pk__in=[]),
+                                                personal_bookmark_creator_id=creator.pk))
+    with transaction.atomic():
+        clone.copy_rows(set_row_field(rows, Calendar, 'calendar_name', calendar_name or None))
+    return Calendar.objects.get(pk=clone.new_pks[Calendar][calendar.pk])
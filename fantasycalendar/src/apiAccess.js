@@ -30,10 +30,102 @@ export function getCalendarDetail(calendarId, then) {
     getAuthenticated(url, then);
 }
 
+// pages fetched ahead of time by getCalendarPages, by the url getCalendarPage would have fetched them from
+const prefetchedCalendarPages = new Map();
+const prefetchedCalendarPageLifetime = 60 * 1000;  // milliseconds
+
+function getCalendarPageUrl(timeUnitId, subUnitId, iteration, displayConfigId) {
+    return 'calendarpage/?time_unit_id=' + timeUnitId + '&iteration=' + iteration
+        + (displayConfigId != null ? '&display_config_id=' + displayConfigId : '')
+        + (subUnitId != null ? '&sub_unit_id=' + subUnitId : '') + '&format=columnar';
+}
+
+// columns of a columnar page's dates that are delta encoded or refer to its event table (see calendar_pages.py)
+const deltaColumns = ['time_unit_id', 'iteration', 'first_bottom_level_iteration', 'last_bottom_level_iteration',
+    'block_number'];
+const eventColumns = ['events', 'linked_events'];
+
+// pages are fetched with format=columnar, which is smaller to send; this turns one back into a dict per date
+function decodeColumnarPage(page) {
+    if (Array.isArray(page.calendar_dates)) return page;  // very large pages are streamed as plain JSON
+    const eventKeys = Object.keys(page.event_table);
+    const eventCount = eventKeys.length > 0 ? page.event_table[eventKeys[0]].length : 0;
+    const events = [];
+    for (let index = 0; index < eventCount; index++)
+        events.push(Object.fromEntries(eventKeys.map(key => [key, page.event_table[key][index]])));
+    const columns = page.calendar_dates.columns;
+    const dates = [];
+    for (let index = 0; index < page.calendar_dates.length; index++) {
+        const date = {};
+        for (const key in columns) {
+            if (deltaColumns.includes(key))
+                date[key] = index > 0 ? dates[index - 1][key] + columns[key][index] : columns[key][index];
+            else if (eventColumns.includes(key))
+                date[key] = columns[key][index].map(eventIndex => events[eventIndex]);
+            else
+                date[key] = columns[key][index];
+        }
+        dates.push(date);
+    }
+    const { event_table, ...data } = page;
+    return { ...data, calendar_dates: dates };
+}
+
 export function getCalendarPage(timeUnitId, subUnitId, iteration, displayConfigId, then) {
-    const url = 'calendarpage/?time_unit_id=' + timeUnitId + '&iteration=' + iteration
+    const url = getCalendarPageUrl(timeUnitId, subUnitId, iteration, displayConfigId);
+    const prefetched = prefetchedCalendarPages.get(url);
+    prefetchedCalendarPages.delete(url);
+    if (prefetched && Date.now() - prefetched.time < prefetchedCalendarPageLifetime) {
+        then({ data: prefetched.data });
+        return;
+    }
+    getAuthenticated(url, res => then({ ...res, data: decodeColumnarPage(res.data) }));
+}
+
+// everything needed to show a calendar at first in one request; the initial page is kept for getCalendarPage
+export function getCalendarBootstrap(calendarId, displayConfigId, displayUnitId, displaySubUnitId, displayIteration, then) {
+    const url = 'calendarbootstrap/?calendar_id=' + calendarId
         + (displayConfigId != null ? '&display_config_id=' + displayConfigId : '')
-        + (subUnitId != null ? '&sub_unit_id=' + subUnitId : '');
+        + (displayUnitId ? '&display_unit_id=' + displayUnitId : '')
+        + (displayUnitId && displaySubUnitId ? '&display_sub_unit_id=' + displaySubUnitId : '')
+        + (displayIteration ? '&display_iteration=' + displayIteration : '');
+    getAuthenticated(url, res => {
+        const page = res.data.page;
+        if (page && page.data)
+            prefetchedCalendarPages.set(getCalendarPageUrl(page.time_unit_id, page.sub_unit_id, page.iteration,
+                page.display_config_id), { data: page.data, time: Date.now() });
+        then(res);
+    });
+}
+
+// pages is a list of {timeUnitId, subUnitId, iteration}; every page returned is kept for getCalendarPage
+export function getCalendarPages(calendarId, pages, displayConfigId, then) {
+    if (pages.length == 0) return;
+    const url = 'calendarpages/?calendar_id=' + calendarId
+        + '&pages=' + pages.map(page => page.timeUnitId + ':' + (page.subUnitId ?? '') + ':' + page.iteration).join(',')
+        + (displayConfigId != null ? '&display_config_id=' + displayConfigId : '') + '&format=columnar';
+    getAuthenticated(url, res => {
+        const time = Date.now();
+        const pages = res.data.pages.map(page => page.data ? { ...page, data: decodeColumnarPage(page.data) } : page);
+        pages.forEach(page => {
+            if (page.data)
+                prefetchedCalendarPages.set(getCalendarPageUrl(page.time_unit_id, page.sub_unit_id, page.iteration,
+                    displayConfigId), { data: page.data, time: time });
+        });
+        then({ ...res, data: { ...res.data, pages: pages } });
+    });
+}
+
+export function getEventCounts(timeUnitId, subUnitId, iteration, groupByEventGroup, then) {
+    const url = 'eventcounts/?time_unit_id=' + timeUnitId + '&iteration=' + iteration
+        + (subUnitId != null ? '&sub_unit_id=' + subUnitId : '')
+        + (groupByEventGroup ? '&group_by_event_group=1' : '');
+    getAuthenticated(url, then);
+}
+
+export function getEventSearch(calendarId, searchText, page, then) {
+    const url = 'eventsearch/?calendar_id=' + calendarId + '&q=' + encodeURIComponent(searchText)
+        + '&page=' + page;
     getAuthenticated(url, then);
 }
 
@@ -47,8 +139,10 @@ export function getTimeUnitsByCalendarId(calendarId, then) {
     getAuthenticated(url, then);
 }
 
-export function getTimeUnitBaseInstances(timeUnitId, iteration, then) {
-    const url = 'timeunitbaseinstances/?time_unit_id=' + timeUnitId + '&iteration=' + iteration;
+// stages lists what to pull for each instance besides its name: events, display_names, linked_display_names and
+// linked_events
+export function getTimeUnitBaseInstances(timeUnitId, iteration, stages, then) {
+    const url = 'timeunitbaseinstances/?time_unit_id=' + timeUnitId + '&iteration=' + iteration + '&stages=' + stages.join(',');
     getAuthenticated(url, then);
 }
 
@@ -67,6 +161,12 @@ export function getTimeUnitContainedIteration(timeUnitId, iteration, containingT
     getAuthenticated(url, then);
 }
 
+// conversions is a list of {time_unit_id, iteration, target_unit_id}; the result has the equivalent_iteration and
+// contained_iteration of each, in the same order
+export function postTimeUnitConversions(conversions, then) {
+    postAuthenticated('timeunitconversions/', { conversions: conversions }, then);
+}
+
 export function getDateFormatReverse(dateFormat, possibleFormats, then) {
     const url = 'dateformatreverse/?formatted_date=' + dateFormat + '&possible_formats=' + possibleFormats;
     getAuthenticated(url, then);
@@ -87,6 +187,11 @@ export function getDateBookmarksByCalendarId(calendarId, then) {
     getAuthenticated(url, then);
 }
 
+export function getDateBookmarkEventCounts(calendarId, then) {
+    const url = 'datebookmarkeventcounts/?calendar_id=' + calendarId;
+    getAuthenticated(url, then);
+}
+
 function getCookie(name) {  // copied from https://docs.djangoproject.com/en/3.2/ref/csrf/#ajax
     let cookieValue = null;
     if (document.cookie && document.cookie !== '') {
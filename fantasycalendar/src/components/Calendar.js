@@ -27,125 +27,58 @@ export default class Calendar extends React.Component {
         const loadData = async(calendar, displayConfig) => {
             // start calling API in the background to cache some data
             // always call this last after the API calls that are actually needed
-            const loadCalendarPage = async(timeUnit, subUnit, iteration, displayConfig = null) => {
-                api.getCalendarPage(timeUnit.id, subUnit?.id, iteration, displayConfig?.id, res => {});
-            };
-            calendar.date_bookmarks.forEach((bookmark) => {  // for bookmarks
-                loadCalendarPage(calendar.time_units.find(x => x.id == bookmark.bookmark_unit),
-                bookmark.bookmark_sub_unit != null ? calendar.time_units.find(x => x.id == bookmark.bookmark_sub_unit) : null,
-                bookmark.bookmark_iteration,
-                displayConfig);
-            });
+            // pages for every bookmark come back from one request
+            api.getCalendarPages(calendar.id, calendar.date_bookmarks.map(bookmark => ({
+                timeUnitId: bookmark.bookmark_unit,
+                subUnitId: bookmark.bookmark_sub_unit,
+                iteration: bookmark.bookmark_iteration,
+            })), displayConfig?.id ?? 0, res => {});
         };
 
         // required props validation
         if (!this.props.hasOwnProperty('calendarId') || !(this.props.calendarId)) return;  // note: 0 is an invalid calendarId, failing there is intentional
 
-        var calendar_id = this.props.calendarId;
-        api.getUserStatusByCalendarId(calendar_id, res => {
-            this.setState({ userStatus: res.data.user_status });
-        });
-        api.getCalendarDetail(calendar_id, resCalendar => {
-            const calendar = resCalendar.data;
+        // user status, calendar, display config and the initial page all come back from one request, with the
+        // initial page picked with priority props > config default > first time unit, and iteration priority
+        // props > default bookmark > 1
+        // 0 can be passed explicitly to this.props.displayConfigId to force using no display config on calendars with a default set
+        const displayIteration = this.props.hasOwnProperty('displayIteration') && typeof this.props.displayIteration === 'number' && this.props.displayIteration > 0 ? this.props.displayIteration : null;
+        api.getCalendarBootstrap(this.props.calendarId, this.props.displayConfigId, this.props.displayUnitId, this.props.displaySubUnitId, displayIteration, res => {
+            const calendar = res.data.calendar;
+            const displayConfig = res.data.display_config;
+            const page = res.data.page;
+
+            // only show bookmarks with a matching time unit page if there is a display config
+            const allowedBookmarks = displayConfig ? calendar.date_bookmarks.filter(dateBookmark => displayConfig.display_unit_configs.find(page => page.time_unit == dateBookmark.bookmark_unit && page.sub_unit == dateBookmark.bookmark_sub_unit)) : calendar.date_bookmarks;
             this.setState({
+                userStatus: res.data.user_status,
                 calendar: calendar,
                 timeUnits: calendar.time_units,
+                displayConfig: displayConfig ?? '',
+                dateBookmarks: allowedBookmarks,
+                displayUnit: page ? calendar.time_units.find(x => x.id == page.time_unit_id) : '',
+                displaySubUnit: page && page.sub_unit_id ? calendar.time_units.find(x => x.id == page.sub_unit_id) : '',
+                displayIteration: page ? page.iteration : '',
             });
-            var displayConfigId = this.props.displayConfigId ?? calendar.default_display_config;
-            if (displayConfigId)  // 0 can be passed explicitly to this.props.displayConfigId to force using no display config on calendars with a default set
-            {
-                api.getDisplayConfig(displayConfigId, resDisplayConfig => {
-                    // save full display config to state
-                    const displayConfig = resDisplayConfig.data;
-                    this.setState({ displayConfig: displayConfig });
-
-                    // only show bookmarks with a matching time unit page
-                    const allowedBookmarks = calendar.date_bookmarks.filter(dateBookmark => displayConfig.display_unit_configs.find(page => page.time_unit == dateBookmark.bookmark_unit && page.sub_unit == dateBookmark.bookmark_sub_unit));
-                    this.setState({ dateBookmarks: allowedBookmarks });
-
-                    // determine initial time unit page with priority props > config default
-                    var displayUnit = calendar.time_units.find(x => x.id == displayConfig.display_unit_configs.find(y => y.id == displayConfig.default_display_unit_config).time_unit);
-                    var displaySubUnit = calendar.time_units.find(x => x.id == displayConfig.display_unit_configs.find(y => y.id == displayConfig.default_display_unit_config).sub_unit);
-                    if (this.props.hasOwnProperty('displayUnitId') && this.props.displayUnitId)
-                    {
-                        var matchingPage = null;
-                        if (this.props.hasOwnProperty('displaySubUnitId') && this.props.displaySubUnitId)
-                        {
-                            // must have a page matching time unit AND sub unit if sub unit is provided
-                            matchingPage = displayConfig.display_unit_configs.find(x => x.time_unit == this.props.displayUnitId && x.sub_unit == this.props.displaySubUnitId);
-                        }
-                        else
-                        {
-                            // must page a page matching time unit with NO sub unit if sub unit is not provided
-                            matchingPage = displayConfig.display_unit_configs.find(x => x.time_unit == this.props.displayUnitId && (!x.sub_unit || x.sub_unit == x.time_unit));
-                        }
-                        if (matchingPage)  // reassign to page specified by props if props are provided and the page exists
-                        {
-                            displayUnit = calendar.time_units.find(x => x.id == this.props.displayUnitId);
-                            displaySubUnit = (this.props.hasOwnProperty('displaySubUnitId') && this.props.displaySubUnitId) ? calendar.time_units.find(x => x.id == this.props.displaySubUnitId) : null;
-                        }
-                    }
-                    this.setState({ displayUnit: displayUnit });
-                    if (displaySubUnit)
-                    {
-                        this.setState({ displaySubUnit: displaySubUnit });
-                    }
-
-                    // determine initial iteration with priority prop > default bookmark > 1
-                    if (this.props.hasOwnProperty('displayIteration') && this.props.displayIteration && typeof this.props.displayIteration === 'number' && this.props.displayIteration > 0)
-                    {
-                        this.setState({ displayIteration: this.props.displayIteration });
-                    }
-                    else if (displayConfig.default_date_bookmark)
-                    {
-                        const defaultDateBookmark = allowedBookmarks.find(x => x.id == displayConfig.default_date_bookmark);
-                        if (defaultDateBookmark)
-                        {
-                            this.setState({ displayIteration: defaultDateBookmark.bookmark_iteration });
-                        }
-                    }
-                    else
-                    {
-                        this.setState({ displayIteration: 1 });
-                    }
-                    loadData(calendar, displayConfig);
-                });
-            }
-            else  // if there is no display config being used, checks for what is allowed are much less strict
-            {
-                // all pages are allowed, so all bookmarks are allowed
-                this.setState({ dateBookmarks: calendar.date_bookmarks });
-
-                // determine initial time unit page with priority props > config default
-                if (this.props.hasOwnProperty('displayUnitId') && this.props.displayUnitId && calendar.time_units.find(x => x.id == this.props.displayUnitId))
-                {
-                    this.setState({ displayUnit: calendar.time_units.find(x => x.id == this.props.displayUnitId) });
-
-                    // must specify a time unit to specify a sub unit
-                    if (this.props.hasOwnProperty('displaySubUnitId') && this.props.displaySubUnitId  && calendar.time_units.find(x => x.id == this.props.displaySubUnitId))
-                    {
-                        this.setState({ displaySubUnit: calendar.time_units.find(x => x.id == this.props.displaySubUnitId) });
-                    }
-                }
-                else
-                {
-                    this.setState({ displayUnit: calendar.time_units[0] });
-                }
-
-                // determine initial iteration with priority prop > 1
-                if (this.props.hasOwnProperty('displayIteration') && this.props.displayIteration && typeof this.props.displayIteration === 'number' && this.props.displayIteration > 0)
-                {
-                    this.setState({ displayIteration: this.props.displayIteration });
-                }
-                else
-                {
-                    this.setState({ displayIteration: 1 });
-                }
-                loadData(calendar);
-            }
+            loadData(calendar, displayConfig);
         });
     }
 
+    componentDidUpdate(prevProps, prevState) {
+        // fetch the pages on either side of a newly shown page in the background so paging is instant
+        if (this.state.displayUnit && this.state.displayIteration && (prevState.displayUnit !== this.state.displayUnit
+            || prevState.displaySubUnit !== this.state.displaySubUnit
+            || prevState.displayIteration !== this.state.displayIteration))
+        {
+            const neighbours = [this.state.displayIteration - 1, this.state.displayIteration + 1].filter(x => x >= 1);
+            api.getCalendarPages(this.state.calendar.id, neighbours.map(iteration => ({
+                timeUnitId: this.state.displayUnit.id,
+                subUnitId: this.state.displaySubUnit ? this.state.displaySubUnit.id : null,
+                iteration: iteration,
+            })), this.state.displayConfig ? this.state.displayConfig.id : 0, res => {});
+        }
+    }
+
     handlePageBackClick = () => {
         if (this.state.displayIteration > 1)  // don't go below 1
             this.setState({ displayIteration: this.state.displayIteration - 1 });
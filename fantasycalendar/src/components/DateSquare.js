@@ -19,7 +19,9 @@ export default function DateSquare({ timeUnitId, subUnitId, timeUnitInstance, he
 
     displayEvents.slice(0, maxEvents).forEach((event) => {
         rows.push(
-            <EventRow key={event.id} event={event} showDescription={showEventDescription} />
+            <EventRow key={event.id} event={event} showDescription={showEventDescription}
+                continuesBefore={event.bottom_level_iteration < timeUnitInstance.first_bottom_level_iteration}
+                continuesAfter={event.last_bottom_level_iteration > timeUnitInstance.last_bottom_level_iteration} />
         );
     });
 
@@ -13,7 +13,9 @@ export default function DateSquares({ timeUnit, iteration, timeUnitPages, rowGro
 
     React.useEffect(() => {
         setLoading(n => n + 1);
-        getTimeUnitBaseInstances(timeUnit.id, iteration, res => {
+        const stages = ['events', 'display_names'].concat(showLinkedDisplayNames ? ['linked_display_names'] : [],
+            showLinkedEvents ? ['linked_events'] : []);
+        getTimeUnitBaseInstances(timeUnit.id, iteration, stages, res => {
             setBaseUnitInstances(res.data);
             if (res.data && res.data.length > 0)
             {
@@ -21,7 +23,7 @@ export default function DateSquares({ timeUnit, iteration, timeUnitPages, rowGro
                 if (rowGroupingUnit)  // these extra calls cause a lot of slowdown for whatever reason
                 {
                     setLoading(n => n + 1);
-                    getTimeUnitBaseInstances(rowGroupingUnit.id, 1, res3 => {
+                    getTimeUnitBaseInstances(rowGroupingUnit.id, 1, [], res3 => {  // only the names are shown
                         setRowBaseUnitInstances(res3.data);
                         setLoading(n => n - 1);
                     });
@@ -39,7 +41,7 @@ export default function DateSquares({ timeUnit, iteration, timeUnitPages, rowGro
             setRowBaseUnitInstances(null);
             setFirstRowOffset(0);
         }
-    }, [timeUnit, iteration, rowGroupingUnit, rowGroupingLabelType]);
+    }, [timeUnit, iteration, rowGroupingUnit, rowGroupingLabelType, showLinkedDisplayNames, showLinkedEvents]);
 
     if (!baseUnitId || !baseUnitInstances || loading > 0) return (
         <div className="grid-container" style={{gridTemplateColumns: 'auto', justifyContent: 'center'}}>
@@ -1,27 +1,31 @@
 import React from 'react';
 
-export default function EventRow({ event, showDescription }) {
+export default function EventRow({ event, showDescription, continuesBefore = false, continuesAfter = false }) {
+    // multi-day events show on every square they overlap, marked on the sides where they keep going
+    const spanClassName = (continuesBefore ? ' event-continues-before' : '') + (continuesAfter ? ' event-continues-after' : '');
+    const eventName = (continuesBefore ? '\u25C2 ' : '') + event.event_name + (continuesAfter ? ' \u25B8' : '');
+
     if (!showDescription || !event.event_description)
     {
         return (
-            <div className="grid-item-row">
-                { event.event_name }
+            <div className={"grid-item-row" + spanClassName}>
+                { eventName }
             </div>
         );
     }
     else if (event.event_description.includes('\n'))
     {
         return (
-            <div className="grid-item-row-long display-linebreak">
-                <b>{ event.event_name }</b><p>{ event.event_description }</p>
+            <div className={"grid-item-row-long display-linebreak" + spanClassName}>
+                <b>{ eventName }</b><p>{ event.event_description }</p>
             </div>
         );
     }
     else
     {
         return (
-            <div className="grid-item-row-long">
-                <b>{ event.event_name }:</b> { event.event_description }
+            <div className={"grid-item-row-long" + spanClassName}>
+                <b>{ eventName }:</b> { event.event_description }
             </div>
         );
     }
@@ -1,7 +1,31 @@
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-
-from django.test import TestCase
-from .models import TimeUnit, Calendar, World, DateFormat, DisplayConfig, DisplayUnitConfig
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models import TimeUnit, Calendar, World, DateFormat, DisplayConfig, DisplayUnitConfig, Event, EventGroup, \
+    EventCountBucket, DateBookmark
+from . import calendar_cache, calendar_pages, event_import, page_cache, precompute
+from .event_import import import_events, read_csv_rows, read_jsonl_rows
+from .calendar_pages import from_columnar
+from .search import search_events, search_events_by_substring
+from .renderers import iter_page_json
+from .snapshots import export_world, import_world, clone_world, clone_calendar
+from .access import AccessResolver
 
 
 class CalendarModelTests(TestCase):
@@ -801,6 +825,59 @@ class TimeUnitModelTests(TestCase):
         self.assertEqual(time_unit.get_iteration_at_bottom_level_iteration(481), 4)
         self.assertEqual(time_unit.get_iteration_at_bottom_level_iteration(482), 5)
 
+    def test_get_bottom_level_ranges_at_iterations_with_level_three_unit(self):
+        """
+        get_bottom_level_ranges_at_iterations() returns the first and
+        last bottom level iteration of each instance, including
+        instances with a leap length.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        day = TimeUnit.objects.create(calendar=calendar)
+        month = TimeUnit.objects.create(calendar=calendar, base_unit=day, length_cycle='30 30.5')
+        year = TimeUnit.objects.create(calendar=calendar, base_unit=month, length_cycle='2')
+        self.assertEqual(month.get_bottom_level_ranges_at_iterations([1, 2, 3, 4]),
+                         [(1, 30), (31, 60), (61, 90), (91, 121)])
+        self.assertEqual(year.get_bottom_level_ranges_at_iterations([2, 1]), [(61, 121), (1, 60)])
+
+    def test_get_event_counts_at_iterations(self):
+        """
+        get_event_counts_at_iterations() counts each visible event once
+        for every instance it overlaps.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        day = TimeUnit.objects.create(calendar=calendar)
+        month = TimeUnit.objects.create(calendar=calendar, base_unit=day, length_cycle='30')
+        Event.objects.create(calendar=calendar, event_name='War', bottom_level_iteration=25,
+                             last_bottom_level_iteration=65)
+        Event.objects.create(calendar=calendar, event_name='Battle', bottom_level_iteration=40)
+        Event.objects.create(calendar=calendar, event_name='Skirmish', bottom_level_iteration=41)
+        Event.objects.create(calendar=calendar, event_name='Secret', bottom_level_iteration=42, visible=False)
+        self.assertEqual(month.get_event_counts_at_iterations([1, 2, 3, 4]), [1, 3, 1, 0])
+        self.assertEqual(month.get_event_counts_at_iterations([4, 2]), [0, 3])
+
+    def test_get_event_counts_at_iterations_grouped_by_event_group(self):
+        """
+        get_event_counts_at_iterations() returns counts per event group
+        when group_by_event_group is True, leaving out hidden groups.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        day = TimeUnit.objects.create(calendar=calendar)
+        month = TimeUnit.objects.create(calendar=calendar, base_unit=day, length_cycle='30')
+        holidays = EventGroup.objects.create(calendar=calendar, event_group_name='Holidays')
+        hidden = EventGroup.objects.create(calendar=calendar, event_group_name='Hidden', visible=False)
+        Event.objects.create(calendar=calendar, event_name='Feast', bottom_level_iteration=3, event_group=holidays,
+                             visible=None)
+        Event.objects.create(calendar=calendar, event_name='Fast', bottom_level_iteration=33, event_group=holidays,
+                             visible=None)
+        Event.objects.create(calendar=calendar, event_name='Plot', bottom_level_iteration=34, event_group=hidden,
+                             visible=None)
+        Event.objects.create(calendar=calendar, event_name='Market', bottom_level_iteration=35)
+        self.assertEqual(month.get_event_counts_at_iterations([1, 2], group_by_event_group=True),
+                         [{holidays.pk: 1}, {holidays.pk: 1, None: 1}])
+
 
 class DateFormatModelTests(TestCase):
     def test_is_reversible_with_reversible_day_month_year_iterations(self):
@@ -1315,3 +1392,1718 @@ class DateFormatModelTests(TestCase):
         date_2 = '2-3/1800'
         likely_formats_2 = DateFormat.find_likely_source_date_formats(date_2, [date_format, date_format_2])
         self.assertEqual(len(likely_formats_2), 0)
+
+
+class EventModelTests(TestCase):
+    def test_save_with_no_last_bottom_level_iteration(self):
+        """
+        save() sets last_bottom_level_iteration to
+        bottom_level_iteration when it is not set, so the event takes
+        place on a single instance.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        event = Event.objects.create(calendar=calendar, event_name='Test', bottom_level_iteration=5)
+        self.assertEqual(event.last_bottom_level_iteration, 5)
+        self.assertEqual(event.get_span(), 0)
+
+    def test_save_with_multi_instance_event_widens_max_event_span(self):
+        """
+        save() raises max_event_span on the event's calendar to the
+        span of the event, but never lowers it.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        Event.objects.create(calendar=calendar, event_name='War', bottom_level_iteration=5,
+                             last_bottom_level_iteration=25)
+        Event.objects.create(calendar=calendar, event_name='Battle', bottom_level_iteration=10,
+                             last_bottom_level_iteration=12)
+        calendar.refresh_from_db()
+        self.assertEqual(calendar.max_event_span, 20)
+
+    def test_saving_stale_calendar_keeps_max_event_span(self):
+        """
+        Saving a calendar loaded before a longer event was created does
+        not set its max_event_span back to the old value.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world, calendar_name='Old')
+        stale_calendar = Calendar.objects.get(pk=calendar.pk)
+        Event.objects.create(calendar=calendar, event_name='War', bottom_level_iteration=5,
+                             last_bottom_level_iteration=25)
+        stale_calendar.calendar_name = 'New'
+        stale_calendar.save()
+        calendar.refresh_from_db()
+        self.assertEqual(calendar.calendar_name, 'New')
+        self.assertEqual(calendar.max_event_span, 20)
+
+    def test_overlaps(self):
+        """
+        overlaps() returns True for ranges that share at least one
+        bottom level iteration with the event and False otherwise.
+        """
+        event = Event(event_name='Test', bottom_level_iteration=10, last_bottom_level_iteration=20)
+        self.assertTrue(event.overlaps(1, 10))
+        self.assertTrue(event.overlaps(12, 15))
+        self.assertTrue(event.overlaps(20, 30))
+        self.assertTrue(event.overlaps(1, 30))
+        self.assertFalse(event.overlaps(1, 9))
+        self.assertFalse(event.overlaps(21, 30))
+
+    def test_get_events_at_iterations_with_multi_instance_event(self):
+        """
+        get_events_at_iterations() returns an event that spans several
+        instances in the list of every instance it overlaps, including
+        instances after the one it starts in.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        day = TimeUnit.objects.create(calendar=calendar)
+        month = TimeUnit.objects.create(calendar=calendar, base_unit=day, length_cycle='30')
+        event = Event.objects.create(calendar=calendar, event_name='War', bottom_level_iteration=25,
+                                     last_bottom_level_iteration=65)
+        single = Event.objects.create(calendar=calendar, event_name='Battle', bottom_level_iteration=40)
+        event_lists = month.get_events_at_iterations([1, 2, 3, 4])
+        self.assertEqual(event_lists[0], [event])
+        self.assertCountEqual(event_lists[1], [event, single])
+        self.assertEqual(event_lists[2], [event])
+        self.assertEqual(event_lists[3], [])
+
+    def test_get_events_at_iteration_with_event_starting_before_instance(self):
+        """
+        get_events_at_iteration() returns an event that started before
+        the instance but is still ongoing during it.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        day = TimeUnit.objects.create(calendar=calendar)
+        month = TimeUnit.objects.create(calendar=calendar, base_unit=day, length_cycle='30')
+        event = Event.objects.create(calendar=calendar, event_name='Reign', bottom_level_iteration=2,
+                                     last_bottom_level_iteration=100)
+        self.assertEqual(month.get_events_at_iteration(3), [event])
+        self.assertEqual(month.get_events_at_iteration(4), [event])
+        self.assertEqual(month.get_events_at_iteration(5), [])
+
+    def test_get_linked_events_at_iterations_with_multi_instance_event(self):
+        """
+        get_linked_events_at_iterations() returns events from linked
+        calendars in the same world for every instance they overlap,
+        translated by the difference in world link iterations.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world, world_link_iteration=1)
+        day = TimeUnit.objects.create(calendar=calendar)
+        other_calendar = Calendar.objects.create(world=world, world_link_iteration=101)
+        TimeUnit.objects.create(calendar=other_calendar)
+        unlinked_calendar = Calendar.objects.create(world=world)
+        event = Event.objects.create(calendar=other_calendar, event_name='Festival', bottom_level_iteration=103,
+                                     last_bottom_level_iteration=104)
+        Event.objects.create(calendar=unlinked_calendar, event_name='Elsewhere', bottom_level_iteration=4)
+        event_lists = day.get_linked_events_at_iterations([2, 3, 4, 5, 6])
+        self.assertEqual(event_lists, [[], [event], [event], [], []])
+
+
+class EventCountBucketModelTests(TestCase):
+    def test_get_event_start_counts_matches_events(self):
+        """
+        get_event_start_counts() returns the number of events starting
+        in each range, for ranges of any width and position.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        starts = [-40, -3, 0, 1, 1, 2, 7, 8, 9, 64, 65, 100, 255, 256, 257, 1000]
+        for start in starts:
+            Event.objects.create(calendar=calendar, event_name='Test', bottom_level_iteration=start)
+        ranges = [(1, 1), (1, 8), (2, 9), (-50, 0), (-3, 65), (9, 255), (100, 100), (101, 254), (1, 1000),
+                  (1001, 5000), (-100, 10 ** 12)]
+        counts = EventCountBucket.get_event_start_counts(calendar_id=calendar.pk, bottom_level_ranges=ranges)
+        self.assertEqual(counts, [len([x for x in starts if first <= x <= last]) for first, last in ranges])
+
+    def test_get_event_start_counts_follows_changes_to_events(self):
+        """
+        get_event_start_counts() reflects events that are moved, hidden,
+        shown and deleted.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        event = Event.objects.create(calendar=calendar, event_name='Test', bottom_level_iteration=5)
+        Event.objects.create(calendar=calendar, event_name='Hidden', bottom_level_iteration=6, visible=False)
+        ranges = [(1, 10), (5, 5), (20, 20)]
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [1, 1, 0])
+        event.bottom_level_iteration = 20
+        event.save()
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [0, 0, 1])
+        event.visible = False
+        event.save()
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [0, 0, 0])
+        event.visible = True
+        event.bottom_level_iteration = 5
+        event.save()
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [1, 1, 0])
+        event.delete()
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [0, 0, 0])
+
+    def test_get_event_start_counts_follows_event_group_visibility(self):
+        """
+        get_event_start_counts() reflects changes to the visibility of
+        an event group for events that use the group setting, including
+        when the group is deleted and its events become visible.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        event_group = EventGroup.objects.create(calendar=calendar, event_group_name='Group')
+        Event.objects.create(calendar=calendar, event_name='Follows', bottom_level_iteration=3,
+                             event_group=event_group, visible=None)
+        Event.objects.create(calendar=calendar, event_name='Overrides', bottom_level_iteration=4,
+                             event_group=event_group, visible=True)
+        ranges = [(1, 10)]
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [2])
+        event_group.visible = False
+        event_group.save()
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [1])
+        event_group.delete()
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, ranges), [2])
+
+    def test_rebuild_matches_incremental_counts(self):
+        """
+        rebuild() produces the same buckets as the ones maintained as
+        events are saved.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        for start in [1, 2, 2, 17, 300]:
+            Event.objects.create(calendar=calendar, event_name='Test', bottom_level_iteration=start)
+        Event.objects.create(calendar=calendar, event_name='Hidden', bottom_level_iteration=2, visible=False)
+        buckets = calendar.eventcountbucket_set.exclude(event_count=0)
+        incremental = set(buckets.values_list('level', 'bucket', 'event_count'))
+        EventCountBucket.rebuild(calendar.pk)
+        self.assertEqual(set(buckets.values_list('level', 'bucket', 'event_count')), incremental)
+
+    def test_add_event_starts_with_concurrent_writer(self):
+        """
+        add_event_starts() adds to the count of a new bucket when
+        another writer creates the same bucket just before it does,
+        rather than failing on the unique constraint.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        bulk_create = EventCountBucket.objects.bulk_create
+        raced = []
+
+        def bulk_create_after_other_writer(*args, **kwargs):
+            if len(raced) == 0:
+                raced.append(True)
+                EventCountBucket.add_event_starts(calendar_id=calendar.pk, start_counts={5: 1})
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(EventCountBucket.objects, 'bulk_create', side_effect=bulk_create_after_other_writer):
+            EventCountBucket.add_event_starts(calendar_id=calendar.pk, start_counts={5: 1})
+        self.assertEqual(EventCountBucket.get_event_start_counts(calendar.pk, [(5, 5), (1, 100)]), [2, 2])
+
+    def test_deleting_calendar_with_events(self):
+        """
+        Deleting a calendar removes its buckets along with its events.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        Event.objects.create(calendar=calendar, event_name='Test', bottom_level_iteration=1)
+        calendar.delete()
+        self.assertFalse(EventCountBucket.objects.exists())
+
+    def test_get_event_counts_in_ranges_with_multi_instance_event(self):
+        """
+        get_event_counts_in_ranges() counts an event in every range it
+        overlaps, including ranges after the one it starts in.
+        """
+        world = World.objects.create()
+        calendar = Calendar.objects.create(world=world)
+        Event.objects.create(calendar=calendar, event_name='War', bottom_level_iteration=25,
+                             last_bottom_level_iteration=65)
+        Event.objects.create(calendar=calendar, event_name='Battle', bottom_level_iteration=40)
+        calendar.refresh_from_db()
+        self.assertEqual(calendar.get_event_counts_in_ranges([(1, 30), (31, 60), (61, 90), (91, 120)]),
+                         [1, 2, 1, 0])
+        self.assertTrue(calendar.has_events_in_range(66 - 10, 66))
+        self.assertFalse(calendar.has_events_in_range(66, 100))
+
+
+class EventSearchTests(TestCase):
+    def setUp(self):
+        world = World.objects.create()
+        self.calendar = Calendar.objects.create(world=world)
+        other_calendar = Calendar.objects.create(world=world)
+        self.siege = Event.objects.create(calendar=self.calendar, event_name='Siege of the Tower',
+                                          event_description='The dragon burns the walls', bottom_level_iteration=3)
+        self.dragon = Event.objects.create(calendar=self.calendar, event_name='Dragon Festival',
+                                           event_description='Lanterns', bottom_level_iteration=5)
+        Event.objects.create(calendar=other_calendar, event_name='Dragon Parade', bottom_level_iteration=5)
+
+    def test_search_events_ranks_name_matches_first(self):
+        """
+        search_events() returns only events on the given calendar and
+        ranks events matching on name above events matching only on
+        description.
+        """
+        self.assertEqual(search_events(self.calendar.pk, 'dragon', limit=10), [self.dragon, self.siege])
+        self.assertEqual(search_events_by_substring(self.calendar.pk, 'dragon', limit=10, offset=0),
+                         [self.dragon, self.siege])
+
+    def test_search_events_matches_word_prefixes_and_ignores_syntax(self):
+        """
+        search_events() matches the start of words and treats query
+        syntax characters in the search string as plain separators.
+        """
+        self.assertEqual(search_events(self.calendar.pk, 'Tow', limit=10), [self.siege])
+        self.assertEqual(search_events(self.calendar.pk, 'siege" (tower*', limit=10), [self.siege])
+        self.assertEqual(search_events(self.calendar.pk, '"()', limit=10), [])
+
+    def test_search_events_follows_changes_to_events(self):
+        """
+        search_events() reflects renamed and deleted events.
+        """
+        self.dragon.event_name = 'Harvest Festival'
+        self.dragon.save()
+        self.assertEqual(search_events(self.calendar.pk, 'dragon', limit=10), [self.siege])
+        self.assertEqual(search_events(self.calendar.pk, 'harvest', limit=10), [self.dragon])
+        self.siege.delete()
+        self.assertEqual(search_events(self.calendar.pk, 'dragon', limit=10), [])
+
+    def test_search_events_pages(self):
+        """
+        search_events() skips offset hits and returns at most limit.
+        """
+        self.assertEqual(search_events(self.calendar.pk, 'dragon', limit=1), [self.dragon])
+        self.assertEqual(search_events(self.calendar.pk, 'dragon', limit=1, offset=1), [self.siege])
+
+
+class ReadOnlyViewSetTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.client = APIClient()
+
+    def get_list(self, url, params):
+        return self.client.get('/fantasy-calendar/api/' + url, params).json()
+
+    def test_list_pages_by_cursor(self):
+        """
+        List endpoints return pages of page_size results with a cursor
+        link to the next page that continues where the last page ended.
+        """
+        events = [Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+                  for x in range(5)]
+        page = self.get_list('events/', {'calendar_id': self.calendar.pk, 'page_size': 2})
+        ids = [event['id'] for event in page['results']]
+        while page['next'] is not None:
+            page = self.client.get(page['next']).json()
+            ids += [event['id'] for event in page['results']]
+        self.assertEqual(ids, [event.pk for event in events])
+
+    def test_list_with_fields(self):
+        """
+        List and retrieve endpoints only return the fields named in the
+        fields parameter.
+        """
+        event = Event.objects.create(calendar=self.calendar, event_name='Test', bottom_level_iteration=1)
+        page = self.get_list('events/', {'calendar_id': self.calendar.pk, 'fields': 'id,event_name,unknown'})
+        self.assertEqual(page['results'], [{'id': event.pk, 'event_name': 'Test'}])
+        self.assertEqual(self.get_list('calendars/' + str(self.calendar.pk) + '/', {'fields': 'calendar_name'}),
+                         {'calendar_name': self.calendar.calendar_name})
+
+    def test_list_query_count_does_not_grow_with_results(self):
+        """
+        List endpoints run the same number of queries no matter how many
+        results are on the page.
+        """
+        for x in range(3):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=x)
+        endpoints = [('events/', {'calendar_id': self.calendar.pk}),
+                     ('datebookmarks/', {'calendar_id': self.calendar.pk}),
+                     ('calendars/', {'world_id': self.world.pk}),
+                     ('worlds/', {})]
+        query_counts = []
+        for url, params in endpoints:
+            with CaptureQueriesContext(connection) as queries:
+                self.get_list(url, params)
+            query_counts.append(len(queries))
+        for x in range(3, 30):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=x)
+            Calendar.objects.create(world=self.world)
+            World.objects.create(creator=self.user, public=True)
+        for (url, params), query_count in zip(endpoints, query_counts):
+            with self.assertNumQueries(query_count):
+                self.get_list(url, params)
+
+
+class EventImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar)
+        self.month = TimeUnit.objects.create(calendar=self.calendar, base_unit=self.day, length_cycle='30')
+        self.year = TimeUnit.objects.create(calendar=self.calendar, base_unit=self.month, length_cycle='12')
+
+    def test_import_events_from_csv(self):
+        """
+        import_events() creates an event for every valid row across
+        chunks, reports every invalid row by number and keeps the event
+        count pyramid and maximum event span up to date.
+        """
+        text = ('event_name,bottom_level_iteration,last_bottom_level_iteration,visible\n'
+                'Coronation,5,,\n'
+                ',6,,\n'
+                'War,10,40,true\n'
+                'Backwards,10,9,\n'
+                'Secret,11,,no\n'
+                'Unknown,abc,,\n')
+        stats = import_events(self.calendar, read_csv_rows(io.StringIO(text)), chunk_size=2)
+        self.assertEqual(stats['rows_read'], 6)
+        self.assertEqual(stats['events_created'], 3)
+        self.assertEqual([error['row'] for error in stats['errors']], [2, 4, 6])
+        self.assertEqual(stats['chunks'], 2)
+        self.assertCountEqual(Event.objects.filter(calendar=self.calendar).values_list('event_name', flat=True),
+                              ['Coronation', 'War', 'Secret'])
+        self.calendar.refresh_from_db()
+        self.assertEqual(self.calendar.max_event_span, 30)
+        self.assertEqual(self.calendar.get_event_counts_in_ranges([(1, 10), (11, 30)]), [2, 1])
+
+    def test_import_events_keeps_only_reported_errors(self):
+        """
+        import_events() describes only the first MAX_REPORTED_ERRORS
+        rows with errors, keeping no more than twice that many at once,
+        and counts the rest.
+        """
+        text = 'event_name,bottom_level_iteration\n' + ''.join(',1\nBackwards,x\nFine,1\n' for _ in range(5))
+        with mock.patch('fantasycalendar.event_import.MAX_REPORTED_ERRORS', 2), \
+                mock.patch('fantasycalendar.event_import.trim_errors', wraps=event_import.trim_errors) as trim_errors:
+            stats = import_events(self.calendar, read_csv_rows(io.StringIO(text)), chunk_size=2)
+        self.assertEqual(stats['error_count'], 10)
+        self.assertEqual([error['row'] for error in stats['errors']], [1, 2])
+        self.assertEqual(stats['events_created'], 5)
+        self.assertGreater(trim_errors.call_count, 1)
+
+    def test_import_events_from_jsonl_with_formatted_dates(self):
+        """
+        import_events() reads dates through a date format, resolving a
+        date for a time unit above the bottom level to its first bottom
+        level instance for a start date and its last for an end date.
+        """
+        month_format = DateFormat.objects.create(
+            calendar=self.calendar, time_unit=self.month, date_format_name='Month Year',
+            format_string='{' + str(self.year.id) + '-' + str(self.month.id) + '-i}/{' + str(self.year.id) + '-'
+                          + str(self.year.id) + '-i}')
+        text = ('{"event_name": "Harvest", "date": "2/1", "last_date": "3/1"}\n'
+                '\n'
+                '{"event_name": "Lost", "date": "not a date"}\n'
+                '[1, 2]\n'
+                '{"event_name": "Direct", "bottom_level_iteration": 7}\n')
+        stats = import_events(self.calendar, read_jsonl_rows(io.StringIO(text)), date_format=month_format)
+        self.assertEqual(stats['events_created'], 2)
+        self.assertEqual([error['row'] for error in stats['errors']], [2, 3])
+        harvest = Event.objects.get(event_name='Harvest')
+        self.assertEqual((harvest.bottom_level_iteration, harvest.last_bottom_level_iteration), (31, 90))
+        self.assertEqual(Event.objects.get(event_name='Direct').bottom_level_iteration, 7)
+
+    def test_import_events_endpoint_and_command(self):
+        """
+        The import endpoint only accepts files from the world creator,
+        and the management command imports from a file path.
+        """
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create(username='other'))
+        upload = SimpleUploadedFile('events.csv', b'event_name,bottom_level_iteration\nParade,3\n')
+        response = client.post('/fantasy-calendar/api/eventimport/',
+                               {'calendar_id': self.calendar.pk, 'format': 'csv', 'file': upload})
+        self.assertEqual(response.status_code, 403)
+        client.force_authenticate(self.user)
+        upload.seek(0)
+        response = client.post('/fantasy-calendar/api/eventimport/',
+                               {'calendar_id': self.calendar.pk, 'format': 'csv', 'file': upload})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['events_created'], 1)
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as jsonl_file:
+            jsonl_file.write('{"event_name": "Feast", "bottom_level_iteration": 4}\n')
+        try:
+            call_command('import_events', self.calendar.pk, jsonl_file.name, stdout=io.StringIO())
+        finally:
+            os.remove(jsonl_file.name)
+        self.assertEqual(search_events(self.calendar.pk, 'feast', limit=10)[0].bottom_level_iteration, 4)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, world_name='Realm', public=True)
+        self.calendar = Calendar.objects.create(world=self.world, calendar_name='Reckoning', world_link_iteration=10)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.month = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Month', base_unit=self.day,
+                                             length_cycle='30')
+        self.date_format = DateFormat.objects.create(
+            calendar=self.calendar, time_unit=self.day, date_format_name='Day of Month',
+            format_string='{' + str(self.month.id) + '-' + str(self.day.id) + '-i} of the month')
+        self.day.default_date_format = self.date_format
+        self.day.save()
+        self.calendar.ensure_default_display_config()
+        month_page = DisplayUnitConfig.objects.create(display_config=self.calendar.default_display_config,
+                                                      time_unit=self.month, sub_unit=self.day)
+        month_page.searchable_date_formats.add(self.date_format)
+        event_group = EventGroup.objects.create(calendar=self.calendar, event_group_name='Wars', visible=False)
+        Event.objects.create(calendar=self.calendar, event_name='Siege', bottom_level_iteration=3,
+                             last_bottom_level_iteration=12, event_group=event_group, visible=None)
+        Event.objects.create(calendar=self.calendar, event_name='Feast', bottom_level_iteration=5)
+        DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.month, bookmark_iteration=2,
+                                    date_bookmark_name='Shared')
+        DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.month, bookmark_iteration=3,
+                                    date_bookmark_name='Mine', personal_bookmark_creator=self.user)
+        DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.month, bookmark_iteration=4,
+                                    date_bookmark_name='Theirs',
+                                    personal_bookmark_creator=get_user_model().objects.create(username='visitor'))
+
+    def test_export_and_import_world(self):
+        """
+        import_world() creates a copy of every row exported by
+        export_world() owned by the importing user, with every
+        reference (including those between time units, display configs
+        and inside format strings) pointing at the new copies, and
+        leaves out other users' personal bookmarks.
+        """
+        importer = get_user_model().objects.create(username='importer')
+        snapshot = ''.join(export_world(self.world))
+        world = import_world(io.StringIO(snapshot), importer)
+        self.assertNotEqual(world.pk, self.world.pk)
+        self.assertEqual((world.world_name, world.public, world.creator), ('Realm', True, importer))
+        calendar = Calendar.objects.get(world=world)
+        self.assertEqual((calendar.calendar_name, calendar.world_link_iteration), ('Reckoning', 10))
+        day = TimeUnit.objects.get(calendar=calendar, time_unit_name='Day')
+        month = TimeUnit.objects.get(calendar=calendar, time_unit_name='Month')
+        self.assertEqual(month.base_unit, day)
+        self.assertEqual(day.default_date_format.calendar, calendar)
+        self.assertEqual(day.default_date_format.format_string,
+                         '{' + str(month.id) + '-' + str(day.id) + '-i} of the month')
+        self.assertEqual(day.get_instance_display_names([35]), ['5 of the month'])
+        display_config = calendar.default_display_config
+        self.assertEqual(display_config.calendar, calendar)
+        self.assertEqual(display_config.default_display_unit_config.time_unit, day)
+        month_page = DisplayUnitConfig.objects.get(display_config=display_config, time_unit=month)
+        self.assertEqual(list(month_page.searchable_date_formats.all()), [day.default_date_format])
+        siege = Event.objects.get(calendar=calendar, event_name='Siege')
+        self.assertEqual((siege.event_group.event_group_name, siege.event_group.calendar), ('Wars', calendar))
+        self.assertEqual(calendar.get_event_counts_in_ranges([(1, 4), (5, 30)]), [0, 1])
+        self.assertCountEqual(DateBookmark.objects.filter(calendar=calendar).values_list(
+            'date_bookmark_name', 'personal_bookmark_creator'), [('Shared', None), ('Mine', importer.pk)])
+
+    def test_import_world_rejects_bad_snapshots(self):
+        """
+        import_world() raises ValueError and creates nothing for a
+        snapshot from a newer version or one that refers to rows it
+        doesn't contain.
+        """
+        lines = ''.join(export_world(self.world)).splitlines(keepends=True)
+        header = json.loads(lines[0])
+        header['version'] += 1
+        with self.assertRaises(ValueError):
+            import_world([json.dumps(header)] + lines[1:], self.user)
+        with self.assertRaises(ValueError):
+            import_world([lines[0]] + [line for line in lines[1:] if '"model": "timeunit"' not in line], self.user)
+        self.assertEqual(World.objects.count(), 1)
+
+    def test_clone_world(self):
+        """
+        clone_world() creates a renamed, private copy of a world with its
+        format strings rewritten for the copied time units and its event
+        count pyramid copied, leaving the original untouched.
+        """
+        clone = clone_world(self.world, self.user, world_name='Realm Again')
+        self.assertEqual((clone.world_name, clone.creator, clone.public), ('Realm Again', self.user, False))
+        self.assertTrue(clone_world(self.world, self.user, public=True).public)
+        calendar = Calendar.objects.get(world=clone)
+        day = TimeUnit.objects.get(calendar=calendar, time_unit_name='Day')
+        self.assertEqual(day.get_instance_display_names([35]), ['5 of the month'])
+        self.assertEqual(calendar.default_display_config.calendar, calendar)
+        self.assertEqual(calendar.get_event_counts_in_ranges([(1, 4), (5, 30)]), [0, 1])
+        self.assertEqual(EventCountBucket.objects.filter(calendar=calendar).count(),
+                         EventCountBucket.objects.filter(calendar=self.calendar).count())
+        self.assertEqual(Event.objects.filter(calendar=self.calendar).count(), 2)
+        self.assertEqual(DateBookmark.objects.filter(calendar=calendar).count(), 2)
+
+    def test_clone_calendar(self):
+        """
+        clone_calendar() creates a renamed copy of a calendar in the
+        same world by default.
+        """
+        clone = clone_calendar(self.calendar, self.user, calendar_name='Second Reckoning')
+        self.assertEqual((clone.calendar_name, clone.world), ('Second Reckoning', self.world))
+        self.assertEqual(TimeUnit.objects.get(calendar=clone, time_unit_name='Month').base_unit.calendar, clone)
+        self.assertEqual(Event.objects.filter(calendar=clone).count(), 2)
+        self.assertEqual(World.objects.count(), 1)
+
+
+class CalendarPageCacheTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.client = APIClient()
+        page_cache.get_cache().clear()  # versions start over with every test, so pages from earlier tests would match
+
+    def get_page(self):
+        return self.client.get('/fantasy-calendar/api/calendarpage/', {'time_unit_id': self.week.pk, 'iteration': 1})
+
+    def test_page_is_served_from_cache_until_content_changes(self):
+        """
+        A repeated page request is served from the cache without
+        rebuilding the page, and saving or deleting anything the page is
+        built from makes the next request rebuild it.
+        """
+        first = self.get_page()
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get_page()
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(len(queries), 1)  # only the world access, shared by the ETag and the permission check
+        event = Event.objects.create(calendar=self.calendar, event_name='Feast', bottom_level_iteration=3)
+        third = self.get_page()
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertEqual(third.json()['calendar_dates'][2]['events'][0]['event_name'], 'Feast')
+        event.delete()
+        self.assertEqual(self.get_page()['X-Cache'], 'MISS')
+        self.assertEqual(self.get_page().json(), first.json())
+        self.day.time_unit_name = 'Sol'
+        self.day.save()
+        self.assertEqual(self.get_page()['X-Cache'], 'MISS')
+
+    def test_bulk_changes_invalidate_pages(self):
+        """
+        Importing events, which skips save and its signals, still makes
+        the next page request rebuild the page.
+        """
+        self.get_page()
+        import_events(self.calendar, [{'event_name': 'Imported', 'bottom_level_iteration': 2}])
+        page = self.get_page()
+        self.assertEqual(page['X-Cache'], 'MISS')
+        self.assertEqual(page.json()['calendar_dates'][1]['event_count'], 1)
+
+    def test_pages_are_cached_per_user_class(self):
+        """
+        The creator and other users get separate cache entries, and a
+        user without access gets a 403 rather than a cached page.
+        """
+        self.get_page()
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_page()['X-Cache'], 'MISS')
+        self.assertEqual(self.get_page()['X-Cache'], 'HIT')
+        self.world.public = False
+        self.world.save()
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_page().status_code, 403)
+
+    def test_file_based_cache_and_stats(self):
+        """
+        The page cache works with the file based backend and counts its
+        hits and misses.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with override_settings(CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}):
+                self.assertEqual(self.get_page()['X-Cache'], 'MISS')
+                self.assertEqual(self.get_page()['X-Cache'], 'HIT')
+                self.assertEqual(self.get_page()['X-Cache'], 'HIT')
+                self.assertEqual(page_cache.get_stats(), {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.client = APIClient()
+
+    def test_matching_etag_is_not_modified_until_content_changes(self):
+        """
+        A read sends an ETag, a read with that ETag in If-None-Match is
+        answered with 304 without building the page, and saving anything
+        in the world makes the same ETag stop matching.
+        """
+        url = '/fantasy-calendar/api/calendarpage/'
+        params = {'time_unit_id': self.week.pk, 'iteration': 1}
+        first = self.client.get(url, params)
+        etag = first['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(len(queries), 1)  # only the lookup of the world the time unit is in
+        self.assertEqual(self.client.get(url, {'time_unit_id': self.week.pk, 'iteration': 2},
+                                         HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        Event.objects.create(calendar=self.calendar, event_name='Feast', bottom_level_iteration=3)
+        changed = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_etags_on_viewsets(self):
+        """
+        List and retrieve endpoints scoped to a world send ETags that
+        differ between users, and unscoped lists send none.
+        """
+        detail_url = '/fantasy-calendar/api/calendars/' + str(self.calendar.pk) + '/'
+        anonymous_etag = self.client.get(detail_url, {'detail': 1})['ETag']
+        self.assertEqual(self.client.get(detail_url, {'detail': 1}, HTTP_IF_NONE_MATCH=anonymous_etag).status_code,
+                         304)
+        self.client.force_authenticate(self.user)
+        self.assertNotEqual(self.client.get(detail_url, {'detail': 1})['ETag'], anonymous_etag)
+        self.assertIn('ETag', self.client.get('/fantasy-calendar/api/displayconfigs/',
+                                              {'calendar_id': self.calendar.pk}))
+        self.assertNotIn('ETag', self.client.get('/fantasy-calendar/api/worlds/'))
+        DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=1)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(detail_url, {'detail': 1}, HTTP_IF_NONE_MATCH=anonymous_etag).status_code,
+                         200)
+
+    def test_event_list_etag_follows_the_events_it_lists(self):
+        """
+        An event list given a time unit but no iteration lists events
+        outside the time unit's world, so it is not scoped to that world
+        and changes to events in other worlds are never answered with
+        304.
+        """
+        url = '/fantasy-calendar/api/events/'
+        other_calendar = Calendar.objects.create(world=World.objects.create(creator=self.user, public=True))
+        self.assertIn('ETag', self.client.get(url, {'time_unit_id': self.week.pk, 'iteration': 1}))
+        self.assertNotIn('ETag', self.client.get(url, {'time_unit_id': self.week.pk}))
+        params = {'time_unit_id': self.week.pk, 'calendar_id': other_calendar.pk}
+        etag = self.client.get(url, params)['ETag']
+        Event.objects.create(calendar=other_calendar, event_name='Parade', bottom_level_iteration=1)
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_private_world_is_not_modified_only_for_its_creator(self):
+        """
+        A read of a world the user can't see is answered with 403 and no
+        ETag even when If-None-Match holds the ETag the world had while
+        it was public, while its creator still gets 304.
+        """
+        url = '/fantasy-calendar/api/calendarpage/'
+        params = {'time_unit_id': self.week.pk, 'iteration': 1}
+        anonymous_etag = self.client.get(url, params)['ETag']
+        self.client.force_authenticate(self.user)
+        creator_etag = self.client.get(url, params)['ETag']
+        World.objects.filter(pk=self.world.pk).update(public=False)  # leaves the versions as they were
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=creator_etag).status_code, 304)
+        self.client.force_authenticate(None)
+        forbidden = self.client.get(url, params, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertNotIn('ETag', forbidden)
+
+
+class CalendarPagesTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        for x in range(1, 40, 2):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+        self.client = APIClient()
+
+    def get_pages(self, params):
+        return self.client.get('/fantasy-calendar/api/calendarpages/', dict(calendar_id=self.calendar.pk, **params))
+
+    def get_page(self, iteration):
+        return self.client.get('/fantasy-calendar/api/calendarpage/',
+                               {'time_unit_id': self.week.pk, 'iteration': iteration}).json()
+
+    def test_pages_match_single_pages(self):
+        """
+        The batch endpoint returns the same data for each listed page as
+        the single page endpoint, in the order requested.
+        """
+        response = self.get_pages({'pages': '{0}::3,{0}::1,{1}::5'.format(self.week.pk, self.day.pk)})
+        pages = response.json()['pages']
+        self.assertEqual([(page['time_unit_id'], page['sub_unit_id'], page['iteration']) for page in pages],
+                         [(self.week.pk, None, 3), (self.week.pk, None, 1), (self.day.pk, None, 5)])
+        World.bump_versions(world_id=self.world.pk)  # build the single pages from scratch too
+        self.assertEqual(pages[0]['data'], self.get_page(3))
+        self.assertEqual(pages[1]['data'], self.get_page(1))
+
+    def test_window_shares_queries(self):
+        """
+        A window of pages around one page takes no more queries than
+        building a single page plus looking up the calendar, and pages
+        that aren't on the calendar come back without data.
+        """
+        with CaptureQueriesContext(connection) as single_page_queries:
+            self.get_page(5)
+        World.bump_versions(world_id=self.world.pk)
+        with CaptureQueriesContext(connection) as queries:
+            pages = self.get_pages({'time_unit_id': self.week.pk, 'iteration': 5, 'before': 2, 'after': 2}).json()
+        self.assertEqual([page['iteration'] for page in pages['pages']], [3, 4, 5, 6, 7])
+        self.assertEqual(pages['pages'][2]['data'], self.get_page(5))
+        self.assertLessEqual(len(queries), len(single_page_queries) + 1)
+        other_unit = TimeUnit.objects.create(calendar=Calendar.objects.create(world=self.world))
+        pages = self.get_pages({'pages': '{0}::1'.format(other_unit.pk)}).json()
+        self.assertIsNone(pages['pages'][0]['data'])
+
+    def test_pages_validation(self):
+        """
+        The batch endpoint rejects malformed and oversized requests and
+        hides pages of calendars that aren't public.
+        """
+        self.assertEqual(self.get_pages({'pages': '1:2'}).status_code, 400)
+        self.assertEqual(self.get_pages({'time_unit_id': self.week.pk, 'iteration': 60, 'before': 60}).status_code,
+                         400)
+        self.world.public = False
+        self.world.save()
+        self.assertEqual(self.get_pages({'pages': '{0}::1'.format(self.week.pk)}).status_code, 403)
+
+
+class EventCountsViewTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        event_group = EventGroup.objects.create(calendar=self.calendar, event_group_name='Group')
+        Event.objects.create(calendar=self.calendar, event_name='Test', bottom_level_iteration=2,
+                             event_group=event_group)
+        self.client = APIClient()
+
+    def get_counts(self, params):
+        return self.client.get('/fantasy-calendar/api/eventcounts/',
+                               dict(time_unit_id=self.week.pk, iteration=1, **params))
+
+    def test_group_by_event_group(self):
+        """
+        Counts are grouped by event group only when group_by_event_group
+        is true, and unknown values are rejected.
+        """
+        for value in ['1', 'true']:
+            instance = self.get_counts({'group_by_event_group': value}).json()['instances'][1]
+            self.assertEqual(instance['event_count'], 1)
+            self.assertIn('event_group_counts', instance)
+        for params in [{}, {'group_by_event_group': '0'}, {'group_by_event_group': 'false'}]:
+            instance = self.get_counts(params).json()['instances'][1]
+            self.assertEqual(instance['event_count'], 1)
+            self.assertNotIn('event_group_counts', instance)
+        self.assertEqual(self.get_counts({'group_by_event_group': 'yes'}).status_code, 400)
+
+
+class CalendarBootstrapTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.display_config = DisplayConfig.objects.create(calendar=self.calendar)
+        self.week_page = DisplayUnitConfig.objects.create(display_config=self.display_config, time_unit=self.week)
+        self.day_page = DisplayUnitConfig.objects.create(display_config=self.display_config, time_unit=self.day)
+        self.bookmark = DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.week,
+                                                    bookmark_iteration=4)
+        self.display_config.default_display_unit_config = self.week_page
+        self.display_config.default_date_bookmark = self.bookmark
+        self.display_config.save()
+        self.calendar.default_display_config = self.display_config
+        self.calendar.save()
+        self.client = APIClient()
+
+    def get_bootstrap(self, **params):
+        return self.client.get('/fantasy-calendar/api/calendarbootstrap/',
+                               dict(calendar_id=self.calendar.pk, **params))
+
+    def test_bootstrap_matches_separate_requests(self):
+        """
+        The bootstrap endpoint returns the same user status, calendar
+        detail, display config and page as the separate endpoints, with
+        the default page shown at the default bookmark.
+        """
+        self.client.force_authenticate(self.user)
+        bootstrap = self.get_bootstrap().json()
+        api = '/fantasy-calendar/api/'
+        self.assertEqual(bootstrap['user_status'],
+                         self.client.get(api + 'userstatus/', {'calendar_id': self.calendar.pk}).json()['user_status'])
+        self.assertEqual(bootstrap['calendar'],
+                         self.client.get(api + 'calendars/' + str(self.calendar.pk) + '/', {'detail': 1}).json())
+        self.assertEqual(bootstrap['display_config'],
+                         self.client.get(api + 'displayconfigs/' + str(self.display_config.pk) + '/').json())
+        self.assertEqual((bootstrap['page']['time_unit_id'], bootstrap['page']['sub_unit_id'],
+                          bootstrap['page']['iteration']), (self.week.pk, None, 4))
+        World.bump_versions(world_id=self.world.pk)
+        self.assertEqual(bootstrap['page']['data'], self.client.get(api + 'calendarpage/', {
+            'time_unit_id': self.week.pk, 'iteration': 4, 'display_config_id': self.display_config.pk}).json())
+
+    def test_bootstrap_initial_page(self):
+        """
+        The page requested by display_unit_id and display_iteration is
+        used if the display config has it, and with no display config the
+        first time unit is shown at iteration 1.
+        """
+        page = self.get_bootstrap(display_unit_id=self.day.pk, display_iteration=9).json()['page']
+        self.assertEqual((page['time_unit_id'], page['iteration']), (self.day.pk, 9))
+        page = self.get_bootstrap(display_unit_id=self.day.pk, display_sub_unit_id=self.week.pk).json()['page']
+        self.assertEqual((page['time_unit_id'], page['iteration']), (self.week.pk, 4))
+        bootstrap = self.get_bootstrap(display_config_id=0).json()
+        self.assertIsNone(bootstrap['display_config'])
+        self.assertEqual((bootstrap['page']['time_unit_id'], bootstrap['page']['iteration'],
+                          bootstrap['page']['display_config_id']), (self.day.pk, 1, 0))
+
+    def test_bootstrap_queries(self):
+        """
+        The bootstrap endpoint takes fewer queries than the separate
+        requests it replaces and hides calendars that aren't public.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.get_bootstrap()
+        separate_query_count = 0
+        for url, params in [('userstatus/', {'calendar_id': self.calendar.pk}),
+                            ('calendars/' + str(self.calendar.pk) + '/', {'detail': 1}),
+                            ('displayconfigs/' + str(self.display_config.pk) + '/', {}),
+                            ('calendarpage/', {'time_unit_id': self.week.pk, 'iteration': 4})]:
+            World.bump_versions(world_id=self.world.pk)
+            with CaptureQueriesContext(connection) as separate_queries:
+                self.client.get('/fantasy-calendar/api/' + url, params)
+            separate_query_count += len(separate_queries)
+        self.assertLess(len(queries), separate_query_count)
+        self.world.public = False
+        self.world.save()
+        self.assertEqual(self.get_bootstrap().status_code, 403)
+
+
+class DateBookmarkDisplayNameTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.month = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Month', base_unit=self.week,
+                                             length_cycle='4')
+        self.day.default_date_format = DateFormat.objects.create(
+            calendar=self.calendar, time_unit=self.day,
+            format_string='Day {' + str(self.week.pk) + '-' + str(self.day.pk) + '-i} of week {'
+                          + str(self.week.pk) + '-' + str(self.week.pk) + '-i}')
+        self.day.save()
+        self.week.default_date_format = DateFormat.objects.create(
+            calendar=self.calendar, time_unit=self.week,
+            format_string='Week {' + str(self.week.pk) + '-' + str(self.week.pk) + '-i}')
+        self.week.save()
+
+    def test_get_display_names_matches_get_display_name(self):
+        """
+        get_display_names() returns the same names as get_display_name()
+        for named bookmarks, unnamed bookmarks on units with and without
+        a default date format and bookmarks with a sub unit.
+        """
+        date_bookmarks = [
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=9),
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.week, bookmark_iteration=3),
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=1),
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.month, bookmark_iteration=2),
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.month, bookmark_iteration=2,
+                                        bookmark_sub_unit=self.day),
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=4,
+                                        date_bookmark_name='Named'),
+        ]
+        self.assertEqual(DateBookmark.get_display_names(date_bookmarks),
+                         [date_bookmark.get_display_name() for date_bookmark in date_bookmarks])
+        self.assertEqual(DateBookmark.get_display_names(date_bookmarks)[:2], ['Day 2 of week 2', 'Week 3'])
+
+    def test_calendar_detail_query_count_does_not_grow_with_navigable_events(self):
+        """
+        The calendar detail endpoint runs the same number of queries no
+        matter how many navigable events it turns into bookmarks, and
+        names events without a name by their formatted date.
+        """
+        client = APIClient()
+        url = '/fantasy-calendar/api/calendars/' + str(self.calendar.pk) + '/'
+        Event.objects.create(calendar=self.calendar, event_name='', bottom_level_iteration=9, navigable=True)
+        calendar_cache.clear()  # both requests are counted as the first in their process
+        with CaptureQueriesContext(connection) as queries:
+            date_bookmarks = client.get(url, {'detail': 1}).json()['date_bookmarks']
+        self.assertEqual([(date_bookmark['id'], date_bookmark['display_name']) for date_bookmark in date_bookmarks],
+                         [(-11, 'Day 2 of week 2')])
+        for x in range(20):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x + 1,
+                                 navigable=x % 2 == 0)
+        World.bump_versions(world_id=self.world.pk)
+        calendar_cache.clear()
+        with self.assertNumQueries(len(queries)):
+            date_bookmarks = client.get(url, {'detail': 1}).json()['date_bookmarks']
+        self.assertEqual(len(date_bookmarks), 11)
+
+
+class SerializerQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.day.default_date_format = DateFormat.objects.create(
+            calendar=self.calendar, time_unit=self.day,
+            format_string='Day {' + str(self.week.pk) + '-' + str(self.day.pk) + '-i}')
+        self.day.save()
+        self.client = APIClient()
+
+    def add_display_configs(self, count):
+        for x in range(count):
+            display_config = DisplayConfig.objects.create(calendar=self.calendar, display_config_name=str(x))
+            for time_unit in [self.day, self.week]:
+                display_unit_config = DisplayUnitConfig.objects.create(display_config=display_config,
+                                                                       time_unit=time_unit)
+                display_unit_config.searchable_date_formats.add(self.day.default_date_format)
+
+    def add_date_bookmarks(self, count):
+        for x in range(count):
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=x + 1)
+            DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.week, bookmark_iteration=x + 1,
+                                        date_bookmark_name=str(x))
+
+    def test_display_config_list_query_budget(self):
+        """
+        Listing display configs takes a fixed number of queries however
+        many display configs, display unit configs and searchable date
+        formats there are.
+        """
+        self.add_display_configs(1)
+        url = '/fantasy-calendar/api/displayconfigs/'
+        with self.assertNumQueries(4):  # etag scope, display configs, their unit configs, their date formats
+            self.client.get(url, {'calendar_id': self.calendar.pk})
+        self.add_display_configs(10)
+        World.bump_versions(world_id=self.world.pk)
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'calendar_id': self.calendar.pk})
+        results = response.json()
+        results = results['results'] if isinstance(results, dict) else results
+        self.assertEqual(len(results), 11)
+        self.assertEqual(results[-1]['display_unit_configs'][0]['searchable_date_formats'],
+                         [self.day.default_date_format.pk])
+
+    def test_display_config_retrieve_query_budget(self):
+        """
+        Retrieving a display config takes a fixed number of queries
+        however many display unit configs it has.
+        """
+        self.add_display_configs(1)
+        display_config = DisplayConfig.objects.get()
+        with self.assertNumQueries(4):  # etag scope, the display config and its world, unit configs, date formats
+            response = self.client.get('/fantasy-calendar/api/displayconfigs/' + str(display_config.pk) + '/')
+        self.assertEqual(len(response.json()['display_unit_configs']), 2)
+
+    def test_date_bookmark_list_query_budget(self):
+        """
+        Listing date bookmarks takes a fixed number of queries however
+        many bookmarks there are, and names unnamed bookmarks by their
+        formatted date.
+        """
+        self.add_date_bookmarks(1)
+        url = '/fantasy-calendar/api/datebookmarks/'
+        calendar_cache.clear()  # both requests are counted as the first in their process
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'calendar_id': self.calendar.pk})
+        self.add_date_bookmarks(10)
+        World.bump_versions(world_id=self.world.pk)
+        calendar_cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url, {'calendar_id': self.calendar.pk})
+        results = response.json()
+        results = results['results'] if isinstance(results, dict) else results
+        self.assertEqual(len(results), 22)
+        self.assertEqual(sorted(result['display_name'] for result in results if result['bookmark_unit'] == self.day.pk),
+                         sorted(date_bookmark.get_display_name()
+                                for date_bookmark in DateBookmark.objects.filter(bookmark_unit=self.day)))
+        # etag scope, bookmarks with their units, the calendar's versions, its units and their sub units
+        self.assertEqual(len(queries), 5)
+
+
+class AccessResolverTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.other_user = get_user_model().objects.create(username='other')
+        self.world = World.objects.create(creator=self.user, public=False)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.display_config = DisplayConfig.objects.create(calendar=self.calendar)
+        self.page = DisplayUnitConfig.objects.create(display_config=self.display_config, time_unit=self.day)
+
+    def test_access_is_resolved_once_per_object(self):
+        """
+        The world access of an object is looked up in one query whatever
+        model it is, and checking it again or checking its world costs
+        no more queries.
+        """
+        resolver = AccessResolver(self.user)
+        for model, id in [(TimeUnit, self.day.pk), (Calendar, self.calendar.pk), (DisplayUnitConfig, self.page.pk)]:
+            with self.assertNumQueries(1):
+                self.assertTrue(resolver.can_view(model, id))
+            with self.assertNumQueries(0):
+                self.assertTrue(resolver.is_creator(model, id))
+                self.assertTrue(resolver.can_view(World, self.world.pk))
+        with self.assertRaises(Http404):
+            resolver.get_access(Event, 0)
+
+    def test_access_depends_on_user_and_public(self):
+        """
+        Only the creator can view a private world's objects and only the
+        creator is its creator, while anyone can view a public world's.
+        """
+        for user, can_view, is_creator in [(self.user, True, True), (self.other_user, False, False),
+                                           (AnonymousUser(), False, False)]:
+            resolver = AccessResolver(user)
+            self.assertEqual(resolver.can_view(TimeUnit, self.day.pk), can_view)
+            self.assertEqual(resolver.is_creator(TimeUnit, self.day.pk), is_creator)
+        self.world.public = True
+        self.world.save()
+        resolver = AccessResolver(self.other_user)
+        self.assertTrue(resolver.can_view(TimeUnit, self.day.pk))
+        self.assertFalse(resolver.is_creator(TimeUnit, self.day.pk))
+
+    def test_views_check_access_through_the_resolver(self):
+        """
+        The API and page views answer according to the resolved access,
+        with one query for a time unit's access and a 404 for an object
+        that doesn't exist.
+        """
+        client = APIClient()
+        client.force_authenticate(self.other_user)
+        self.assertEqual(client.get('/fantasy-calendar/api/timeunits/' + str(self.day.pk) + '/').status_code, 403)
+        self.assertEqual(client.get('/fantasy-calendar/api/timeunits/0/').status_code, 404)
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/fantasy-calendar/api/timeunits/' + str(self.day.pk) + '/').status_code, 200)
+        self.assertEqual(len([query for query in queries if 'fantasycalendar_world' in query['sql']]), 1)
+        self.assertEqual(client.get('/fantasy-calendar/api/userstatus/', {'calendar_id': self.calendar.pk}).json(),
+                         {'user_status': 'creator'})
+        self.client.force_login(self.other_user)
+        self.assertEqual(self.client.get('/fantasy-calendar/worlds/' + str(self.world.pk) + '/').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/fantasy-calendar/worlds/' + str(self.world.pk) + '/').status_code, 200)
+
+
+class DenormalizedWorldTests(TestCase):
+    CALENDAR_SCOPED_MODELS = [TimeUnit, Event, DateFormat, DisplayConfig, DateBookmark]
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=False)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.date_format = DateFormat.objects.create(calendar=self.calendar, time_unit=self.day,
+                                                     format_string='Day')
+        DisplayConfig.objects.create(calendar=self.calendar)
+        DateBookmark.objects.create(calendar=self.calendar, bookmark_unit=self.day, bookmark_iteration=1)
+        Event.objects.create(calendar=self.calendar, event_name='Feast', bottom_level_iteration=1)
+
+    def assertWorldIdsFollowCalendars(self):
+        for model in self.CALENDAR_SCOPED_MODELS:
+            self.assertFalse(model.objects.exclude(world_id=F('calendar__world_id')).exists(), model)
+            self.assertFalse(model.objects.filter(world_id=None).exists(), model)
+
+    def test_world_id_is_kept_in_step_with_calendar(self):
+        """
+        Rows saved, imported from a file, copied from a snapshot with or
+        without their world and cloned into another world all carry the
+        world of their calendar.
+        """
+        import_events(self.calendar, read_jsonl_rows(io.StringIO('{"event_name": "Fair", '
+                                                                 '"bottom_level_iteration": 2}\n')))
+        lines = ''.join(export_world(self.world)).splitlines(keepends=True)
+        import_world(lines, self.user)
+        model_names = [model._meta.model_name for model in self.CALENDAR_SCOPED_MODELS]
+        old_lines = [json.dumps(dict(record, fields={name: value for name, value in record['fields'].items()
+                                                     if name != 'world_id'}))
+                     if record.get('model') in model_names else line
+                     for line, record in ((line, json.loads(line)) for line in lines)]
+        import_world(old_lines, self.user)
+        clone_world(self.world, self.user)
+        clone_calendar(self.calendar, self.user, world=World.objects.create(creator=self.user))
+        self.assertEqual(Event.objects.values('world_id').distinct().count(), 5)
+        self.assertWorldIdsFollowCalendars()
+
+    def test_moving_calendar_moves_its_rows(self):
+        """
+        Saving a calendar in another world moves the world of every row
+        on it along with it and raises the schema version of the world
+        it left.
+        """
+        other_world = World.objects.create(creator=self.user)
+        schema_version = World.objects.get(pk=self.world.pk).schema_version
+        calendar = Calendar.objects.get(pk=self.calendar.pk)
+        calendar.world = other_world
+        calendar.save()
+        self.assertWorldIdsFollowCalendars()
+        self.assertEqual(Event.objects.get(calendar=self.calendar).world_id, other_world.pk)
+        self.assertGreater(World.objects.get(pk=self.world.pk).schema_version, schema_version)
+
+    def test_list_filters_use_world_id_without_joining_calendars(self):
+        """
+        The list endpoints of calendar scoped models filter by the
+        worlds the user can see through world_id, without joining the
+        calendar table.
+        """
+        client = APIClient()
+        other_world = World.objects.create(public=True)
+        other_calendar = Calendar.objects.create(world=other_world)
+        Event.objects.create(calendar=other_calendar, event_name='Parade', bottom_level_iteration=1)
+        for user, names in [(None, ['Parade']), (self.user, ['Feast', 'Parade'])]:
+            client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as queries:
+                results = client.get('/fantasy-calendar/api/events/').json()['results']
+            self.assertCountEqual([result['event_name'] for result in results], names)
+            self.assertTrue(all('"fantasycalendar_calendar"' not in query['sql'] for query in queries))
+        for url in ['timeunits', 'dateformats', 'displayconfigs', 'datebookmarks']:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/fantasy-calendar/api/' + url + '/', {'calendar_id': self.calendar.pk})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all('JOIN "fantasycalendar_calendar"' not in query['sql'] for query in queries), url)
+
+
+class ColumnarPageTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.year = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Year', base_unit=self.day,
+                                            length_cycle='365')
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=2,
+                             last_bottom_level_iteration=5)
+        for x in range(1, 365, 3):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+        self.client = APIClient()
+
+    def get_page(self, time_unit, **params):
+        return self.client.get('/fantasy-calendar/api/calendarpage/',
+                               dict(time_unit_id=time_unit.pk, iteration=1, **params))
+
+    def test_columnar_page_decodes_to_the_plain_page(self):
+        """
+        A page asked for with format=columnar decodes to the plain page,
+        is smaller, stores each event once however many dates it spans
+        and delta encodes iterations.
+        """
+        for time_unit in [self.week, self.year]:
+            plain = self.get_page(time_unit)
+            columnar = self.get_page(time_unit, format='columnar')
+            self.assertEqual(columnar['Content-Type'], 'application/json')
+            self.assertEqual(from_columnar(columnar.json()), plain.json())
+            self.assertLess(len(columnar.content), len(plain.content))
+        columns = columnar.json()['calendar_dates']['columns']
+        self.assertEqual(columns['iteration'], [1] + [1] * 364)
+        event_table = columnar.json()['event_table']
+        self.assertEqual(len(event_table['id']), len(set(event_table['id'])))
+        festival = event_table['event_name'].index('Festival')
+        self.assertEqual([index for index, events in enumerate(columns['events']) if festival in events], [1, 2, 3, 4])
+
+    def test_columnar_pages_and_errors(self):
+        """
+        Each page from the batch endpoint is columnar with
+        format=columnar, and errors are sent as plain JSON.
+        """
+        params = {'calendar_id': self.calendar.pk, 'time_unit_id': self.week.pk, 'iteration': 2}
+        plain = self.client.get('/fantasy-calendar/api/calendarpages/', params).json()
+        columnar = self.client.get('/fantasy-calendar/api/calendarpages/', dict(params, format='columnar')).json()
+        self.assertEqual([dict(page, data=from_columnar(page['data'])) for page in columnar['pages']],
+                         plain['pages'])
+        response = self.client.get('/fantasy-calendar/api/calendarpage/', {'iteration': 1, 'format': 'columnar'})
+        self.assertEqual((response.status_code, response.json()), (400, {'message': 'ERROR: time_unit_id required'}))
+
+
+class StreamingPageTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.year = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Year', base_unit=self.day,
+                                            length_cycle='365')
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=48,
+                             last_bottom_level_iteration=53)
+        for x in range(1, 365, 3):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+        self.client = APIClient()
+
+    def get_page(self, **params):
+        return self.client.get('/fantasy-calendar/api/calendarpage/',
+                               dict(time_unit_id=self.year.pk, iteration=1, **params))
+
+    def test_large_page_is_streamed(self):
+        """
+        A page with at least STREAM_MIN_DATES dates is streamed as plain
+        JSON a run of dates at a time, isn't cached, and is the same as
+        the page built whole.
+        """
+        built = self.get_page().json()
+        page_cache.get_cache().clear()
+        with mock.patch.object(calendar_pages, 'STREAM_MIN_DATES', 100), \
+                mock.patch.object(calendar_pages, 'STREAM_CHUNK_SIZE', 50):
+            responses = [self.get_page(), self.get_page(format='columnar')]
+        for response in responses:
+            self.assertTrue(response.streaming)
+            self.assertEqual((response['Content-Type'], response['X-Cache']), ('application/json', 'BYPASS'))
+            self.assertEqual(json.loads(b''.join(response.streaming_content)), built)
+
+    def test_page_json_is_encoded_in_runs(self):
+        """
+        iter_page_json yields one piece per run of dates and valid JSON
+        however many dates there are.
+        """
+        pieces = list(iter_page_json({'row_length': 0}, ({'iteration': x} for x in range(5)), 2))
+        self.assertEqual(len(pieces), 5)
+        self.assertEqual(json.loads(b''.join(pieces)),
+                         {'calendar_dates': [{'iteration': x} for x in range(5)], 'row_length': 0})
+        self.assertEqual(json.loads(b''.join(iter_page_json({'row_length': 0}, [], 2))),
+                         {'calendar_dates': [], 'row_length': 0})
+
+
+class AsyncCalendarPageTests(TransactionTestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.month = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Month', base_unit=self.day,
+                                             length_cycle='30')
+        self.year = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Year', base_unit=self.day,
+                                            length_cycle='360')
+        self.display_config = DisplayConfig.objects.create(calendar=self.calendar)
+        DisplayUnitConfig.objects.create(display_config=self.display_config, time_unit=self.year,
+                                         row_grouping_time_unit=self.week, row_grouping_label_type='names',
+                                         block_grouping_time_unit=self.month, max_events_per_instance=2)
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=28,
+                             last_bottom_level_iteration=33)
+        for x in range(1, 360, 2):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+        self.client = APIClient()
+
+    def test_async_page_is_the_sync_page(self):
+        """
+        A page built by the async endpoint, with its stages run at the
+        same time, is the same as the one the sync endpoint builds.
+        """
+        for params in [{'time_unit_id': self.year.pk, 'display_config_id': self.display_config.pk},
+                       {'time_unit_id': self.week.pk, 'display_config_id': 0}]:
+            params['iteration'] = 2
+            page_cache.get_cache().clear()
+            built = self.client.get('/fantasy-calendar/api/calendarpage/', params)
+            page_cache.get_cache().clear()
+            built_async = self.client.get('/fantasy-calendar/api/calendarpageasync/', params)
+            self.assertEqual((built_async.status_code, built_async['X-Cache']), (200, 'MISS'))
+            self.assertEqual(built_async.json(), built.json())
+        self.assertEqual(len(built.json()['calendar_dates']), 7)
+
+
+class PagePipelineTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        for x in range(1, 15):
+            Event.objects.create(calendar=self.calendar, event_name=str(x), bottom_level_iteration=x)
+        self.client = APIClient()
+
+    def get_base_instances(self, **params):
+        return self.client.get('/fantasy-calendar/api/timeunitbaseinstances/',
+                               dict(time_unit_id=self.week.pk, iteration=2, **params))
+
+    def test_base_instance_stages(self):
+        """
+        Base instances only pull what stages asks for, in fewer queries
+        than pulling everything, and unknown stages are refused.
+        """
+        with CaptureQueriesContext(connection) as everything:
+            response = self.get_base_instances()
+        self.assertEqual([date['events'][0]['event_name'] for date in response.json()],
+                         [str(x) for x in range(8, 15)])
+        with CaptureQueriesContext(connection) as names_only:
+            response = self.get_base_instances(stages='')
+        self.assertEqual([(date['name'], date['events']) for date in response.json()],
+                         [('Day ' + str(x), []) for x in range(1, 8)])
+        self.assertLess(len(names_only), len(everything))
+        self.assertEqual(self.get_base_instances(stages='events,weather').status_code, 400)
+
+    def test_page_server_timing(self):
+        """
+        A page that is built reports the time spent in each stage it did
+        in its Server-Timing header, leaving out stages for things the
+        page doesn't show.
+        """
+        response = self.client.get('/fantasy-calendar/api/calendarpage/',
+                                   {'time_unit_id': self.week.pk, 'iteration': 1})
+        stages = [timing.split(';')[0] for timing in response['Server-Timing'].split(', ')]
+        self.assertEqual(set(stages), {'instances', 'grouping', 'events', 'format'})
+        self.assertTrue(all(timing.split(';dur=')[1].replace('.', '').isdigit()
+                            for timing in response['Server-Timing'].split(', ')))
+        response = self.get_base_instances(stages='events')
+        self.assertNotIn('linked_events', response['Server-Timing'])
+
+
+class TimeUnitConversionTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.month = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Month', base_unit=self.day,
+                                             length_cycle='30.25 31')
+        self.year = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Year', base_unit=self.month,
+                                            length_cycle='12')
+        self.client = APIClient()
+
+    def convert(self, conversions):
+        return self.client.post('/fantasy-calendar/api/timeunitconversions/', {'conversions': conversions},
+                                format='json')
+
+    def test_conversions_match_single_conversions(self):
+        """
+        Every conversion gives the same equivalent and contained
+        iterations as converting it on its own, contained iterations are
+        None when the target isn't made up of the unit, and the number
+        of queries doesn't grow with the number of conversions.
+        """
+        units = [self.day, self.week, self.month, self.year]
+        conversions = [{'time_unit_id': time_unit.pk, 'iteration': iteration, 'target_unit_id': target_unit.pk}
+                       for time_unit in units for target_unit in units for iteration in [1, 2, 13, 97, 400]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.convert(conversions)
+        self.assertLessEqual(len(queries), 3)
+        for conversion, result in zip(conversions, response.json()['conversions']):
+            time_unit = TimeUnit.objects.get(pk=conversion['time_unit_id'])
+            target_unit = TimeUnit.objects.get(pk=conversion['target_unit_id'])
+            self.assertEqual(result['equivalent_iteration'], target_unit.get_iteration_at_bottom_level_iteration(
+                time_unit.get_first_bottom_level_iteration_at_iteration(conversion['iteration'])))
+            if time_unit.pk == target_unit.pk or time_unit.pk == target_unit.base_unit_id or \
+                    (target_unit.pk == self.year.pk and time_unit.pk == self.day.pk):
+                self.assertEqual(result['contained_iteration'],
+                                 target_unit.get_sub_unit_instance_iteration_within_higher_level_iteration(
+                                     time_unit, conversion['iteration']))
+            else:
+                self.assertIsNone(result['contained_iteration'])
+        with CaptureQueriesContext(connection) as more_queries:
+            self.convert(conversions * 10)
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_conversion_errors(self):
+        """
+        Conversions are refused if they are missing or malformed, too
+        many or between calendars, and units that don't exist are 404s.
+        """
+        other_calendar = Calendar.objects.create(world=self.world)
+        other_day = TimeUnit.objects.create(calendar=other_calendar, time_unit_name='Day')
+        conversion = {'time_unit_id': self.day.pk, 'iteration': 1, 'target_unit_id': self.month.pk}
+        self.assertEqual(self.client.post('/fantasy-calendar/api/timeunitconversions/', {}, format='json').status_code,
+                         400)
+        self.assertEqual(self.convert([dict(conversion, iteration='x')]).status_code, 400)
+        self.assertEqual(self.convert([conversion] * 10001).status_code, 400)
+        self.assertEqual(self.convert([dict(conversion, target_unit_id=other_day.pk)]).status_code, 400)
+        self.assertEqual(self.convert([dict(conversion, target_unit_id=other_day.pk + 1)]).status_code, 404)
+        self.world.public = False
+        self.world.save()
+        self.assertEqual(self.convert([conversion]).status_code, 403)
+
+
+class PrecomputeTests(TransactionTestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=37)
+        page_cache.get_cache().clear()
+        self.client = APIClient()
+
+    @override_settings(CALENDAR_PAGE_PRECOMPUTE=True)
+    def test_adjacent_pages_are_precomputed(self):
+        """
+        Serving a calendar page builds the pages before and after it in
+        the background, so they are served from the cache.
+        """
+        def get_page(iteration):
+            return self.client.get('/fantasy-calendar/api/calendarpage/',
+                                   {'time_unit_id': self.week.pk, 'iteration': iteration})
+
+        self.assertEqual(get_page(5)['X-Cache'], 'MISS')
+        precompute.wait_for_pending()
+        self.assertEqual(get_page(4)['X-Cache'], 'HIT')
+        precompute.wait_for_pending()
+        page = get_page(6)
+        self.assertEqual(page['X-Cache'], 'HIT')
+        precompute.wait_for_pending()
+        page_cache.get_cache().clear()
+        self.assertEqual(page.json(), get_page(6).json())
+        precompute.wait_for_pending()
+        self.assertEqual(page.json()['calendar_dates'][1]['events'][0]['event_name'], 'Festival')
+
+    def test_queue_is_bounded(self):
+        """
+        Pages already queued aren't queued again, and once the queue is
+        full the oldest page that hasn't started is cancelled to make
+        room, or the new page is dropped if every page has started.
+        """
+        release = threading.Event()
+        built = []
+
+        def build_and_cache(page_key, *args):
+            release.wait(5)
+            built.append(page_key)
+            with precompute.lock:
+                precompute.in_flight.pop(page_key, None)
+
+        def queue(*page_keys):
+            precompute.precompute_pages([(page_key, self.week.pk, 1, None, None) for page_key in page_keys])
+            return list(precompute.in_flight)
+
+        with mock.patch.object(precompute, 'build_and_cache', build_and_cache), \
+                mock.patch.object(precompute, 'executor', ThreadPoolExecutor(max_workers=1)), \
+                mock.patch.object(precompute, 'PRECOMPUTE_QUEUE_SIZE', 2):
+            self.assertEqual(queue('a', 'b'), ['a', 'b'])
+            self.assertEqual(queue('a'), ['b', 'a'])
+            self.assertEqual(queue('c'), ['a', 'c'])  # b hadn't started, so it makes room
+            self.assertFalse(precompute.claim_page('c'))  # cancelled, the request builds it
+            with mock.patch.object(precompute, 'PRECOMPUTE_QUEUE_SIZE', 1):
+                self.assertEqual(queue('d'), ['a'])  # a has started, so d is dropped
+            self.assertEqual(queue('d', 'e'), ['a', 'e'])
+            release.set()
+            precompute.wait_for_pending()
+        self.assertEqual(built, ['a', 'e'])
+        self.assertEqual(list(precompute.in_flight), [])
+
+
+class VersionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.other_calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.client = APIClient()
+
+    def get_versions(self) -> list[tuple[int, int]]:
+        return [(instance.schema_version, instance.content_version) for instance in
+                [World.objects.get(pk=self.world.pk), Calendar.objects.get(pk=self.calendar.pk),
+                 Calendar.objects.get(pk=self.other_calendar.pk)]]
+
+    def test_changes_raise_versions(self):
+        """
+        Saving or deleting a time unit, date format, display config or
+        display unit config raises the schema version of its calendar
+        and world, saving or deleting an event, event group or bookmark
+        raises their content version, and calendars are left alone by
+        changes to other calendars.
+        """
+        versions = self.get_versions()
+        display_config = DisplayConfig.objects.create(calendar=self.calendar)
+        DisplayUnitConfig.objects.create(display_config=display_config, time_unit=self.day)
+        self.assertEqual(self.get_versions(), [(versions[0][0] + 2, versions[0][1]),
+                                               (versions[1][0] + 2, versions[1][1]), versions[2]])
+        versions = self.get_versions()
+        event = Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=1)
+        event.delete()
+        EventGroup.objects.create(calendar=self.calendar, event_group_name='Holidays')
+        self.assertEqual(self.get_versions(), [(versions[0][0], versions[0][1] + 3),
+                                               (versions[1][0], versions[1][1] + 3), versions[2]])
+        versions = self.get_versions()
+        self.other_calendar.world_link_iteration = 1
+        self.other_calendar.save()
+        self.assertEqual(self.get_versions(), [(versions[0][0] + 1, versions[0][1]), versions[1],
+                                               (versions[2][0] + 1, versions[2][1])])
+
+    def test_searchable_date_formats_changes_raise_versions(self):
+        """
+        Adding, removing or clearing the searchable date formats of a
+        display unit config, from either side, raises the schema version
+        of its calendar and world.
+        """
+        display_config = DisplayConfig.objects.create(calendar=self.calendar)
+        display_unit_config = DisplayUnitConfig.objects.create(display_config=display_config, time_unit=self.day)
+        date_format = DateFormat.objects.create(calendar=self.calendar, time_unit=self.day, format_string='Day')
+        versions = self.get_versions()
+        display_unit_config.searchable_date_formats.add(date_format)
+        display_unit_config.searchable_date_formats.remove(date_format)
+        date_format.displayunitconfig_set.add(display_unit_config)
+        display_unit_config.searchable_date_formats.clear()
+        self.assertEqual(self.get_versions(), [(versions[0][0] + 4, versions[0][1]),
+                                               (versions[1][0] + 4, versions[1][1]), versions[2]])
+
+    def test_stale_copies_dont_lower_versions(self):
+        """
+        Saving a world or calendar loaded before its versions were
+        raised keeps the raised versions.
+        """
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=1)
+        versions = self.get_versions()
+        self.world.world_name = 'Renamed'
+        self.world.save()
+        self.calendar.calendar_name = 'Renamed'
+        self.calendar.save()
+        self.assertEqual(self.get_versions()[:2], [(versions[0][0] + 2, versions[0][1]),
+                                                   (versions[1][0] + 1, versions[1][1])])
+        self.assertEqual(World.objects.get(pk=self.world.pk).world_name, 'Renamed')
+
+    def test_versions_are_read_through_the_api(self):
+        """
+        Worlds and calendars are sent with their versions, which can be
+        asked for alone, and the ETag of a request changes with them.
+        """
+        response = self.client.get('/fantasy-calendar/api/calendars/' + str(self.calendar.pk) + '/',
+                                   {'fields': 'schema_version,content_version'})
+        calendar = Calendar.objects.get(pk=self.calendar.pk)
+        self.assertEqual(response.json(), {'schema_version': calendar.schema_version,
+                                           'content_version': calendar.content_version})
+        response = self.client.get('/fantasy-calendar/api/worlds/' + str(self.world.pk) + '/')
+        self.assertEqual(response.json()['content_version'], World.objects.get(pk=self.world.pk).content_version)
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=1)
+        self.assertEqual(self.client.get('/fantasy-calendar/api/worlds/' + str(self.world.pk) + '/',
+                                         HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class CalendarCacheTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='creator')
+        self.world = World.objects.create(creator=self.user, public=True)
+        self.calendar = Calendar.objects.create(world=self.world)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.week = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Week', base_unit=self.day,
+                                            length_cycle='7')
+        self.date_format = DateFormat.objects.create(calendar=self.calendar, time_unit=self.day,
+                                                     format_string='{' + str(self.week.pk) + '-' + str(self.day.pk)
+                                                                   + '-i} of {' + str(self.week.pk) + '-'
+                                                                   + str(self.week.pk) + '-i}')
+        calendar_cache.clear()
+
+    def test_cached_time_units_answer_level_checks_without_queries(self):
+        """
+        A calendar's cached time units tell their level and calendar
+        without any queries.
+        """
+        time_units = TimeUnit.get_calendar_time_units(self.calendar.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual([(time_unit.is_bottom_level(), time_unit.is_top_level(), time_unit.get_level_depth(),
+                               time_unit.calendar.pk)
+                              for time_unit in [time_units[self.day.pk], time_units[self.week.pk]]],
+                             [(True, False, 1, self.calendar.pk), (False, True, 2, self.calendar.pk)])
+
+    def test_dates_are_formatted_from_cached_time_units(self):
+        """
+        Formatting dates again with a calendar's time units already
+        cached in the process takes no queries.
+        """
+        self.assertEqual(self.date_format.get_formatted_dates([1, 9]), ['1 of 1', '2 of 2'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.date_format.get_formatted_dates([15]), ['1 of 3'])
+
+    def test_changes_in_this_process_are_evicted_at_once(self):
+        """
+        Changing a calendar's schema in this process evicts the values
+        cached for it straight away, while changing its content keeps
+        the values built only from its schema.
+        """
+        time_units = TimeUnit.get_calendar_time_units(self.calendar.pk)
+        Event.objects.create(calendar=self.calendar, event_name='Festival', bottom_level_iteration=1)
+        self.assertIs(TimeUnit.get_calendar_time_units(self.calendar.pk), time_units)
+        self.week.length_cycle = '5'
+        self.week.save()
+        self.assertEqual(TimeUnit.get_calendar_time_units(self.calendar.pk)[self.week.pk].length_cycle, '5')
+        self.assertEqual(self.date_format.get_formatted_dates([9]), ['4 of 2'])
+
+    def test_changes_in_other_processes_are_evicted(self):
+        """
+        A change made by another process, which only shows up as higher
+        versions in the database, evicts the values cached for the
+        calendar once a request reads the new versions of its world, or
+        once the poll interval has passed.
+        """
+        def change_in_other_process(time_unit_name):
+            TimeUnit.objects.filter(pk=self.week.pk).update(time_unit_name=time_unit_name)
+            Calendar.objects.filter(pk=self.calendar.pk).update(schema_version=F('schema_version') + 1)
+            World.objects.filter(pk=self.world.pk).update(schema_version=F('schema_version') + 1)
+
+        def get_week_name():
+            return TimeUnit.get_calendar_time_units(self.calendar.pk)[self.week.pk].time_unit_name
+
+        with mock.patch.object(calendar_cache, 'POLL_INTERVAL', 60):
+            calendar_cache.poll()
+            self.assertEqual(get_week_name(), 'Week')
+            change_in_other_process('Renamed')
+            self.assertEqual(get_week_name(), 'Week')
+            with self.assertNumQueries(2):  # the access check and the poll
+                AccessResolver(self.user).get_access(Calendar, self.calendar.pk)
+            self.assertEqual(get_week_name(), 'Renamed')
+            with self.assertNumQueries(1):  # unchanged, so nothing is polled
+                AccessResolver(self.user).get_access(Calendar, self.calendar.pk)
+        change_in_other_process('Renamed again')
+        with mock.patch.object(calendar_cache, 'POLL_INTERVAL', 0):
+            self.assertEqual(get_week_name(), 'Renamed again')
+
+
+class LinkGraphTests(TestCase):
+    def setUp(self):
+        self.world = World.objects.create(public=True)
+        self.calendar = Calendar.objects.create(world=self.world, world_link_iteration=1)
+        self.day = TimeUnit.objects.create(calendar=self.calendar, time_unit_name='Day')
+        self.other_calendar = Calendar.objects.create(world=self.world, world_link_iteration=101)
+        self.other_day = TimeUnit.objects.create(calendar=self.other_calendar, time_unit_name='Sun')
+        self.other_week = TimeUnit.objects.create(calendar=self.other_calendar, time_unit_name='Week',
+                                                  base_unit=self.other_day, length_cycle='7')
+        self.other_day.secondary_date_format = DateFormat.objects.create(
+            calendar=self.other_calendar, time_unit=self.other_day,
+            format_string='Sun {' + str(self.other_week.pk) + '-' + str(self.other_day.pk) + '-i}')
+        self.other_day.save()
+        calendar_cache.clear()
+
+    def get_linked_display_names(self, iterations: list[int]) -> list[list[str]]:
+        day = TimeUnit.objects.select_related('calendar').get(pk=self.day.pk)
+        return day.get_linked_instances_display_names(iterations, prefer_secondary=True)
+
+    def test_linked_display_names_are_cached(self):
+        """
+        Once a world's link graph is loaded, naming the linked dates of
+        a page takes no queries.
+        """
+        self.assertEqual(self.get_linked_display_names([1, 2]), [['Sun 3'], ['Sun 4']])
+        day = TimeUnit.objects.select_related('calendar').get(pk=self.day.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(day.get_linked_instances_display_names([7], prefer_secondary=True), [['Sun 2']])
+            self.assertEqual(day.get_linked_instance_iterations(7), [(self.other_calendar, 107)])
+
+    def test_link_graph_answers_level_checks_without_queries(self):
+        """
+        The bottom level time units in a world's link graph tell their
+        level without any queries.
+        """
+        link_graph = World.get_link_graph(self.world.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual([(time_unit.is_bottom_level(), time_unit.is_top_level(), time_unit.get_level_depth())
+                              for _, time_unit in link_graph.values()], [(True, True, 1), (True, False, 1)])
+
+    def test_link_changes_are_evicted(self):
+        """
+        Moving or removing a calendar's link is reflected straight away.
+        """
+        self.assertEqual(self.get_linked_display_names([1]), [['Sun 3']])
+        self.other_calendar.world_link_iteration = 102
+        self.other_calendar.save()
+        self.assertEqual(self.get_linked_display_names([1]), [['Sun 4']])
+        self.other_calendar.world_link_iteration = None
+        self.other_calendar.save()
+        self.assertEqual(self.get_linked_display_names([1]), [])
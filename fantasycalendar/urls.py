@@ -19,12 +19,25 @@ urlpatterns = [
     path("", lambda req: redirect(reverse('fantasycalendar:world-index'))),
     path("api/", include(router.urls)),
     path("api/userstatus/", api_views.UserStatus.as_view()),
+    path("api/worldexport/", api_views.WorldExport.as_view()),
+    path("api/worldimport/", api_views.WorldImport.as_view()),
+    path("api/worldclone/", api_views.WorldClone.as_view()),
+    path("api/calendarclone/", api_views.CalendarClone.as_view()),
+    path("api/calendarbootstrap/", api_views.CalendarBootstrap.as_view()),
     path("api/calendarpage/", api_views.CalendarPage.as_view()),
+    path("api/calendarpageasync/", api_views.AsyncCalendarPage.as_view()),
+    path("api/calendarpages/", api_views.CalendarPages.as_view()),
+    path("api/calendarpagecachestats/", api_views.CalendarPageCacheStats.as_view()),
+    path("api/eventcounts/", api_views.EventCounts.as_view()),
+    path("api/eventsearch/", api_views.EventSearch.as_view()),
+    path("api/eventimport/", api_views.EventImport.as_view()),
     path("api/timeunitbaseinstances/", api_views.TimeUnitBaseInstances.as_view()),
     path("api/timeunitinstancedisplayname/", api_views.TimeUnitInstanceDisplayName.as_view()),
     path("api/timeunitequivalentiteration/", api_views.TimeUnitEquivalentIteration.as_view()),
     path("api/timeunitcontainediteration/", api_views.TimeUnitContainedIteration.as_view()),
+    path("api/timeunitconversions/", api_views.TimeUnitConversions.as_view()),
     path("api/dateformatreverse/", api_views.DateFormatReverse.as_view()),
+    path("api/datebookmarkeventcounts/", api_views.DateBookmarkEventCounts.as_view()),
     path("api/datebookmarkcreatepersonal/", api_views.DateBookmarkCreatePersonal.as_view()),
     path("worlds/", views.WorldIndexView.as_view(), name="world-index"),
     path("worlds/<int:pk>/", views.WorldDetailView.as_view(), name="world-detail"),
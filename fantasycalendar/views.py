@@ -5,6 +5,7 @@ from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 from django.views import generic
+from .access import get_access_resolver
 from .models import (World, Calendar, TimeUnit, Event, EventGroup, DateFormat, DisplayConfig, DateBookmark,
                      DisplayUnitConfig)
 from .forms import (DisplayConfigCreateForm, DisplayConfigUpdateForm, DisplayUnitConfigCreateForm,
@@ -34,8 +35,7 @@ class WorldDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/world_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['pk'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['pk'])
 
 
 class CalendarDetailView(UserPassesTestMixin, generic.DetailView):
@@ -43,8 +43,7 @@ class CalendarDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/calendar_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -77,8 +76,7 @@ class CalendarCalendarView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/calendar_calendar.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
 
 class TimeUnitDetailView(UserPassesTestMixin, generic.DetailView):
@@ -86,8 +84,7 @@ class TimeUnitDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/time_unit_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
 
 class TimeUnitInstanceDetailView(UserPassesTestMixin, generic.DetailView):
@@ -95,8 +92,7 @@ class TimeUnitInstanceDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/time_unit_instance_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -127,8 +123,7 @@ class EventDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/event_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -139,6 +134,9 @@ class EventDetailView(UserPassesTestMixin, generic.DetailView):
         else:
             context['display_date'] = str(bottom_level_time_unit.time_unit_name) + ' ' + \
                                       str(self.object.bottom_level_iteration)
+        if self.object.get_span() > 0:
+            context['display_end_date'] = bottom_level_time_unit.get_instance_display_name(
+                iteration=self.object.last_bottom_level_iteration)
         context['time_unit'] = bottom_level_time_unit
         return context
 
@@ -148,8 +146,7 @@ class EventGroupDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/event_group_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -163,8 +160,7 @@ class DateFormatDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/date_format_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
 
 class DisplayConfigDetailView(UserPassesTestMixin, generic.DetailView):
@@ -172,8 +168,7 @@ class DisplayConfigDetailView(UserPassesTestMixin, generic.DetailView):
     template_name = 'fantasycalendar/display_config_detail.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return world.public or self.request.user == world.creator
+        return get_access_resolver(self.request).can_view(World, self.kwargs['world_key'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -199,8 +194,7 @@ class CalendarCreateView(UserPassesTestMixin, generic.CreateView):
     fields = ['calendar_name', 'world_link_iteration']
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def form_valid(self, form):
         world = get_object_or_404(World, pk=self.kwargs['world_key'])
@@ -217,8 +211,7 @@ class TimeUnitCreateView(UserPassesTestMixin, generic.CreateView):
     fields = ['time_unit_name', 'base_unit', 'length_cycle', 'base_unit_instance_names']
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def get_form(self, form_class=None):
         form = super(TimeUnitCreateView, self).get_form()
@@ -240,12 +233,11 @@ class TimeUnitCreateView(UserPassesTestMixin, generic.CreateView):
 class EventCreateView(UserPassesTestMixin, generic.CreateView):
     model = Event
     template_name = 'fantasycalendar/event_create_form.html'
-    fields = ['event_name', 'event_description', 'bottom_level_iteration', 'display_order', 'event_group', 'visible',
-              'navigable']
+    fields = ['event_name', 'event_description', 'bottom_level_iteration', 'last_bottom_level_iteration',
+              'display_order', 'event_group', 'visible', 'navigable']
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def get_initial(self):
         if 'bottom_level_iteration' in self.request.GET:
@@ -256,6 +248,9 @@ class EventCreateView(UserPassesTestMixin, generic.CreateView):
         bottom_unit = Calendar.objects.get(pk=self.kwargs['calendar_key']).get_bottom_level_time_unit()
         form.fields['bottom_level_iteration'].label = \
             'Which ' + str(bottom_unit.time_unit_name) + ' does this event take place on?'
+        form.fields['last_bottom_level_iteration'].label = \
+            'If this event lasts for more than one ' + str(bottom_unit.time_unit_name) + ', which ' + \
+            str(bottom_unit.time_unit_name) + ' does it end on?'
 
         class EventGroupModelChoiceField(forms.ModelChoiceField):
             def label_from_instance(self, obj):
@@ -286,8 +281,7 @@ class EventGroupCreateView(UserPassesTestMixin, generic.CreateView):
     fields = ['event_group_name', 'visible', 'navigable']
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def form_valid(self, form):
         calendar = get_object_or_404(Calendar, pk=self.kwargs['calendar_key'])
@@ -305,8 +299,7 @@ class DateFormatCreateView(UserPassesTestMixin, generic.CreateView):
     fields = ['date_format_name', 'format_string']
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -330,8 +323,7 @@ class DisplayConfigCreateView(UserPassesTestMixin, generic.CreateView):
     template_name = 'fantasycalendar/display_config_create_form.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def get_form(self, form_class=None):
         form = super(DisplayConfigCreateView, self).get_form()
@@ -402,8 +394,7 @@ class DisplayUnitConfigCreateView(UserPassesTestMixin, generic.CreateView):
     template_name = 'fantasycalendar/display_unit_config_create_form.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def get_form(self, form_class=None):
         form = super(DisplayUnitConfigCreateView, self).get_form()
@@ -442,8 +433,7 @@ class DateBookmarkCreateView(UserPassesTestMixin, generic.CreateView):
     template_name = 'fantasycalendar/date_bookmark_create_form.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['world_key'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['world_key'])
 
     def get_initial(self):
         initial = {}
@@ -477,8 +467,7 @@ class WorldUpdateView(UserPassesTestMixin, generic.UpdateView):
     fields = ['world_name', 'public']
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['pk'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['pk'])
 
 
 class CalendarUpdateView(UserPassesTestMixin, generic.UpdateView):
@@ -487,8 +476,7 @@ class CalendarUpdateView(UserPassesTestMixin, generic.UpdateView):
     template_name = 'fantasycalendar/calendar_update_form.html'
 
     def test_func(self):
-        world = get_object_or_404(Calendar, pk=self.kwargs['pk']).world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(Calendar, self.kwargs['pk'])
 
     def form_valid(self, form):
         if form.instance.default_display_config:
@@ -506,8 +494,7 @@ class TimeUnitUpdateView(UserPassesTestMixin, generic.UpdateView):
               'secondary_date_format']
 
     def test_func(self):
-        world = get_object_or_404(TimeUnit, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(TimeUnit, self.kwargs['pk'])
 
     def get_form(self, form_class=None):
         form = super(TimeUnitUpdateView, self).get_form()
@@ -530,18 +517,20 @@ class TimeUnitUpdateView(UserPassesTestMixin, generic.UpdateView):
 class EventUpdateView(UserPassesTestMixin, generic.UpdateView):
     model = Event
     template_name = 'fantasycalendar/event_update_form.html'
-    fields = ['event_name', 'event_description', 'bottom_level_iteration', 'display_order', 'event_group', 'visible',
-              'navigable']
+    fields = ['event_name', 'event_description', 'bottom_level_iteration', 'last_bottom_level_iteration',
+              'display_order', 'event_group', 'visible', 'navigable']
 
     def test_func(self):
-        world = get_object_or_404(Event, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(Event, self.kwargs['pk'])
 
     def get_form(self, form_class=None):
         form = super(EventUpdateView, self).get_form()
         bottom_unit = Calendar.objects.get(pk=self.kwargs['calendar_key']).get_bottom_level_time_unit()
         form.fields['bottom_level_iteration'].label = \
             'Which ' + str(bottom_unit.time_unit_name) + ' does this event take place on?'
+        form.fields['last_bottom_level_iteration'].label = \
+            'If this event lasts for more than one ' + str(bottom_unit.time_unit_name) + ', which ' + \
+            str(bottom_unit.time_unit_name) + ' does it end on?'
 
         class EventGroupModelChoiceField(forms.ModelChoiceField):
             def label_from_instance(self, obj):
@@ -560,8 +549,7 @@ class EventGroupUpdateView(UserPassesTestMixin, generic.UpdateView):
     fields = ['event_group_name', 'visible', 'navigable']
 
     def test_func(self):
-        world = get_object_or_404(Event, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(Event, self.kwargs['pk'])
 
 
 class DateFormatUpdateView(UserPassesTestMixin, generic.UpdateView):
@@ -570,8 +558,7 @@ class DateFormatUpdateView(UserPassesTestMixin, generic.UpdateView):
     fields = ['date_format_name', 'format_string']
 
     def test_func(self):
-        world = get_object_or_404(DateFormat, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DateFormat, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -588,8 +575,7 @@ class DisplayConfigUpdateView(UserPassesTestMixin, generic.UpdateView):
     template_name = 'fantasycalendar/display_config_update_form.html'
 
     def test_func(self):
-        world = get_object_or_404(DisplayConfig, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DisplayConfig, self.kwargs['pk'])
 
     def get_form(self, form_class=None):
         form = super(DisplayConfigUpdateView, self).get_form()
@@ -606,8 +592,7 @@ class DisplayUnitConfigUpdateView(UserPassesTestMixin, generic.UpdateView):
     template_name = 'fantasycalendar/display_unit_config_update_form.html'
 
     def test_func(self):
-        world = get_object_or_404(DisplayUnitConfig, pk=self.kwargs['pk']).display_config.calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DisplayUnitConfig, self.kwargs['pk'])
 
     def get_form(self, form_class=None):
         form = super(DisplayUnitConfigUpdateView, self).get_form()
@@ -662,8 +647,7 @@ class DateBookmarkUpdateView(UserPassesTestMixin, generic.UpdateView):
     fields = ['date_bookmark_name', 'bookmark_iteration']
 
     def test_func(self):
-        world = get_object_or_404(DateBookmark, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DateBookmark, self.kwargs['pk'])
 
     def get_success_url(self):
         return reverse('fantasycalendar:calendar-detail',
@@ -675,8 +659,7 @@ class WorldDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/world_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(World, pk=self.kwargs['pk'])
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(World, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -694,8 +677,7 @@ class CalendarDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/calendar_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(Calendar, pk=self.kwargs['pk']).world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(Calendar, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -713,8 +695,7 @@ class TimeUnitDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/time_unit_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(TimeUnit, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(TimeUnit, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -757,8 +738,7 @@ class EventDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/event_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(Event, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(Event, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -780,8 +760,7 @@ class EventGroupDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/event_group_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(EventGroup, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(EventGroup, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -805,8 +784,7 @@ class DateFormatDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/date_format_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(DateFormat, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DateFormat, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -845,8 +823,7 @@ class DisplayUnitConfigDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/display_unit_config_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(DisplayUnitConfig, pk=self.kwargs['pk']).display_config.calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DisplayUnitConfig, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -875,8 +852,7 @@ class DateBookmarkDeleteView(UserPassesTestMixin, generic.DeleteView):
     template_name = 'fantasycalendar/date_bookmark_delete_form.html'
 
     def test_func(self):
-        world = get_object_or_404(DateBookmark, pk=self.kwargs['pk']).calendar.world
-        return self.request.user == world.creator
+        return get_access_resolver(self.request).is_creator(DateBookmark, self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
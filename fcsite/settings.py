@@ -87,6 +87,33 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# calendar pages are cached in CALENDAR_PAGE_CACHE, which works with any backend including local memory and files
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CALENDAR_PAGE_CACHE = 'default'
+CALENDAR_PAGE_CACHE_TIMEOUT = 60 * 60
+# pages with at least this many dates are streamed a run of CALENDAR_PAGE_STREAM_CHUNK_SIZE dates at a time
+CALENDAR_PAGE_STREAM_MIN_DATES = 2000
+CALENDAR_PAGE_STREAM_CHUNK_SIZE = 500
+# build the pages before and after each calendar page requested in the background, on
+# CALENDAR_PAGE_PRECOMPUTE_WORKERS threads with at most CALENDAR_PAGE_PRECOMPUTE_QUEUE_SIZE pages queued at once
+CALENDAR_PAGE_PRECOMPUTE = False
+CALENDAR_PAGE_PRECOMPUTE_WORKERS = 2
+CALENDAR_PAGE_PRECOMPUTE_QUEUE_SIZE = 8
+# seconds a request waits for a page already being built in the background before building it itself
+CALENDAR_PAGE_PRECOMPUTE_WAIT = 5
+# seconds between checks of the calendars with values cached in each process against their versions in the
+# database, for changes made by other processes that no request to this one has noticed yet
+CALENDAR_CACHE_POLL_INTERVAL = 1
+
+
 # Login URL
 # https://docs.djangoproject.com/en/4.2/ref/settings/#std-setting-LOGIN_URL
 